@@ -35,6 +35,9 @@ class MCPClient:
     DEFAULT_ALPHA: float = 0.8
     DEFAULT_BETA: float = 0.25
     DEFAULT_CANDIDATE_POOL: int = 200
+    # share of request_timeout_s handed to the server as its latency budget
+    # (the rest covers transport and result coercion)
+    SERVER_BUDGET_FRACTION: float = 0.9
 
     def __init__(
         self,
@@ -105,6 +108,9 @@ class MCPClient:
         candidate_pool: Optional[int] = None,
         min_desc_len: int = 0,
         same_resolution_dedupe: bool = True,
+        adaptive_pool: Optional[bool] = None,
+        budget_ms: Optional[float] = None,
+        priority: Optional[str] = None,
     ) -> List[Dict[str, Any]]:
         if not isinstance(query, str) or not query.strip():
             raise ValueError("lookup_solution: 'query' must be non-empty")
@@ -124,7 +130,16 @@ class MCPClient:
             "candidate_pool": pool,
             "min_desc_len": int(min_desc_len),
             "same_resolution_dedupe": bool(same_resolution_dedupe),
+            # propagate our own timeout so the server can budget its stages
+            "budget_ms": float(budget_ms) if budget_ms is not None
+            else self.request_timeout_s * 1000.0 * self.SERVER_BUDGET_FRACTION,
         }
+        if priority is not None:
+            # "interactive" (server default) or "bulk" for replays/evaluations
+            args["priority"] = str(priority)
+        if adaptive_pool is not None:
+            # let the server size the rerank pool per query (candidate_pool is then ignored)
+            args["adaptive_pool"] = bool(adaptive_pool)
 
         coro = self._invoke_tool("lookup_solution", args)
         if self.keep_alive and self._session:
@@ -0,0 +1,92 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import argparse
+import json
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, Sequence
+
+from backend.src.bench.bench_search_alloc import QUERIES
+from backend.src.rag.indexer import BOILERPLATE_RULES, IncidentIndexer
+from backend.src.rag.search import IncidentSearcher
+
+
+def _build(raw_dir: Path, root: Path, rules: Sequence[str]) -> Dict[str, object]:
+    """Index a copy of raw/ under `root` with the given boilerplate rules; sizes of what it produced."""
+    dst = root / "src" / "data" / "raw"
+    dst.mkdir(parents=True)
+    for xf in sorted(raw_dir.glob("*.xlsx")):
+        shutil.copy2(xf, dst / xf.name)
+    idx = IncidentIndexer(project_root=str(root), boilerplate=rules, write_bundle=False)
+    t0 = time.perf_counter()
+    res = idx.run()
+    meta = json.loads((idx.index_dir / "index_meta.json").read_text(encoding="utf-8"))
+    return {
+        "rows": int(res["rows"]),
+        "build_s": round(time.perf_counter() - t0, 3),
+        "csv_bytes": idx.processed_csv.stat().st_size,
+        "boilerplate_bytes_removed": res.get("boilerplate", {}).get("bytes_removed", 0),
+        "n_features": meta["n_features"],
+        "nnz": meta["nnz"],
+        "npz_bytes": (idx.index_dir / "tfidf_csr.npz").stat().st_size,
+    }
+
+
+def _latency(root: Path, rounds: int) -> Dict[str, float]:
+    """Stage-1 (TF-IDF + fuzzy) latency; no embeddings exist under the scratch root."""
+    s = IncidentSearcher(project_root=str(root), lazy_embed_max=0)
+    try:
+        for q in QUERIES:  # warm caches / workspaces
+            s.search(q, top_k=8)
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for q in QUERIES:
+                s.search(q, top_k=8)
+        n = rounds * len(QUERIES)
+        out = {"ms_per_query": round((time.perf_counter() - t0) * 1000.0 / n, 3)}
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            for q in QUERIES:
+                s._fuzzy_scores(q, s._workspace().fuzzy)
+        out["fuzzy_ms_per_query"] = round((time.perf_counter() - t0) * 1000.0 / n, 3)
+        return out
+    finally:
+        s.close()
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Index size and stage-1 latency with and without e-mail boilerplate stripping.")
+    ap.add_argument("--project-root", default=None)
+    ap.add_argument("--rules", nargs="*", default=list(BOILERPLATE_RULES), help=f"subset of {BOILERPLATE_RULES}")
+    ap.add_argument("--rounds", type=int, default=5)
+    args = ap.parse_args()
+
+    raw_dir = IncidentIndexer(project_root=args.project_root).raw_dir
+    if not any(raw_dir.glob("*.xlsx")):
+        print(f"no workbooks under {raw_dir}")
+        return
+
+    scratch = Path(tempfile.mkdtemp(prefix="bench_boilerplate_"))
+    try:
+        report = {}
+        for label, rules in (("kept", ()), ("stripped", tuple(args.rules))):
+            root = scratch / label
+            report[label] = _build(raw_dir, root, rules)
+            report[label].update(_latency(root, args.rounds))
+    finally:
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    kept, stripped = report["kept"], report["stripped"]
+    print(f"rules: {list(args.rules)}")
+    for key in kept:
+        a, b = kept[key], stripped[key]
+        change = f"{(b - a) / a * 100.0:+.1f}%" if isinstance(a, (int, float)) and a else ""
+        print(f"{key:<26}: {a:>12} -> {b:>12}  {change}")
+
+
+if __name__ == "__main__":
+    main()
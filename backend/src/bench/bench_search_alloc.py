@@ -0,0 +1,140 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import argparse
+import time
+import tracemalloc
+from typing import Callable, Dict, List
+
+import numpy as np
+from scipy import sparse
+
+from backend.src.rag.search import IncidentSearcher
+
+
+QUERIES = [
+    "hysys ejector convergence error",
+    "license server expired dongle",
+    "excel export column missing",
+    "aspen plus palette dll missing",
+    "network timeout on import",
+]
+
+
+def _measure(s: IncidentSearcher, queries: List[str], rounds: int, cold: bool) -> Dict[str, float]:
+    """Peak traced bytes and latency per search; cold=True drops the workspace before every query."""
+    peaks: List[int] = []
+    t0 = time.perf_counter()
+    for _ in range(rounds):
+        for q in queries:
+            if cold:
+                s._tls.ws = None
+                s._tls.scores = None
+            tracemalloc.reset_peak()
+            base = tracemalloc.get_traced_memory()[0]
+            s.search(q, top_k=8)
+            peaks.append(tracemalloc.get_traced_memory()[1] - base)
+    n = max(len(peaks), 1)
+    return {
+        "ms_per_query": round((time.perf_counter() - t0) * 1000.0 / n, 3),
+        "peak_kib_avg": round(sum(peaks) / n / 1024.0, 1),
+        "peak_kib_max": round(max(peaks) / 1024.0, 1),
+    }
+
+
+def _score_latency(s: IncidentSearcher, batch: int, rounds: int, tile: int) -> Dict[str, float]:
+    """
+    ms per `_tfidf_scores` call for a batch of queries: the posting-list loop over the
+    transposed index against the sparse products it replaced (same scores, checked).
+    tile > 1 stacks the corpus that many times to see how each scales with N.
+    """
+    loaded = s.mat, s.mat_t, s._mat_t_rows
+    mat, mat_t, rows = loaded
+    if tile > 1:
+        mat = sparse.vstack([mat] * tile, format="csr")
+        mat.sort_indices()
+        mat_t = mat.T.tocsr()
+        rows = mat_t.indices.astype(np.intp)
+    s.mat, s.mat_t, s._mat_t_rows = mat, mat_t, rows
+    s._tls.scores = None
+    try:
+        return _time_variants(s, mat, mat_t, batch, rounds)
+    finally:
+        s.mat, s.mat_t, s._mat_t_rows = loaded
+        s._tls.scores = None
+
+
+def _time_variants(
+    s: IncidentSearcher, mat: sparse.csr_matrix, mat_t: sparse.csr_matrix, batch: int, rounds: int
+) -> Dict[str, float]:
+    q = s._transform_queries([QUERIES[i % len(QUERIES)] for i in range(batch)])
+    buf = np.empty((batch, mat.shape[0]), dtype=np.float32)
+
+    def q_mat_t() -> np.ndarray:
+        # the previous scoring: one sparse product against the transposed index
+        (q @ mat_t).toarray(out=buf)
+        return buf
+
+    def mat_q_t() -> np.ndarray:
+        # the original scoring: the plain product against the row-major index
+        np.copyto(buf, (mat @ q.T).T.toarray())
+        return buf
+
+    variants: Dict[str, Callable[[], np.ndarray]] = {
+        "postings": lambda: s._tfidf_scores(q),
+        "q @ mat_t": q_mat_t,
+        "mat @ q.T": mat_q_t,
+    }
+    ref = s._tfidf_scores(q).copy()
+    out: Dict[str, float] = {}
+    for name, fn in variants.items():
+        if not np.allclose(fn(), ref, atol=1e-5):
+            raise AssertionError(f"{name} scores differ from the posting loop")
+        t0 = time.perf_counter()
+        for _ in range(rounds):
+            fn()
+        out[name] = round((time.perf_counter() - t0) * 1000.0 / rounds, 3)
+    return out
+
+
+def main() -> None:
+    ap = argparse.ArgumentParser(description="Per-query allocation of IncidentSearcher.search (tracemalloc).")
+    ap.add_argument("--project-root", default=None)
+    ap.add_argument("--rounds", type=int, default=5)
+    ap.add_argument("--tile", type=int, default=1, help="also time TF-IDF scoring on the corpus stacked N times")
+    args = ap.parse_args()
+
+    # stage-1 only: the embedding backend would dominate both timings and allocations
+    s = IncidentSearcher(project_root=args.project_root, lazy_embed_max=0)
+    s.embedder = None
+    n = len(s.desc_list)
+    print(f"corpus rows: {n}  (one float32 corpus vector = {n * 4 / 1024.0:.1f} KiB)")
+
+    for q in QUERIES:  # warm caches / workspaces
+        s.search(q, top_k=8)
+
+    tracemalloc.start()
+    try:
+        cold = _measure(s, QUERIES, args.rounds, cold=True)
+        warm = _measure(s, QUERIES, args.rounds, cold=False)
+    finally:
+        tracemalloc.stop()
+
+    print(f"fresh buffers per query : {cold}")
+    print(f"reused workspaces       : {warm}")
+    if warm["peak_kib_avg"] > 0:
+        print(f"peak allocation reduction: {cold['peak_kib_avg'] / warm['peak_kib_avg']:.1f}x")
+
+    # TF-IDF scoring alone, ms per call (last: the corpus stacked --tile times)
+    try:
+        for tile in sorted({1, max(args.tile, 1)}):
+            for batch in (1, 16):
+                ms = _score_latency(s, batch, rounds=20 * args.rounds, tile=tile)
+                print(f"tfidf scores rows={n * tile:<7} batch={batch:<3}: {ms}")
+    finally:
+        s.close()
+
+
+if __name__ == "__main__":
+    main()
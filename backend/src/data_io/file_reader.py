@@ -3,8 +3,9 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 import json
+import importlib.util
 import pandas as pd
-from typing import Union
+from typing import Iterator, List, Optional, Union
 
 class FileReader:
     """
@@ -56,6 +57,43 @@ class FileReader:
         """
         return pd.read_excel(path, sheet_name=sheet_name, engine="openpyxl", **kwargs)
     
+    @staticmethod
+    def parquet_available() -> bool:
+        """True if pyarrow (the optional Parquet engine) is installed."""
+        return importlib.util.find_spec("pyarrow") is not None
+
+    @staticmethod
+    def read_parquet(path: str, columns: Optional[List[str]] = None, **kwargs) -> pd.DataFrame:
+        """
+        Read a Parquet file into a pandas DataFrame (requires pyarrow).
+
+        Args:
+            path: Path to the Parquet file.
+            columns: Only read these columns; the others are never decoded.
+            **kwargs: Passed through to pandas.read_parquet.
+
+        Returns:
+            pandas.DataFrame
+        """
+        kwargs.setdefault("engine", "pyarrow")
+        return pd.read_parquet(path, columns=columns, **kwargs)
+
+    @staticmethod
+    def iter_parquet(path: str, columns: Optional[List[str]] = None, batch_size: int = 65536) -> Iterator[pd.DataFrame]:
+        """
+        Read a Parquet file as DataFrames of at most `batch_size` rows (requires pyarrow).
+
+        Args:
+            path: Path to the Parquet file.
+            columns: Only read these columns.
+            batch_size: Maximum rows per yielded DataFrame.
+        """
+        import pyarrow.parquet as pq
+
+        pf = pq.ParquetFile(path)
+        for batch in pf.iter_batches(batch_size=batch_size, columns=columns):
+            yield batch.to_pandas()
+
     @staticmethod
     def read_json(path: str) -> Union[dict, list]:
         """
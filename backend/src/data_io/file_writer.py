@@ -4,7 +4,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../.
 
 import json
 import pandas as pd
-from typing import Any
+from typing import Any, Iterable
 
 class FileWriter:
     """
@@ -55,4 +55,43 @@ class FileWriter:
         os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
         kwargs.setdefault("index", False)
         kwargs.setdefault("encoding", "utf-8-sig")
-        df.to_csv(path, **kwargs)
\ No newline at end of file
+        df.to_csv(path, **kwargs)
+
+    @staticmethod
+    def write_parquet_chunks(chunks: Iterable["pd.DataFrame"], path: str, compression: str = "zstd") -> int:
+        """
+        Stream DataFrames with identical columns into one Parquet file (requires pyarrow).
+
+        Args:
+            chunks: DataFrames to append, in order; each becomes one or more row groups.
+            path: Output file path.
+            compression: Parquet codec (e.g., "zstd", "snappy").
+
+        Returns:
+            Number of rows written.
+
+        Notes:
+            - Ensures the parent directory exists.
+            - Written to a temporary file first, so readers never see a partial file.
+        """
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = f"{path}.tmp"
+        writer = None
+        rows = 0
+        try:
+            for df in chunks:
+                table = pa.Table.from_pandas(df, preserve_index=False)
+                if writer is None:
+                    writer = pq.ParquetWriter(tmp, table.schema, compression=compression)
+                writer.write_table(table.cast(writer.schema))
+                rows += len(df)
+        finally:
+            if writer is not None:
+                writer.close()
+        if writer is None:
+            raise ValueError(f"no chunks to write to {path}")
+        os.replace(tmp, path)
+        return rows
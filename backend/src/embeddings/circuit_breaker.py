@@ -0,0 +1,118 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
+
+import threading
+import time
+from typing import Dict, Optional
+
+
+class CircuitBreaker:
+    """
+    Minimal thread-safe circuit breaker for a flaky backend (e.g. the Ollama embedding server).
+
+    States:
+      - closed    : calls go through; consecutive failures are counted
+      - open      : calls are rejected immediately until `recovery_timeout_s` has elapsed
+      - half_open : a limited number of probe calls go through; one success closes the
+                    breaker again, one failure re-opens it
+
+    Callers ask `allow_request()` before the call and report the outcome with
+    `record_success()` / `record_failure()`.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str = "embedding",
+        failure_threshold: int = 3,
+        recovery_timeout_s: float = 30.0,
+        half_open_max_calls: int = 1,
+    ) -> None:
+        self.name = name
+        self.failure_threshold = max(int(failure_threshold), 1)
+        self.recovery_timeout_s = float(recovery_timeout_s)
+        self.half_open_max_calls = max(int(half_open_max_calls), 1)
+
+        self._lock = threading.Lock()
+        self._state = self.CLOSED
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._half_open_in_flight = 0
+
+        # counters (exported via snapshot())
+        self.trips = 0
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+        self.last_error: Optional[str] = None
+
+    # ----- public -----
+    @property
+    def state(self) -> str:
+        with self._lock:
+            self._maybe_half_open()
+            return self._state
+
+    def allow_request(self) -> bool:
+        """Return True if the caller may hit the backend now."""
+        with self._lock:
+            self._maybe_half_open()
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.HALF_OPEN and self._half_open_in_flight < self.half_open_max_calls:
+                self._half_open_in_flight += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.successes += 1
+            self._consecutive_failures = 0
+            self._half_open_in_flight = 0
+            self._state = self.CLOSED
+            self._opened_at = None
+
+    def record_failure(self, error: Optional[str] = None) -> None:
+        with self._lock:
+            self.failures += 1
+            self._consecutive_failures += 1
+            if error:
+                self.last_error = error[:200]
+            if self._state == self.HALF_OPEN or self._consecutive_failures >= self.failure_threshold:
+                self._trip()
+
+    def snapshot(self) -> Dict[str, object]:
+        """Plain-dict view for health endpoints."""
+        with self._lock:
+            self._maybe_half_open()
+            return {
+                "name": self.name,
+                "state": self._state,
+                "trips": self.trips,
+                "consecutive_failures": self._consecutive_failures,
+                "failures": self.failures,
+                "successes": self.successes,
+                "rejected": self.rejected,
+                "failure_threshold": self.failure_threshold,
+                "recovery_timeout_s": self.recovery_timeout_s,
+                "last_error": self.last_error,
+            }
+
+    # ----- internals (caller holds the lock) -----
+    def _trip(self) -> None:
+        if self._state != self.OPEN:
+            self.trips += 1
+        self._state = self.OPEN
+        self._opened_at = time.monotonic()
+        self._half_open_in_flight = 0
+
+    def _maybe_half_open(self) -> None:
+        if self._state == self.OPEN and self._opened_at is not None:
+            if time.monotonic() - self._opened_at >= self.recovery_timeout_s:
+                self._state = self.HALF_OPEN
+                self._half_open_in_flight = 0
@@ -3,7 +3,9 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '../../..')))
 
 import re
+import time
 from typing import List, Optional
+import requests
 from langchain_community.embeddings import OllamaEmbeddings
 
 class EmbeddingHandler:
@@ -11,6 +13,10 @@ class EmbeddingHandler:
     Lightweight wrapper for vector embedding models served by Ollama.
     Calls the `/api/embeddings` endpoint (local or remote).
     Includes minimal pre-processing and truncation safeguards.
+
+    With `timeout_s` set, the HTTP requests themselves are bounded: one `encode_many`
+    call gives up (raises) once `timeout_s` has passed, so a hung server frees the
+    calling thread instead of holding it forever.
     """
 
     def __init__(
@@ -21,6 +27,7 @@ class EmbeddingHandler:
         tail_chars: int = 2000,        # keep some tail when truncating
         normalize_ws: bool = True,
         num_ctx: Optional[int] = None, # forwarded to server options if set
+        timeout_s: Optional[float] = None,  # wall-clock bound per encode_many call (None: unbounded)
     ):
         self.model_name = model_name
         self.base_url = base_url
@@ -28,6 +35,7 @@ class EmbeddingHandler:
         self.tail_chars = tail_chars
         self.normalize_ws = normalize_ws
         self.num_ctx = num_ctx
+        self.timeout_s = float(timeout_s) if timeout_s is not None else None
 
         model_kwargs = {}
         if self.num_ctx:
@@ -45,13 +53,35 @@ class EmbeddingHandler:
         if isinstance(texts, str):
             texts = [texts]
         proc = [self._preprocess(t) for t in texts]
-        return self.model.embed_documents(proc)
+        if self.timeout_s is None:
+            return self.model.embed_documents(proc)
+        deadline = time.monotonic() + self.timeout_s
+        return [self._embed_before(t, deadline) for t in proc]
 
     def encode_one(self, text: str) -> List[float]:
         """Encode a single text; raise on error."""
         return self.encode_many([text])[0]
 
     # ----- internals -----
+    def _embed_before(self, text: str, deadline: float) -> List[float]:
+        """
+        The request OllamaEmbeddings.embed_documents makes for one text (same endpoint,
+        prompt prefix and options, hence the same vector), bounded by `deadline`.
+        """
+        left = deadline - time.monotonic()
+        if left <= 0:
+            raise TimeoutError(f"embedding deadline passed ({self.timeout_s}s)")
+        m = self.model
+        res = requests.post(
+            f"{m.base_url}/api/embeddings",
+            headers={"Content-Type": "application/json", **(m.headers or {})},
+            json={"prompt": f"{m.embed_instruction}{text}", **m._default_params},
+            timeout=left,
+        )
+        if res.status_code != 200:
+            raise ValueError(f"Error raised by inference API HTTP code: {res.status_code}, {res.text}")
+        return res.json()["embedding"]
+
     def _preprocess(self, text: str) -> str:
         if not text:
             return ""
@@ -0,0 +1,272 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import json
+import mmap
+import struct
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+import numpy as np
+from scipy import sparse
+from sklearn.preprocessing import normalize
+
+from backend.src.rag.incident_store import IncidentStore
+
+# file layout: MAGIC | uint32 version | uint32 header bytes | JSON header | sections
+MAGIC = b"INCBNDL\x00"
+# bump when the section set or its meaning changes; readers reject other versions
+BUNDLE_VERSION = 1
+_PREFIX = struct.Struct("<8sII")
+# every section starts on this boundary so np.frombuffer views are aligned
+_ALIGN = 64
+# incidents.csv columns stored as string sections
+TEXT_COLUMNS: Tuple[str, ...] = ("id", "description", "resolution", "source_file")
+
+
+class StringColumn(Sequence):
+    """
+    Read-only sequence of strings over (offsets, utf-8 blob) arrays; item i is
+    blob[offsets[i]:offsets[i + 1]]. Nothing is decoded until it is indexed.
+    """
+
+    def __init__(self, offsets: np.ndarray, blob: np.ndarray) -> None:
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i: Union[int, slice]) -> Union[str, List[str]]:
+        if isinstance(i, slice):
+            lo, hi, step = i.indices(len(self))
+            if step != 1:
+                return [self[j] for j in range(lo, hi, step)]
+            if hi <= lo:
+                return []
+            # one copy of the slice's bytes, then cut it up
+            off = self.offsets[lo:hi + 1] - self.offsets[lo]
+            raw = self.blob[self.offsets[lo]:self.offsets[hi]].tobytes()
+            return [raw[a:b].decode("utf-8") for a, b in zip(off[:-1].tolist(), off[1:].tolist())]
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError(i)
+        return self.blob[self.offsets[i]:self.offsets[i + 1]].tobytes().decode("utf-8")
+
+
+class IndexBundle:
+    """
+    Read side of incidents.bundle: the searcher's cold-start artifacts in one file,
+    memory-mapped and viewed in place (no parsing, no copies, pages are read on touch).
+
+    Sections (absent groups are simply missing):
+      index      : tfidf.{data,indices,indptr} (rows L2-normalized, indices sorted),
+                   tfidf_t.{data,indices,indptr} + tfidf_t.rows (intp posting rows),
+                   vectorizer (the vectorizer.pkl bytes),
+                   <column>.offsets / <column>.blob for TEXT_COLUMNS
+      embeddings : emb (M, D) float32 ordered by row, kept (M,) int64
+
+    The header records size + mtime of every artifact a group was built from
+    (`sources`); `fresh` tells whether those artifacts were rewritten since.
+    """
+
+    def __init__(self, path: Union[str, Path]) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            header = self._read_header()
+        except Exception:
+            self._mm.close()
+            raise
+        self.sections: Dict[str, Dict] = header["sections"]
+        self.sources: Dict[str, Dict[str, List[int]]] = header.get("sources", {})
+        self.meta: Dict[str, object] = header.get("meta", {})
+
+    # ---------------- public ----------------
+    def has(self, name: str) -> bool:
+        return name in self.sections
+
+    def array(self, name: str) -> np.ndarray:
+        """Read-only view of a section."""
+        s = self.sections[name]
+        count = int(np.prod(s["shape"])) if s["shape"] else 1
+        return np.frombuffer(self._mm, dtype=np.dtype(s["dtype"]), count=count, offset=s["offset"]).reshape(s["shape"])
+
+    def strings(self, name: str) -> StringColumn:
+        return StringColumn(self.array(f"{name}.offsets"), self.array(f"{name}.blob"))
+
+    def csr(self, prefix: str) -> sparse.csr_matrix:
+        """CSR matrix over the {prefix}.data / .indices / .indptr views (indices are stored sorted)."""
+        mat = sparse.csr_matrix(
+            (self.array(f"{prefix}.data"), self.array(f"{prefix}.indices"), self.array(f"{prefix}.indptr")),
+            shape=tuple(self.meta[f"{prefix}.shape"]),
+            copy=False,
+        )
+        mat.has_sorted_indices = True
+        return mat
+
+    def fresh(self, group: str, paths: Dict[str, Path]) -> bool:
+        """
+        True if `group` is in the bundle and none of its source artifacts changed since it
+        was written. A source that no longer exists does not count as a change, so the
+        bundle can be shipped on its own.
+        """
+        recorded = self.sources.get(group)
+        if recorded is None:
+            return False
+        for name, path in paths.items():
+            if path.exists() and file_stamp(path) != recorded.get(name):
+                return False
+        return True
+
+    def close(self) -> bool:
+        """Unmap the file; False while arrays handed out still view it (released with the last of them)."""
+        try:
+            self._mm.close()
+        except BufferError:
+            return False
+        return True
+
+    # ---------------- internals ----------------
+    def _read_header(self) -> Dict:
+        """
+        Parse and validate the header. Anything malformed (truncated prefix, bad JSON,
+        missing keys, sections reaching past the end of the file) raises ValueError, so
+        callers only have one error to fall back on.
+        """
+        try:
+            magic, version, header_len = _PREFIX.unpack_from(self._mm, 0)
+            if magic != MAGIC:
+                raise ValueError(f"not an index bundle: {self.path}")
+            if version != BUNDLE_VERSION:
+                raise ValueError(f"bundle version {version} not supported (expected {BUNDLE_VERSION}): {self.path}")
+            header = json.loads(self._mm[_PREFIX.size:_PREFIX.size + header_len].decode("utf-8"))
+            for name, s in header["sections"].items():
+                count = int(np.prod(s["shape"])) if s["shape"] else 1
+                end = int(s["offset"]) + count * np.dtype(s["dtype"]).itemsize
+                if end > len(self._mm):
+                    raise ValueError(f"section {name} truncated in {self.path}")
+            for prefix in ("tfidf", "tfidf_t"):
+                if f"{prefix}.data" in header["sections"] and f"{prefix}.shape" not in header.get("meta", {}):
+                    raise ValueError(f"{prefix}.shape missing in {self.path}")
+        except (struct.error, UnicodeDecodeError, KeyError, TypeError) as e:
+            raise ValueError(f"corrupt index bundle {self.path}: {type(e).__name__}: {e}") from e
+        return header
+
+
+def write_index_bundle(
+    path: Union[str, Path],
+    incidents_csv: Path,
+    vectorizer_pkl: Path,
+    matrix_npz: Path,
+    emb_npy: Optional[Path] = None,
+    kept_idx_npy: Optional[Path] = None,
+    emb_meta_json: Optional[Path] = None,
+) -> Dict[str, object]:
+    """
+    Assemble incidents.bundle from the indexer (and, when present, embedder) artifacts.
+
+    Everything the searcher used to redo on every start is done here once: rows are
+    truncated to the shorter of CSV / matrix, the matrix is normalized, index-sorted and
+    transposed, and embeddings are ordered by row. Written to a temp file and moved into
+    place, so a reader never sees a half-written bundle.
+    """
+    path = Path(path)
+    arrays: Dict[str, np.ndarray] = {}
+    meta: Dict[str, object] = {}
+    sources: Dict[str, Dict[str, List[int]]] = {}
+
+    df = IncidentStore(Path(incidents_csv).parent).read(TEXT_COLUMNS)
+    mat = sparse.load_npz(matrix_npz)
+    n = min(len(df), mat.shape[0])
+    mat = prepare_csr(mat[:n] if mat.shape[0] != n else mat)
+    mat_t = mat.T.tocsr()
+    for prefix, m in (("tfidf", mat), ("tfidf_t", mat_t)):
+        arrays[f"{prefix}.data"] = m.data
+        arrays[f"{prefix}.indices"] = m.indices
+        arrays[f"{prefix}.indptr"] = m.indptr
+        meta[f"{prefix}.shape"] = list(m.shape)
+    arrays["tfidf_t.rows"] = mat_t.indices.astype(np.intp)
+    arrays["vectorizer"] = np.frombuffer(Path(vectorizer_pkl).read_bytes(), dtype=np.uint8)
+    for col in TEXT_COLUMNS:
+        values = df[col].iloc[:n].tolist()
+        arrays[f"{col}.offsets"], arrays[f"{col}.blob"] = _encode_strings(values)
+    meta["n_rows"] = int(n)
+    sources["index"] = {p.name: file_stamp(p) for p in (incidents_csv, vectorizer_pkl, matrix_npz)}
+
+    if emb_npy is not None and kept_idx_npy is not None and emb_npy.exists() and kept_idx_npy.exists():
+        emb = np.load(emb_npy).astype(np.float32)
+        kept = np.load(kept_idx_npy).astype(np.int64)
+        order = np.argsort(kept, kind="stable")
+        arrays["emb"] = np.ascontiguousarray(emb[order])
+        arrays["kept"] = kept[order]
+        emb_sources = [emb_npy, kept_idx_npy]
+        if emb_meta_json is not None and emb_meta_json.exists():
+            emb_meta = json.loads(emb_meta_json.read_text(encoding="utf-8"))
+            meta["embeddings"] = {k: emb_meta[k] for k in ("normalize", "passage_chars", "passage_overlap") if k in emb_meta}
+            emb_sources.append(emb_meta_json)
+        sources["embeddings"] = {p.name: file_stamp(p) for p in emb_sources}
+
+    nbytes = _write(path, arrays, meta, sources)
+    return {"bundle": str(path), "bytes": nbytes, "rows": int(n), "embeddings": "emb" in arrays}
+
+
+def file_stamp(path: Path) -> List[int]:
+    """[size, mtime_ns] of a file; a rewrite changes it even when the size does not."""
+    st = path.stat()
+    return [int(st.st_size), int(st.st_mtime_ns)]
+
+
+def prepare_csr(mat: sparse.spmatrix) -> sparse.csr_matrix:
+    """float32 CSR with L2-normalized rows (TfidfVectorizer output already is; checked once here)."""
+    mat = sparse.csr_matrix(mat, dtype=np.float32)
+    norms = np.sqrt(np.asarray(mat.multiply(mat).sum(axis=1)).ravel())
+    nonzero = norms > 0
+    if not np.allclose(norms[nonzero], 1.0, atol=1e-4):
+        mat = normalize(mat, norm="l2", copy=False)
+    mat.sort_indices()
+    return mat
+
+
+# ---------------- internals ----------------
+
+
+def _encode_strings(values: Sequence[str]) -> Tuple[np.ndarray, np.ndarray]:
+    encoded = [str(v).encode("utf-8") for v in values]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(b) for b in encoded], out=offsets[1:])
+    return offsets, np.frombuffer(b"".join(encoded), dtype=np.uint8)
+
+
+def _write(path: Path, arrays: Dict[str, np.ndarray], meta: Dict, sources: Dict) -> int:
+    # offsets depend on the header length and the header lists the offsets: lay sections
+    # out after a generous header estimate, grow the estimate until the header fits
+    reserve = 4096
+    while True:
+        sections: Dict[str, Dict] = {}
+        pos = _aligned(_PREFIX.size + reserve)
+        for name, arr in arrays.items():
+            sections[name] = {"offset": pos, "dtype": arr.dtype.str, "shape": list(arr.shape)}
+            pos = _aligned(pos + arr.nbytes)
+        header = json.dumps({"sections": sections, "meta": meta, "sources": sources}).encode("utf-8")
+        if len(header) <= reserve:
+            break
+        reserve = len(header) * 2
+
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_name(path.name + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, BUNDLE_VERSION, len(header)))
+        f.write(header)
+        for name, arr in arrays.items():
+            f.write(b"\x00" * (sections[name]["offset"] - f.tell()))
+            f.write(memoryview(np.ascontiguousarray(arr)).cast("B"))
+        f.write(b"\x00" * (pos - f.tell()))
+    os.replace(tmp, path)
+    return pos
+
+
+def _aligned(pos: int) -> int:
+    return (pos + _ALIGN - 1) // _ALIGN * _ALIGN
@@ -0,0 +1,269 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.cluster import MiniBatchKMeans
+
+from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.rag.incident_store import IncidentStore
+from backend.src.rag.lazy_store import LazyEmbeddingStore, side_store_identity
+from backend.src.rag.passages import first_runs, pool_by_row
+
+
+class IncidentClusterer:
+    """
+    Incremental issue-family clustering over the incident embeddings.
+
+    Mini-batch k-means is fitted once on the rows embedded so far; later `update()` calls
+    only `partial_fit` / assign rows that have been embedded since (including rows still
+    in the lazy side store), so earlier assignments are kept as they were.
+
+    Artifacts (src/data/processed/clusters/):
+      - kmeans.pkl          : fitted MiniBatchKMeans
+      - assignments.csv     : id, source_file, cluster, dist  (one row per clustered incident)
+      - cluster_stats.json  : per-cluster counts per source_file + exemplar incident; this
+                              is all `trend_report` needs, so trend queries cost O(clusters)
+    """
+
+    def __init__(
+        self,
+        project_root: Optional[str] = None,
+        processed_subdir: str = "src/data/processed",
+        emb_subdir: str = "src/data/processed/embeddings",
+        clusters_subdir: str = "src/data/processed/clusters",
+        # number of issue families
+        n_clusters: int = 32,
+        # rows per mini-batch step
+        batch_size: int = 1024,
+        random_state: int = 42,
+    ) -> None:
+        self.project_root = Path(project_root) if project_root else Path(__file__).resolve().parents[2]
+        self.proc_dir = (self.project_root / processed_subdir).resolve()
+        self.emb_dir = (self.project_root / emb_subdir).resolve()
+        self.out_dir = (self.project_root / clusters_subdir).resolve()
+
+        self.incidents_csv = self.proc_dir / "incidents.csv"
+        self.store = IncidentStore(self.proc_dir)
+        self.manifest_json = self.proc_dir / "ingest" / "manifest.json"
+        self.emb_npy = self.emb_dir / "embeddings.npy"
+        self.kept_idx_npy = self.emb_dir / "kept_indices.npy"
+        self.model_pkl = self.out_dir / "kmeans.pkl"
+        self.assign_csv = self.out_dir / "assignments.csv"
+        self.stats_json = self.out_dir / "cluster_stats.json"
+
+        self.n_clusters = max(int(n_clusters), 1)
+        self.batch_size = max(int(batch_size), 1)
+        self.random_state = int(random_state)
+
+    # ---------------- public ----------------
+    def update(self, rebuild: bool = False) -> Dict[str, object]:
+        """
+        Cluster rows embedded since the last run (all rows on the first run or with
+        rebuild=True), then rewrite the aggregates. Returns a small summary dict.
+        """
+        if not self.store.exists():
+            raise FileNotFoundError(f"incidents.csv not found: {self.incidents_csv}")
+        df = self.store.read(["id", "source_file", "description"])
+        rows, vecs = self._embedded_rows(len(df))
+        if len(rows) == 0:
+            raise RuntimeError("No embeddings found. Run the embedder first.")
+        ids = df["id"].astype(str).to_numpy()
+
+        model = None if rebuild else self._load_model(vecs.shape[1])
+        prior = self._load_assignments() if model is not None else None
+        if prior is not None:
+            # drop incidents that no longer exist (re-index / dedupe)
+            prior = prior[prior["id"].isin(set(ids))]
+            new_mask = ~np.isin(ids[rows], prior["id"].to_numpy())
+        else:
+            new_mask = np.ones(len(rows), dtype=bool)
+        new_rows, new_vecs = rows[new_mask], vecs[new_mask]
+
+        if model is None:
+            model = MiniBatchKMeans(
+                n_clusters=min(self.n_clusters, len(new_rows)),
+                batch_size=self.batch_size,
+                random_state=self.random_state,
+                n_init=3,
+            )
+            model.fit(new_vecs)
+        elif len(new_rows):
+            for b in range(0, len(new_rows), self.batch_size):
+                model.partial_fit(new_vecs[b:b + self.batch_size])
+
+        assignments = prior
+        if len(new_rows):
+            dist = model.transform(new_vecs)
+            labels = dist.argmin(axis=1)
+            fresh = pd.DataFrame({
+                "id": ids[new_rows],
+                "source_file": df["source_file"].astype(str).to_numpy()[new_rows],
+                "cluster": labels.astype(int),
+                "dist": dist[np.arange(len(labels)), labels].astype(float).round(6),
+            })
+            assignments = fresh if prior is None else pd.concat([prior, fresh], ignore_index=True)
+
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        joblib.dump(model, self.model_pkl)
+        FileWriter.write_csv(assignments, str(self.assign_csv))
+        stats = self._aggregate(assignments, df, int(model.n_clusters), self._source_mtimes())
+        FileWriter.write_json(stats, str(self.stats_json))
+        return {
+            "clustered_new": int(len(new_rows)),
+            "clustered_total": int(len(assignments)),
+            "n_clusters": int(model.n_clusters),
+            "stats": str(self.stats_json),
+        }
+
+    @staticmethod
+    def load_stats(stats_json: Path) -> Optional[Dict]:
+        path = Path(stats_json)
+        if not path.exists():
+            return None
+        return FileReader.read_json(str(path))
+
+    @staticmethod
+    def trend_report(
+        stats: Dict,
+        latest_source: Optional[str] = None,
+        top_n: int = 10,
+        min_count: int = 3,
+    ) -> Dict[str, object]:
+        """
+        Issue families growing in `latest_source` (default: the newest export, i.e. the last
+        of stats["sources"], which `update` orders by workbook mtime) relative to all other
+        sources, computed from the stored aggregates only.
+
+        growth = smoothed share in latest / smoothed share in the rest (1.0 = no change).
+        """
+        sources: List[str] = list(stats.get("sources", []))
+        if not sources:
+            return {"latest_source": None, "clusters": []}
+        latest = latest_source or sources[-1]
+        if latest not in sources:
+            raise KeyError(latest)
+
+        counts = stats["counts"]                    # source -> [count per cluster]
+        n_clusters = int(stats["n_clusters"])
+        latest_c = np.asarray(counts[latest], dtype=float)
+        rest_c = np.zeros(n_clusters, dtype=float)
+        for src in sources:
+            if src != latest:
+                rest_c += np.asarray(counts[src], dtype=float)
+
+        # add-one smoothing keeps new / vanished families finite
+        latest_share = (latest_c + 1.0) / (latest_c.sum() + n_clusters)
+        rest_share = (rest_c + 1.0) / (rest_c.sum() + n_clusters)
+        growth = latest_share / rest_share
+
+        order = np.argsort(-growth, kind="stable")
+        exemplars = {int(e["cluster"]): e for e in stats.get("exemplars", [])}
+        out: List[Dict] = []
+        for c in order.tolist():
+            if latest_c[c] < min_count:
+                continue
+            out.append({
+                "cluster": c,
+                "latest_count": int(latest_c[c]),
+                "baseline_count": int(rest_c[c]),
+                "latest_share": round(float(latest_c[c] / max(latest_c.sum(), 1.0)), 4),
+                "baseline_share": round(float(rest_c[c] / max(rest_c.sum(), 1.0)), 4),
+                "growth": round(float(growth[c]), 3),
+                "exemplar": exemplars.get(c),
+            })
+            if len(out) >= top_n:
+                break
+        return {"latest_source": latest, "baseline_sources": [s for s in sources if s != latest], "clusters": out}
+
+    # ---------------- internals ----------------
+    def _embedded_rows(self, n_rows: int) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (CSV rows, L2-normalized vectors) for every embedded row, lazy side store included;
+        multi-passage incidents are mean-pooled into one vector.
+        """
+        if not (self.emb_npy.exists() and self.kept_idx_npy.exists()):
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 0), dtype=np.float32)
+        vecs = np.load(self.emb_npy).astype(np.float32)
+        rows = np.load(self.kept_idx_npy).astype(np.int64)
+        identity = side_store_identity(self.incidents_csv, self.emb_dir / "embedder_meta.json")
+        side_rows, side_vecs = LazyEmbeddingStore(self.emb_dir, dim=vecs.shape[1], identity=identity).load()
+        if len(side_rows):
+            # side entries only for rows the main store lacks, first run per row
+            keep = first_runs(side_rows) & ~np.isin(side_rows, rows)
+            rows = np.concatenate([rows, side_rows[keep]])
+            vecs = np.vstack([vecs, side_vecs[keep]])
+
+        ok = (rows >= 0) & (rows < n_rows)
+        return pool_by_row(rows[ok], vecs[ok])
+
+    def _load_model(self, dim: int) -> Optional[MiniBatchKMeans]:
+        if not (self.model_pkl.exists() and self.assign_csv.exists()):
+            return None
+        model = joblib.load(self.model_pkl)
+        if model.cluster_centers_.shape[1] != dim:
+            return None  # embedding model changed; start over
+        return model
+
+    def _source_mtimes(self) -> Dict[str, float]:
+        """Workbook mtime per source_file, from the indexer's ingest manifest ({} without one)."""
+        if not self.manifest_json.exists():
+            return {}
+        try:
+            files = FileReader.read_json(str(self.manifest_json)).get("files", {})
+        except ValueError:
+            return {}
+        return {name: float(e["mtime"]) for name, e in files.items() if e.get("mtime") is not None}
+
+    def _load_assignments(self) -> Optional[pd.DataFrame]:
+        if not self.assign_csv.exists():
+            return None
+        return pd.read_csv(self.assign_csv, dtype={"id": str, "source_file": str}).fillna("")
+
+    @staticmethod
+    def _aggregate(
+        assignments: pd.DataFrame, df: pd.DataFrame, n_clusters: int, source_mtimes: Dict[str, float]
+    ) -> Dict[str, object]:
+        # sources oldest first by workbook mtime; incidents.csv lists them by file name, so
+        # first appearance only breaks ties (and orders sources missing from the manifest,
+        # which count as oldest)
+        first_seen = {s: i for i, s in enumerate(dict.fromkeys(df["source_file"].astype(str).tolist()))}
+        seen = set(assignments["source_file"].astype(str))
+        sources = sorted(
+            (s for s in first_seen if s in seen),
+            key=lambda s: (s in source_mtimes, source_mtimes.get(s, 0.0), first_seen[s]),
+        )
+
+        table = pd.crosstab(assignments["source_file"].astype(str), assignments["cluster"].astype(int))
+        table = table.reindex(index=sources, columns=range(n_clusters), fill_value=0)
+        counts = {src: table.loc[src].astype(int).tolist() for src in sources}
+
+        desc_by_id = dict(zip(df["id"].astype(str), df["description"].astype(str)))
+        best = assignments.sort_values("dist", kind="stable").drop_duplicates("cluster")
+        exemplars = [
+            {
+                "cluster": int(r.cluster),
+                "id": str(r.id),
+                "description": desc_by_id.get(str(r.id), "")[:200],
+            }
+            for r in best.sort_values("cluster").itertuples(index=False)
+        ]
+        return {
+            "n_clusters": n_clusters,
+            "n_assigned": int(len(assignments)),
+            "sources": sources,
+            "source_mtimes": {s: source_mtimes[s] for s in sources if s in source_mtimes},
+            "counts": counts,
+            "exemplars": exemplars,
+            "updated_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+
+if __name__ == "__main__":
+    print("Clustering update:", IncidentClusterer().update())
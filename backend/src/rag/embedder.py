@@ -1,4 +1,5 @@
 import os
+import secrets
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 
@@ -7,22 +8,36 @@ from typing import List, Dict, Optional
 import numpy as np
 import pandas as pd
 
-from backend.src.data_io.file_reader import FileReader
 from backend.src.data_io.file_writer import FileWriter
 from backend.src.embeddings.embedding_handler import EmbeddingHandler
+from backend.src.rag.bundle import write_index_bundle
+from backend.src.rag.incident_store import DeferredColumn, IncidentStore
+from backend.src.rag.lazy_store import LazyEmbeddingStore
+from backend.src.rag.passages import split_passages
 
 class IncidentEmbedder:
     """
     Build and query an embedding index over incidents.csv using the 'description' column.
     Backend: Ollama `/api/embeddings` via EmbeddingHandler (e.g., `nomic-embed-text:latest`).
 
+    Long descriptions are split into passages of at most `passage_chars` characters
+    (see rag/passages.py) and every passage gets its own vector, so embedding requests
+    stay uniformly small and nothing is cut out of the middle of a long email thread.
+    Scores are aggregated back to incidents (max, or sum) at query time.
+
     Offline artifacts:
-      - embeddings.npy        : (M, D) embedding matrix (M ≤ total rows if some are skipped)
-      - kept_indices.npy      : (M,) row indices in the original CSV that were embedded
+      - embeddings.npy        : (M, D) embedding matrix, one row per passage
+      - kept_indices.npy      : (M,) CSV row index of each passage (repeated for multi-passage rows)
+      - passage_map.csv       : position, row_index, id, passage, char_start, char_end
       - embedder_meta.json    : metadata including rows_total/rows_kept/rows_skipped/limit, etc.
+      - ../incidents.bundle   : rewritten with the new embeddings when the TF-IDF index exists
 
     Online:
       - Semantic search over all valid rows or a Stage-1 subset via `restrict_indices`.
+
+    Only the description column is loaded up front (from incidents.parquet when the
+    indexer wrote one, see IncidentStore); id / resolution / source_file are read the
+    first time a result or audit row needs them.
     """
 
     def __init__(
@@ -36,6 +51,10 @@ class IncidentEmbedder:
         max_input_chars: int = 8000,
         tail_keep_chars: int = 2000,
         num_ctx: Optional[int] = None,
+        # max characters per passage (0 = one passage per description, head+tail truncated)
+        passage_chars: int = 1500,
+        # characters repeated at the start of the next passage
+        passage_overlap: int = 150,
     ) -> None:
         # Paths
         self.project_root = Path(project_root) if project_root else Path(__file__).resolve().parents[2]
@@ -43,10 +62,15 @@ class IncidentEmbedder:
         self.index_dir = (self.project_root / index_subdir).resolve()
 
         self.incidents_csv = self.proc_dir / "incidents.csv"
+        self.store = IncidentStore(self.proc_dir)
         self.emb_path = self.index_dir / "embeddings.npy"
         self.kept_idx_path = self.index_dir / "kept_indices.npy"
         self.meta_path = self.index_dir / "embedder_meta.json"
         self.skipped_csv = self.index_dir / "skipped_rows.csv"  # optional audit log
+        self.passage_map_csv = self.index_dir / "passage_map.csv"
+        self.bundle_path = self.proc_dir / "incidents.bundle"
+        # the indexer's artifacts (default layout), needed to rewrite the bundle
+        self.tfidf_dir = self.proc_dir / "index"
 
         # Config
         self.model_name = model_name
@@ -55,11 +79,14 @@ class IncidentEmbedder:
         self.max_input_chars = max_input_chars
         self.tail_keep_chars = tail_keep_chars
         self.num_ctx = num_ctx or (int(os.getenv("EMBED_NUM_CTX")) if os.getenv("EMBED_NUM_CTX") else None)
+        self.passage_chars = max(int(passage_chars), 0)
+        self.passage_overlap = max(int(passage_overlap), 0)
 
         # Runtime
-        self.df: Optional[pd.DataFrame] = None
+        self.df: Optional[pd.DataFrame] = None             # description only
+        self.deferred: Dict[str, DeferredColumn] = {}      # id / resolution / source_file, read on first use
         self.emb: Optional[np.ndarray] = None              # (M, D)
-        self.kept_indices: Optional[np.ndarray] = None     # (M,)
+        self.kept_indices: Optional[np.ndarray] = None     # (M,) CSV row per passage vector
         self.model: Optional[EmbeddingHandler] = None
 
         self._load_df()
@@ -102,33 +129,53 @@ class IncidentEmbedder:
         if limit is not None:
             cand_idx = cand_idx[: int(limit)]
 
-        # Prepare texts
-        texts = self.df.iloc[cand_idx]["description"].astype(str).tolist()
+        # Prepare passages (one per description unless it is longer than passage_chars)
+        descs = self.df.iloc[cand_idx]["description"].astype(str).tolist()
+        texts: List[str] = []
+        p_rows: List[int] = []
+        p_spans: List[tuple] = []
+        for i, d in zip(cand_idx, descs):
+            for span in split_passages(d, self.passage_chars, self.passage_overlap):
+                texts.append(d[span[0]:span[1]])
+                p_rows.append(i)
+                p_spans.append(span)
 
-        kept_vecs: List[List[float]] = []
-        kept_idx: List[int] = []
-        skipped: List[int] = []
-        skipped_reasons: List[str] = []
+        vec_by_passage: List[Optional[List[float]]] = [None] * len(texts)
+        failed: Dict[int, str] = {}   # row -> reason
 
         # Batch encode with fallback on failure
         for b in range(0, len(texts), batch_size):
             chunk = texts[b:b + batch_size]
-            chunk_idx = cand_idx[b:b + batch_size]
             try:
                 vecs = self.model.encode_many(chunk)  # fast path
                 for j, v in enumerate(vecs):
-                    kept_vecs.append(v)
-                    kept_idx.append(chunk_idx[j])
+                    vec_by_passage[b + j] = v
             except Exception as e:
-                # Fallback: try per-item; on failure, skip the row
+                # Fallback: try per-item; on failure, skip the passage's row
                 for j, t in enumerate(chunk):
                     try:
-                        v = self.model.encode_one(t)
-                        kept_vecs.append(v)
-                        kept_idx.append(chunk_idx[j])
+                        vec_by_passage[b + j] = self.model.encode_one(t)
                     except Exception as ee:
-                        skipped.append(chunk_idx[j])
-                        skipped_reasons.append(str(ee)[:200])
+                        failed.setdefault(p_rows[b + j], str(ee)[:200])
+
+        # a row is kept only if all of its passages were embedded
+        kept_vecs: List[List[float]] = []
+        kept_idx: List[int] = []
+        kept_map: List[Dict] = []
+        for j, (row, v) in enumerate(zip(p_rows, vec_by_passage)):
+            if row in failed or v is None:
+                continue
+            kept_map.append({
+                "position": len(kept_vecs),
+                "row_index": row,
+                "passage": 0 if not kept_map or kept_map[-1]["row_index"] != row else kept_map[-1]["passage"] + 1,
+                "char_start": p_spans[j][0],
+                "char_end": p_spans[j][1],
+            })
+            kept_vecs.append(v)
+            kept_idx.append(row)
+        skipped: List[int] = list(failed.keys())
+        skipped_reasons: List[str] = list(failed.values())
 
         if not kept_vecs:
             raise RuntimeError("No embeddings were created. All rows failed or were skipped.")
@@ -137,23 +184,26 @@ class IncidentEmbedder:
         if self.normalize:
             vecs = self._l2_normalize(vecs)
 
-        # Persist artifacts
+        # Persist artifacts; on-demand vectors from the previous build go with it
         self.index_dir.mkdir(parents=True, exist_ok=True)
+        LazyEmbeddingStore.discard(self.index_dir)
         np.save(self.emb_path, vecs)
         np.save(self.kept_idx_path, np.asarray(kept_idx, dtype=np.int64))
         self.emb = vecs
         self.kept_indices = np.asarray(kept_idx, dtype=np.int64)
+        passage_map = pd.DataFrame(kept_map)
+        passage_map.insert(2, "id", np.asarray(self.deferred["id"][:], dtype=object)[passage_map["row_index"].to_numpy()])
+        FileWriter.write_csv(passage_map, str(self.passage_map_csv))
 
         # Optional audit file for skipped rows
         if write_skipped_csv and skipped:
             rows = []
             for i, reason in zip(skipped, skipped_reasons or ["error"] * len(skipped)):
-                row = self.df.iloc[i]
                 rows.append({
                     "row_index": i,
-                    "id": row.get("id", ""),
-                    "source_file": row.get("source_file", ""),
-                    "desc_head": str(row.get("description", ""))[:200],
+                    "id": self.deferred["id"][i],
+                    "source_file": self.deferred["source_file"][i],
+                    "desc_head": self.df["description"].iat[i][:200],
                     "reason": reason,
                 })
             audit_df = pd.DataFrame(rows)
@@ -161,13 +211,18 @@ class IncidentEmbedder:
 
         meta = {
             "backend": "ollama",
+            # identifies this build; the lazy side store is stamped with it
+            "build_id": secrets.token_hex(8),
             "model": self.model_name,
             "base_url": self.embed_base_url,
             "normalize": self.normalize,
             "rows_total": n_total,
             "rows_candidate": len(cand_idx),
-            "rows_kept": int(vecs.shape[0]),
+            "rows_kept": int(len(set(kept_idx))),
             "rows_skipped": len(skipped),
+            "passages_kept": int(vecs.shape[0]),
+            "passage_chars": self.passage_chars,
+            "passage_overlap": self.passage_overlap,
             "dim": int(vecs.shape[1]),
             "faiss": False,
             "max_input_chars": self.max_input_chars,
@@ -177,15 +232,25 @@ class IncidentEmbedder:
             "limit": int(limit) if limit is not None else "all",
             "batch_size": int(batch_size),
             "shuffle": bool(shuffle),
-            "note": "embeddings.npy aligns with kept_indices.npy, not the raw CSV row order.",
+            "note": "embeddings.npy aligns with kept_indices.npy (one entry per passage), not the raw CSV row order.",
         }
         FileWriter.write_json(meta, str(self.meta_path), ensure_ascii=False, pretty=True)
 
+        bundle = ""
+        vec_pkl, mat_npz = self.tfidf_dir / "vectorizer.pkl", self.tfidf_dir / "tfidf_csr.npz"
+        if vec_pkl.exists() and mat_npz.exists():
+            bundle = write_index_bundle(
+                self.bundle_path, self.incidents_csv, vec_pkl, mat_npz,
+                emb_npy=self.emb_path, kept_idx_npy=self.kept_idx_path, emb_meta_json=self.meta_path,
+            )["bundle"]
+
         return {
             "embeddings": str(self.emb_path),
             "kept_indices": str(self.kept_idx_path),
+            "passage_map": str(self.passage_map_csv),
             "meta": str(self.meta_path),
             "skipped": str(self.skipped_csv) if skipped else "",
+            "bundle": bundle,
         }
 
     def load_embeddings(self) -> None:
@@ -214,50 +279,50 @@ class IncidentEmbedder:
         if self.normalize:
             q_vec = self._l2_normalize(q_vec.reshape(1, -1)).reshape(-1)
 
-        # Candidate set
+        # Candidate set (passage positions)
         if restrict_indices:
-            pos_map = {orig_idx: pos for pos, orig_idx in enumerate(self.kept_indices.tolist())}
-            candidate_pos = [pos_map[i] for i in restrict_indices if i in pos_map]
-            if not candidate_pos:
+            wanted = np.isin(self.kept_indices, np.asarray(restrict_indices, dtype=np.int64))
+            candidate_pos = np.flatnonzero(wanted)
+            if len(candidate_pos) == 0:
                 return []
-            sub = self.emb[candidate_pos]
-            sims = sub @ q_vec
-            k = min(top_k, sims.shape[0])
-            top_idx = np.argpartition(-sims, k - 1)[:k]
-            order = top_idx[np.argsort(-sims[top_idx])]
-            chosen_pos = [candidate_pos[i] for i in order]
-            scores = sims[order].astype(float).tolist()
+            sims = self.emb[candidate_pos] @ q_vec
+            rows = self.kept_indices[candidate_pos]
         else:
             sims = self.emb @ q_vec
-            k = min(top_k, sims.shape[0])
-            top_idx = np.argpartition(-sims, k - 1)[:k]
-            order = top_idx[np.argsort(-sims[top_idx])]
-            chosen_pos = order.tolist()
-            scores = sims[order].astype(float).tolist()
-
-        chosen_csv_idx = [int(self.kept_indices[pos]) for pos in chosen_pos]
+            rows = self.kept_indices
+
+        # incident score = best passage score
+        uniq, inverse = np.unique(rows, return_inverse=True)
+        best = np.full(len(uniq), -np.inf, dtype=np.float32)
+        np.maximum.at(best, inverse, sims)
+        k = min(top_k, best.shape[0])
+        top_idx = np.argpartition(-best, k - 1)[:k]
+        order = top_idx[np.argsort(-best[top_idx])]
+        chosen_csv_idx = [int(r) for r in uniq[order]]
+        scores = best[order].astype(float).tolist()
 
         out = []
         for csv_i, sc in zip(chosen_csv_idx, scores):
-            row = self.df.iloc[csv_i]
             out.append({
                 "row_index": csv_i,
-                "id": row.get("id", ""),
-                "description": row.get("description", ""),
-                "resolution": row.get("resolution", ""),
-                "source_file": row.get("source_file", ""),
+                "id": self.deferred["id"][csv_i],
+                "description": self.df["description"].iat[csv_i],
+                "resolution": self.deferred["resolution"][csv_i],
+                "source_file": self.deferred["source_file"][csv_i],
                 "score_embed": round(float(sc), 4),
             })
         return out
 
     # ---------------- internals ----------------
     def _load_df(self) -> None:
-        if not self.incidents_csv.exists():
+        if not self.store.exists():
             raise FileNotFoundError(f"incidents.csv not found: {self.incidents_csv}")
-        df = FileReader.read_csv(str(self.incidents_csv)).fillna("")
-        if "description" not in df.columns:
-            raise ValueError("Missing required column 'description' in incidents.csv")
+        try:
+            df = self.store.read(["description"])
+        except ValueError as e:
+            raise ValueError("Missing required column 'description' in incidents.csv") from e
         self.df = df
+        self.deferred = {c: self.store.column(c) for c in ("id", "resolution", "source_file")}
 
     def _init_model(self) -> None:
         self.model = EmbeddingHandler(
@@ -0,0 +1,111 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+
+from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_writer import FileWriter
+
+# incidents.csv schema; text is read verbatim ("NA", "null" stay strings)
+INCIDENT_DTYPES: Dict[str, object] = {
+    "id": str, "description": str, "resolution": str, "source_file": str, "row_index": "int64",
+}
+
+
+class IncidentStore:
+    """
+    Read access to the processed incidents, columnar when possible.
+
+    The indexer writes incidents.csv and, when pyarrow is installed, a typed, zstd
+    compressed copy incidents.parquet. Readers ask for the columns they need: from
+    Parquet only those columns are decoded, and nothing is re-parsed as text. The CSV
+    is used when pyarrow is missing or the Parquet copy is older than the CSV (the CSV
+    was rewritten by something else).
+    """
+
+    def __init__(self, processed_dir: Path) -> None:
+        self.processed_dir = Path(processed_dir)
+        self.csv_path = self.processed_dir / "incidents.csv"
+        self.parquet_path = self.processed_dir / "incidents.parquet"
+
+    # ---------------- public ----------------
+    def exists(self) -> bool:
+        return self.csv_path.exists() or self.columnar()
+
+    def columnar(self) -> bool:
+        """True if reads are served from incidents.parquet."""
+        if not self.parquet_path.exists() or not FileReader.parquet_available():
+            return False
+        if not self.csv_path.exists():
+            return True
+        return self.parquet_path.stat().st_mtime_ns >= self.csv_path.stat().st_mtime_ns
+
+    def read(self, columns: Optional[Sequence[str]] = None) -> pd.DataFrame:
+        """All rows, only `columns` (default: every column)."""
+        columns = list(columns) if columns is not None else None
+        if self.columnar():
+            return FileReader.read_parquet(str(self.parquet_path), columns=columns)
+        return FileReader.read_csv(str(self.csv_path), usecols=columns, **self._csv_kwargs(columns))
+
+    def iter_chunks(self, chunksize: int, columns: Optional[Sequence[str]] = None) -> Iterator[pd.DataFrame]:
+        """All rows, `chunksize` rows at a time."""
+        columns = list(columns) if columns is not None else None
+        if self.columnar():
+            yield from FileReader.iter_parquet(str(self.parquet_path), columns=columns, batch_size=chunksize)
+            return
+        yield from FileReader.read_csv(
+            str(self.csv_path), usecols=columns, chunksize=chunksize, **self._csv_kwargs(columns)
+        )
+
+    def column(self, name: str) -> "DeferredColumn":
+        """One text column, read the first time an item is accessed."""
+        return DeferredColumn(lambda: self.read([name])[name].astype(str).tolist())
+
+    def write_columnar(self, chunksize: int) -> Optional[int]:
+        """
+        Rewrite incidents.parquet from incidents.csv, chunk by chunk. Returns the rows
+        written, or None without pyarrow (a stale Parquet copy is removed then).
+        """
+        if not FileReader.parquet_available():
+            if self.parquet_path.exists():
+                self.parquet_path.unlink()
+            return None
+        chunks = FileReader.read_csv(str(self.csv_path), chunksize=chunksize, **self._csv_kwargs(None))
+        return FileWriter.write_parquet_chunks(chunks, str(self.parquet_path))
+
+    # ---------------- internals ----------------
+    @staticmethod
+    def _csv_kwargs(columns: Optional[List[str]]) -> Dict[str, object]:
+        dtypes = INCIDENT_DTYPES if columns is None else {c: t for c, t in INCIDENT_DTYPES.items() if c in columns}
+        return {"dtype": dtypes, "keep_default_na": False}
+
+
+class DeferredColumn(Sequence):
+    """A list of strings loaded by `loader` on first access (thread-safe)."""
+
+    def __init__(self, loader: Callable[[], List[str]]) -> None:
+        self._loader = loader
+        self._values: Optional[List[str]] = None
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._load())
+
+    def __getitem__(self, i):
+        return self._load()[i]
+
+    @property
+    def loaded(self) -> bool:
+        return self._values is not None
+
+    def _load(self) -> List[str]:
+        if self._values is None:
+            with self._lock:
+                if self._values is None:
+                    self._values = self._loader()
+        return self._values
@@ -3,15 +3,64 @@ import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 
 import hashlib
+import json
+import re
+import time
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
 import joblib
+import numpy as np
 import pandas as pd
+from pandas._libs.parsers import STR_NA_VALUES
 from scipy import sparse
-from typing import Dict, List, Optional, Tuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
 from pathlib import Path
 
 from backend.src.data_io.file_reader import FileReader
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.rag.bundle import write_index_bundle
+from backend.src.rag.incident_store import IncidentStore
+from backend.src.rag.lazy_store import LazyEmbeddingStore
+from backend.src.rag.near_dup import MinHashDeduper, summarize_groups
+from backend.src.rag.text_features import FieldPrefixedAnalyzer, HashedTfidfTransformer
 from sklearn.feature_extraction.text import TfidfVectorizer
 
+# fields stacked into the TF-IDF index by default
+DEFAULT_FIELDS: Tuple[str, ...] = ("description", "resolution")
+
+# bump when extraction / cleaning rules change so cached per-workbook rows are rebuilt
+EXTRACT_VERSION = 1
+CSV_COLUMNS = ["id", "description", "resolution", "source_file", "row_index"]
+
+# any character str.isalnum() accepts
+_ALNUM = re.compile(r"[^\W_]")
+
+# e-mail boilerplate IncidentIndexer._strip_boilerplate can remove (see `boilerplate`)
+BOILERPLATE_RULES: Tuple[str, ...] = ("quoted", "headers", "signature", "footer")
+_REPLY_HEADER = re.compile(r"(?:from|sent|to|cc|bcc|subject|date|importance)\s*:", re.I)
+_REPLY_SEPARATOR = re.compile(
+    r"(?:-{2,}\s*(?:original message|forwarded message)\s*-{2,}|_{8,}|on\s.{4,200}\swrote:)$", re.I
+)
+_SIGN_OFF = re.compile(
+    r"(?:(?:best|kind|warm|warmest)\s+regards|regards|thanks\s*(?:and|&)\s*regards|many\s+thanks|thanks"
+    r"|thank\s+you|sincerely|cheers|br|sent\s+from\s+my\s+\w+(?:\s+\w+)?)[\s,.!]*$",
+    re.I,
+)
+_LEGAL_FOOTER = re.compile(
+    r"this\s+(?:e-?mail|message|communication)\b.{0,80}\b(?:confidential|privileged)"
+    r"|confidentiality\s+notice"
+    r"|intended\s+(?:solely|only)\s+for\s+the\s+(?:use\s+of\s+the\s+)?(?:addressee|individual|recipient)"
+    r"|if\s+you\s+(?:have\s+)?received\s+this\s+(?:e-?mail|message|communication)\s+in\s+error"
+    r"|please\s+consider\s+the\s+environment\s+before\s+printing",
+    re.I,
+)
+# a signature is the sign-off plus at most this many following lines of at most this length
+_SIGNATURE_MAX_LINES = 6
+_SIGNATURE_LINE_CHARS = 60
+
+DESC_CANDIDATES = ["Description", "description", "DESC", "Desc"]
+RESO_CANDIDATES = ["Resolution__c", "resolution", "Resolution", "RESOLUTION"]
+
 
 class IncidentIndexer:
     """
@@ -19,6 +68,23 @@ class IncidentIndexer:
     extract two columns (Description, Resolution__c),
     and compile them into a normalized CSV file.
     Optionally, build a TF-IDF index for text retrieval.
+
+    Ingestion is incremental: processed/ingest/manifest.json records every workbook's
+    size, mtime, content hash and produced row ids, and the cleaned rows of each workbook
+    are cached as processed/ingest/<workbook>.csv. Unchanged workbooks are not re-read.
+
+    Workbooks that do need reading are handled on a process pool: each worker streams its
+    sheet in openpyxl read-only mode, cleans / validates the two resolved columns and writes
+    the ingest cache itself. incidents.csv is then assembled from the caches in chunks, so
+    the parent's memory does not grow with the number of workbooks.
+
+    With `boilerplate` set, quoted reply history, reply headers, signatures and legal
+    footers are stripped from e-mail text after cleaning (_strip_boilerplate); the bytes
+    removed are recorded per workbook and reported by run().
+
+    With pyarrow installed, a typed, compressed incidents.parquet copy is written next to
+    incidents.csv; the TF-IDF build, the embedder and the searcher read it through
+    IncidentStore, decoding only the columns they use.
     """
 
     def __init__(
@@ -27,6 +93,26 @@ class IncidentIndexer:
         raw_subdir: str = "src/data/raw",
         processed_subdir: str = "src/data/processed",
         index_subdir: str = "src/data/processed/index",
+        # processes parsing changed workbooks in parallel (1 = parse inline)
+        workers: Optional[int] = None,
+        # rows per chunk when streaming cached rows into incidents.csv
+        chunk_size: int = 5000,
+        # collapse near-duplicate incidents whose estimated Jaccard similarity (MinHash
+        # over word 3-grams of description + resolution) is >= this; None disables
+        near_dup_threshold: Optional[float] = None,
+        # MinHash signature length for the near-duplicate stage
+        near_dup_num_perm: int = 64,
+        # TF-IDF build: "vocab" (in-memory TfidfVectorizer) or "hashed" (out-of-core,
+        # HashingVectorizer + streamed document frequencies; see build_hashed_tfidf_index)
+        tfidf_mode: str = "vocab",
+        # hashed columns in "hashed" mode
+        hash_features: int = 2 ** 20,
+        # e-mail boilerplate stripped from description / resolution before validation: any
+        # of BOILERPLATE_RULES ("quoted", "headers", "signature", "footer"); () disables
+        boilerplate: Sequence[str] = (),
+        # write processed/incidents.bundle (the searcher's memory-mapped cold-start file)
+        # after every TF-IDF build; it holds the matrix in memory once while writing
+        write_bundle: bool = True,
     ) -> None:
         # .../backend/src/rag/indexer.py -> parents[2] == .../backend
         self.project_root = Path(project_root) if project_root else Path(__file__).resolve().parents[2]
@@ -38,6 +124,27 @@ class IncidentIndexer:
             p.mkdir(parents=True, exist_ok=True)
 
         self.processed_csv = self.processed_dir / "incidents.csv"
+        self.store = IncidentStore(self.processed_dir)
+        self.ingest_dir = self.processed_dir / "ingest"
+        self.manifest_json = self.ingest_dir / "manifest.json"
+        self.dup_groups_csv = self.processed_dir / "duplicate_groups.csv"
+        self.workers = max(int(workers or min(os.cpu_count() or 1, 8)), 1)
+        self.chunk_size = max(int(chunk_size), 1)
+        self.near_dup_threshold = near_dup_threshold
+        self.near_dup_num_perm = int(near_dup_num_perm)
+        if tfidf_mode not in ("vocab", "hashed"):
+            raise ValueError(f"tfidf_mode must be 'vocab' or 'hashed', got {tfidf_mode!r}")
+        self.tfidf_mode = tfidf_mode
+        self.hash_features = int(hash_features)
+        unknown = set(boilerplate) - set(BOILERPLATE_RULES)
+        if unknown:
+            raise ValueError(f"unknown boilerplate rules {sorted(unknown)}; expected any of {BOILERPLATE_RULES}")
+        self.boilerplate: Tuple[str, ...] = tuple(r for r in BOILERPLATE_RULES if r in set(boilerplate))
+        self.write_bundle = bool(write_bundle)
+        self.bundle_path = self.processed_dir / "incidents.bundle"
+
+        # filled by stream_processed_csv, reported by run()
+        self.last_ingest: Dict[str, object] = {}
 
     # ------------------------------------------------------------------
     def build_processed_csv(
@@ -53,52 +160,179 @@ class IncidentIndexer:
             Normalized DataFrame with columns:
             id, description, resolution, source_file, row_index
         """
-        excel_files = self._collect_excels(only_files)
-        frames: List[pd.DataFrame] = []
+        self.stream_processed_csv(only_files=only_files, drop_duplicates=drop_duplicates)
+        return self.store.read()
 
-        for xf in excel_files:
-            df = self._read_xlsx(xf)
-            if df is None or df.empty:
-                continue
-
-            # Clean column names to avoid trailing/leading spaces issues
-            df.columns = [str(c).strip() for c in df.columns]
+    def stream_processed_csv(
+        self,
+        only_files: Optional[List[str]] = None,
+        drop_duplicates: bool = True,
+    ) -> int:
+        """
+        Same output as build_processed_csv, without materializing the corpus:
 
-            # Robust column resolution (case-insensitive + contains fallback)
-            col_desc = self._resolve_col(df, ["Description", "description", "DESC", "Desc"])
-            col_reso = self._resolve_col(df, ["Resolution__c", "resolution", "Resolution", "RESOLUTION"])
-            if col_desc is None or col_reso is None:
-                continue
+            workbooks --(workers: read -> clean -> validate)--> ingest/<workbook>.csv
+            ingest caches --(chunks)--> dedupe on content hashes --(chunks)--> incidents.csv
 
-            sub = df[[col_desc, col_reso]].copy()
-            sub.columns = ["description", "resolution"]
+        The main process holds one chunk of `chunk_size` rows plus a 16-byte digest per
+        distinct (description, resolution) pair. Returns the number of rows written.
 
-            # Normalize/clean text
-            sub["description"] = sub["description"].map(self._clean_text)
-            sub["resolution"] = sub["resolution"].map(self._clean_text)
+        With `near_dup_threshold` set, a MinHash/LSH pass then keeps only the earliest row
+        of each near-duplicate group and records the others in duplicate_groups.csv.
+        Finally the columnar copy (incidents.parquet) is rewritten from incidents.csv and
+        the embeddings' lazy side store (keyed by row number) is discarded.
+        """
+        excel_files = self._collect_excels(only_files)
+        manifest = self._load_manifest()
+        reused: List[str] = []
+        extracted: List[str] = []
 
-            # Drop invalid/garbage rows (empty, placeholders, too short, low-ascii ratio)
-            sub = sub[sub["description"].apply(self._is_valid_text) & sub["resolution"].apply(self._is_valid_text)]
-            if sub.empty:
+        stale = [xf for xf in excel_files if not self._cache_valid(xf, manifest.get(xf.name))]
+        results = self._ingest_workbooks(stale)
+        timings: Dict[str, Dict[str, object]] = {}
+        for xf in excel_files:
+            res = results.get(xf.name)
+            if res is None:
+                reused.append(xf.name)
                 continue
+            manifest[xf.name] = self._manifest_entry(xf, res)
+            extracted.append(xf.name)
+            timings[xf.name] = {k: res[k] for k in ("mode", "parse_s", "clean_s", "rows", "boilerplate_bytes")}
+
+        if not only_files:
+            # forget workbooks that were removed from raw/
+            present = {xf.name for xf in excel_files}
+            for name in [n for n in manifest if n not in present]:
+                cache = self.ingest_dir / manifest.pop(name).get("cache", "")
+                if cache.is_file():
+                    cache.unlink()
+        self._save_manifest(manifest)
+
+        chunks = self._iter_cached_chunks([manifest[xf.name] for xf in excel_files])
+        if drop_duplicates:
+            chunks = self._dedupe_chunks(chunks)
+        n_rows, n_read = self._write_chunks(chunks, self.processed_csv)
+
+        self.last_ingest = {
+            "files_reused": reused,
+            "files_extracted": extracted,
+            "timings": timings,
+            "rows": n_rows,
+            "duplicates_dropped": n_read - n_rows,
+        }
+        if self.boilerplate:
+            entries = [manifest[xf.name] for xf in excel_files]
+            removed = sum(int(e.get("boilerplate_bytes", 0)) for e in entries)
+            kept = sum(int(e.get("text_bytes", 0)) for e in entries)
+            self.last_ingest["boilerplate"] = {
+                "rules": list(self.boilerplate),
+                "bytes_removed": removed,
+                "bytes_kept": kept,
+                "removed_ratio": round(removed / max(removed + kept, 1), 4),
+            }
+        if self.near_dup_threshold is not None and n_rows:
+            near = self._collapse_near_duplicates()
+            n_rows = near["rows"] - near["duplicates"]
+            self.last_ingest["rows"] = n_rows
+            self.last_ingest["near_duplicates"] = near
+        elif self.dup_groups_csv.exists():
+            self.dup_groups_csv.unlink()  # stale mapping from an earlier near-dup run
+
+        t0 = time.perf_counter()
+        if n_rows and self.store.write_columnar(self.chunk_size) is not None:
+            self.last_ingest["columnar"] = {
+                "path": str(self.store.parquet_path),
+                "bytes": self.store.parquet_path.stat().st_size,
+                "csv_bytes": self.processed_csv.stat().st_size,
+                "elapsed_s": round(time.perf_counter() - t0, 3),
+            }
+        elif self.store.parquet_path.exists():
+            self.store.parquet_path.unlink()
+        # on-demand embeddings are keyed by incidents.csv row number, which just changed
+        LazyEmbeddingStore.discard(self.processed_dir / "embeddings")
+        return n_rows
+
+    def _collapse_near_duplicates(self) -> Dict[str, object]:
+        """
+        Two streaming passes over incidents.csv: MinHash signatures (4 * num_perm bytes per
+        row), then a rewrite keeping canonical rows only. Writes duplicate_groups.csv:
+            canonical_id, id, similarity   (one line per collapsed row)
+        """
+        t0 = time.perf_counter()
+        dedup = MinHashDeduper(threshold=float(self.near_dup_threshold), num_perm=self.near_dup_num_perm)
+        sigs: List[np.ndarray] = []
+        ids: List[str] = []
+        for chunk in self._read_cache_csv(self.processed_csv, chunksize=self.chunk_size):
+            sigs.append(dedup.signatures((chunk["description"] + "\n" + chunk["resolution"]).tolist()))
+            ids.extend(chunk["id"].tolist())
+        canon, sim = dedup.groups(np.vstack(sigs))
+        keep = canon == np.arange(len(canon))
+
+        dup = np.flatnonzero(~keep)
+        id_arr = np.asarray(ids, dtype=object)
+        groups = pd.DataFrame({
+            "canonical_id": id_arr[canon[dup]],
+            "id": id_arr[dup],
+            "similarity": sim[dup].round(4),
+        })
+        FileWriter.write_csv(groups, str(self.dup_groups_csv))
+
+        def kept_chunks() -> Iterator[pd.DataFrame]:
+            off = 0
+            for chunk in self._read_cache_csv(self.processed_csv, chunksize=self.chunk_size):
+                yield chunk[keep[off:off + len(chunk)]]
+                off += len(chunk)
+
+        self._write_chunks(kept_chunks(), self.processed_csv)
+        out: Dict[str, object] = summarize_groups(canon)
+        out.update({
+            "threshold": float(self.near_dup_threshold),
+            "bands": dedup.bands,
+            "num_perm": dedup.num_perm,
+            "mapping": str(self.dup_groups_csv),
+            "elapsed_s": round(time.perf_counter() - t0, 3),
+        })
+        return out
 
-            # Add metadata
-            sub["source_file"] = xf.name
-            sub["row_index"] = sub.index.astype(int)
-            sub["id"] = sub.apply(lambda r: self._make_id(r["source_file"], int(r["row_index"])), axis=1)
-
-            frames.append(sub[["id", "description", "resolution", "source_file", "row_index"]])
-
-        if not frames:
-            out = pd.DataFrame(columns=["id", "description", "resolution", "source_file", "row_index"])
-        else:
-            out = pd.concat(frames, ignore_index=True)
+    # ---------------- streaming stages ----------------
+    def _iter_cached_chunks(self, entries: List[Dict]) -> Iterator[pd.DataFrame]:
+        """Cached workbook rows, in workbook order, `chunk_size` rows at a time."""
+        for entry in entries:
+            if not entry.get("rows"):
+                continue
+            yield from self._read_cache_csv(self.ingest_dir / entry["cache"], chunksize=self.chunk_size)
 
-        if drop_duplicates and not out.empty:
-            out = out.drop_duplicates(subset=["description", "resolution"], keep="first").reset_index(drop=True)
+    @staticmethod
+    def _dedupe_chunks(chunks: Iterable[pd.DataFrame]) -> Iterator[Tuple[pd.DataFrame, int]]:
+        """
+        Drop rows whose (description, resolution) was already seen, keeping the first
+        occurrence (same result as drop_duplicates(keep="first") on the concatenation).
+        Yields (kept rows, rows read).
+        """
+        seen: set = set()
+        for chunk in chunks:
+            keep = []
+            for d, r in zip(chunk["description"], chunk["resolution"]):
+                key = hashlib.md5(f"{len(d)}:{d}{r}".encode("utf-8")).digest()
+                keep.append(key not in seen)
+                seen.add(key)
+            yield chunk[keep], len(chunk)
 
-        out.to_csv(self.processed_csv, index=False, encoding="utf-8")
-        return out
+    @staticmethod
+    def _write_chunks(chunks: Iterable, path: Path) -> Tuple[int, int]:
+        """Write chunks (frames or (frame, rows read) pairs) to `path`; returns (written, read)."""
+        tmp = path.with_name(path.name + ".tmp")
+        written = read = 0
+        pd.DataFrame(columns=CSV_COLUMNS).to_csv(tmp, index=False, encoding="utf-8")
+        for chunk in chunks:
+            chunk, n_read = chunk if isinstance(chunk, tuple) else (chunk, len(chunk))
+            read += n_read
+            if chunk.empty:
+                continue
+            chunk[CSV_COLUMNS].to_csv(tmp, mode="a", header=False, index=False, encoding="utf-8")
+            written += len(chunk)
+        os.replace(tmp, path)
+        return written, read
 
     # ------------------------------------------------------------------
     def build_tfidf_index(
@@ -108,44 +342,375 @@ class IncidentIndexer:
         min_df: int = 1,
         max_df: float = 0.9,
         ngram_range: Tuple[int, int] = (1, 2),
+        fields: Optional[Sequence[str]] = DEFAULT_FIELDS,
+        mode: Optional[str] = None,
     ) -> Dict[str, str]:
         """
         Create baseline TF-IDF index artifacts:
             vectorizer.pkl
             tfidf_csr.npz
             mapping.csv  (row_id ↔ id/source_file)
+            index_meta.json
+
+        With `fields` (default: description + resolution) the index is one stacked matrix
+        whose features are field-prefixed n-grams ("description:ejector",
+        "resolution:reset palette"), built by a single vectorizer so all fields share one
+        vocabulary and one IDF pass. IncidentSearcher applies per-field weights to the
+        query vector, so scoring every field is still a single sparse product.
+        Pass fields=None to index only `text_col` (legacy single-field layout).
+
+        mode="hashed" (default: the indexer's `tfidf_mode`) streams incidents.csv through
+        build_hashed_tfidf_index instead; `df` is not used then.
         """
+        if (mode or self.tfidf_mode) == "hashed":
+            return self.build_hashed_tfidf_index(
+                text_col=text_col, min_df=min_df, max_df=max_df, ngram_range=ngram_range, fields=fields,
+            )
         if df is None:
-            if not self.processed_csv.exists():
+            if not self.store.exists():
                 raise FileNotFoundError(f"Processed CSV not found: {self.processed_csv}")
-            df = pd.read_csv(self.processed_csv).fillna("")
+            df = self.store.read(list(fields or (text_col,)) + ["id", "source_file", "row_index"])
         if df.empty:
             return {"warning": "processed DataFrame is empty."}
 
-        texts = df[text_col].astype(str).tolist()
-        vec = TfidfVectorizer(min_df=min_df, max_df=max_df, ngram_range=ngram_range)
-        mat = vec.fit_transform(texts)
+        if fields:
+            fields = tuple(fields)
+            docs = list(zip(*(df[f].astype(str).tolist() for f in fields)))
+            analyzer = FieldPrefixedAnalyzer(fields=fields, ngram_range=ngram_range)
+            vec = TfidfVectorizer(min_df=min_df, max_df=max_df, analyzer=analyzer)
+            mat = vec.fit_transform(docs)
+        else:
+            texts = df[text_col].astype(str).tolist()
+            vec = TfidfVectorizer(min_df=min_df, max_df=max_df, ngram_range=ngram_range)
+            mat = vec.fit_transform(texts)
 
         self.index_dir.mkdir(parents=True, exist_ok=True)
         vec_path = self.index_dir / "vectorizer.pkl"
         mat_path = self.index_dir / "tfidf_csr.npz"
         map_path = self.index_dir / "mapping.csv"
+        meta_path = self.index_dir / "index_meta.json"
 
         joblib.dump(vec, vec_path)
         sparse.save_npz(mat_path, mat)
         df[["id", "source_file", "row_index"]].to_csv(map_path, index=False, encoding="utf-8")
+        FileWriter.write_json({
+            "mode": "multi_field" if fields else "single_field",
+            "fields": list(fields) if fields else [text_col],
+            "ngram_range": list(ngram_range),
+            "n_rows": int(mat.shape[0]),
+            "n_features": int(mat.shape[1]),
+            "nnz": int(mat.nnz),
+        }, str(meta_path))
+
+        result = {"vectorizer": str(vec_path), "matrix": str(mat_path), "mapping": str(map_path), "meta": str(meta_path)}
+        result.update(self._maybe_write_bundle())
+        return result
+
+    def build_hashed_tfidf_index(
+        self,
+        text_col: str = "description",
+        min_df: int = 1,
+        max_df: float = 0.9,
+        ngram_range: Tuple[int, int] = (1, 2),
+        fields: Optional[Sequence[str]] = DEFAULT_FIELDS,
+    ) -> Dict[str, str]:
+        """
+        Out-of-core TF-IDF build: same artifacts as build_tfidf_index, but memory stays
+        flat in the corpus size (one chunk of rows + two n_features vectors).
+
+          pass 1: incidents.csv chunks -> hashed term counts, appended to raw files on disk,
+                  document frequencies accumulated; mapping.csv written as we go
+          pass 2: counts re-read block by block through np.memmap, weighted by IDF and
+                  L2-normalized, appended to the final CSR arrays on disk
+          save  : the arrays are streamed into tfidf_csr.npz (the layout sparse.load_npz
+                  reads), vectorizer.pkl holds a HashedTfidfTransformer for the query side
+        """
+        if not self.store.exists():
+            raise FileNotFoundError(f"Processed CSV not found: {self.processed_csv}")
+        fields = tuple(fields) if fields else None
+        vec = HashedTfidfTransformer(fields=fields, ngram_range=ngram_range, n_features=self.hash_features)
 
-        return {"vectorizer": str(vec_path), "matrix": str(mat_path), "mapping": str(map_path)}
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        vec_path = self.index_dir / "vectorizer.pkl"
+        mat_path = self.index_dir / "tfidf_csr.npz"
+        map_path = self.index_dir / "mapping.csv"
+        meta_path = self.index_dir / "index_meta.json"
+        tmp_dir = self.index_dir / "hashed_tmp"
+        tmp_dir.mkdir(parents=True, exist_ok=True)
+        raw = {k: tmp_dir / f"counts.{k}" for k in ("data", "indices", "nnz")}
+        out = {k: tmp_dir / f"tfidf.{k}" for k in ("data", "indices", "indptr")}
+
+        try:
+            # ---- pass 1: counts + document frequencies ----
+            n_rows = 0
+            pd.DataFrame(columns=["id", "source_file", "row_index"]).to_csv(map_path, index=False, encoding="utf-8")
+            with open(raw["data"], "wb") as f_data, open(raw["indices"], "wb") as f_idx, open(raw["nnz"], "wb") as f_nnz:
+                columns = list(fields or (text_col,)) + ["id", "source_file", "row_index"]
+                for chunk in self.store.iter_chunks(self.chunk_size, columns):
+                    if fields:
+                        docs = list(zip(*(chunk[f].astype(str).tolist() for f in fields)))
+                    else:
+                        docs = chunk[text_col].astype(str).tolist()
+                    counts = vec.counts(docs)
+                    vec.update_df(counts)
+                    counts.data.astype(np.float32).tofile(f_data)
+                    counts.indices.astype(np.int32).tofile(f_idx)
+                    np.diff(counts.indptr).astype(np.int64).tofile(f_nnz)
+                    chunk[["id", "source_file", "row_index"]].to_csv(
+                        map_path, mode="a", header=False, index=False, encoding="utf-8"
+                    )
+                    n_rows += len(chunk)
+            if n_rows == 0:
+                return {"warning": "processed DataFrame is empty."}
+            vec.finalize(min_df=min_df, max_df=max_df)
+
+            # ---- pass 2: IDF weighting + row normalization, block by block ----
+            row_nnz = np.fromfile(raw["nnz"], dtype=np.int64)
+            starts = np.zeros(n_rows + 1, dtype=np.int64)
+            np.cumsum(row_nnz, out=starts[1:])
+            total = int(starts[-1])
+            c_data = np.memmap(raw["data"], dtype=np.float32, mode="r", shape=(total,)) if total else np.zeros(0, np.float32)
+            c_idx = np.memmap(raw["indices"], dtype=np.int32, mode="r", shape=(total,)) if total else np.zeros(0, np.int32)
+            indptr = np.zeros(n_rows + 1, dtype=np.int64)
+            with open(out["data"], "wb") as f_data, open(out["indices"], "wb") as f_idx:
+                for lo in range(0, n_rows, self.chunk_size):
+                    hi = min(lo + self.chunk_size, n_rows)
+                    a, b = starts[lo], starts[hi]
+                    block = sparse.csr_matrix(
+                        (np.array(c_data[a:b]), np.array(c_idx[a:b]), starts[lo:hi + 1] - a),
+                        shape=(hi - lo, vec.n_features),
+                    )
+                    block = vec.weight(block)
+                    block.data.astype(np.float32).tofile(f_data)
+                    block.indices.astype(np.int32).tofile(f_idx)
+                    indptr[lo + 1:hi + 1] = indptr[lo] + block.indptr[1:]
+            del c_data, c_idx
+            nnz = int(indptr[-1])
+
+            # ---- save: stream the on-disk arrays into tfidf_csr.npz ----
+            _write_csr_npz(
+                mat_path,
+                shape=(n_rows, vec.n_features),
+                data=np.memmap(out["data"], dtype=np.float32, mode="r", shape=(nnz,)) if nnz else np.zeros(0, np.float32),
+                indices=np.memmap(out["indices"], dtype=np.int32, mode="r", shape=(nnz,)) if nnz else np.zeros(0, np.int32),
+                indptr=indptr,
+            )
+        finally:
+            for path in list(raw.values()) + list(out.values()):
+                if path.exists():
+                    path.unlink()
+            if tmp_dir.exists() and not any(tmp_dir.iterdir()):
+                tmp_dir.rmdir()
+
+        joblib.dump(vec, vec_path)
+        FileWriter.write_json({
+            "mode": "multi_field" if fields else "single_field",
+            "fields": list(fields) if fields else [text_col],
+            "ngram_range": list(ngram_range),
+            "vectorizer": "hashed",
+            "n_rows": int(n_rows),
+            "n_features": int(vec.n_features),
+            "nnz": nnz,
+            "chunk_size": self.chunk_size,
+        }, str(meta_path))
+
+        result = {"vectorizer": str(vec_path), "matrix": str(mat_path), "mapping": str(map_path), "meta": str(meta_path)}
+        result.update(self._maybe_write_bundle())
+        return result
 
     # ------------------------------------------------------------------
     # Helper methods
     # ------------------------------------------------------------------
+    def _maybe_write_bundle(self) -> Dict[str, str]:
+        """incidents.bundle from the index just built (+ embeddings/ if the embedder ran)."""
+        if not self.write_bundle:
+            return {}
+        emb_dir = self.processed_dir / "embeddings"
+        info = write_index_bundle(
+            self.bundle_path,
+            incidents_csv=self.processed_csv,
+            vectorizer_pkl=self.index_dir / "vectorizer.pkl",
+            matrix_npz=self.index_dir / "tfidf_csr.npz",
+            emb_npy=emb_dir / "embeddings.npy",
+            kept_idx_npy=emb_dir / "kept_indices.npy",
+            emb_meta_json=emb_dir / "embedder_meta.json",
+        )
+        return {"bundle": info["bundle"]}
+
     def _collect_excels(self, only_files: Optional[List[str]] = None) -> List[Path]:
         if only_files:
             return [self.raw_dir / f for f in only_files if (self.raw_dir / f).exists()]
         return sorted([p for p in self.raw_dir.glob("*.xlsx") if p.is_file()])
 
-    def _read_xlsx(self, path: Path) -> Optional[pd.DataFrame]:
+    def _ingest_workbooks(self, files: List[Path]) -> Dict[str, Dict[str, Any]]:
+        """
+        Read, clean and validate workbooks into their ingest caches, across a process pool
+        when there is more than one file. Returns {file name: _ingest_workbook result}.
+        """
+        if not files:
+            return {}
+        self.ingest_dir.mkdir(parents=True, exist_ok=True)
+        jobs = [(str(xf), str(self.ingest_dir / f"{xf.name}.csv"), self.boilerplate) for xf in files]
+        workers = min(self.workers, len(files))
+        if workers <= 1:
+            results = [_ingest_workbook(job) for job in jobs]
+        else:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                results = list(pool.map(_ingest_workbook, jobs))
+        return {xf.name: res for xf, res in zip(files, results)}
+
+    @staticmethod
+    def _extract_workbook(
+        xf: Path, parsed: Dict[str, Any], boilerplate: Sequence[str] = ()
+    ) -> Tuple[Optional[pd.DataFrame], Dict[str, int]]:
+        """
+        Cleaned, validated rows of one workbook (None if unusable), plus the UTF-8 bytes of
+        text kept and of boilerplate removed from those rows.
+        """
+        stats = {"text_bytes": 0, "boilerplate_bytes": 0}
+        if parsed["status"] == "ok":
+            sub = pd.DataFrame(
+                {"description": parsed["description"], "resolution": parsed["resolution"]},
+                index=pd.Index(parsed["rows"], dtype="int64"),
+            )
+        elif parsed["status"] == "fallback":
+            # header layout the streaming reader does not mirror exactly: full pandas load
+            sub = IncidentIndexer._read_columns_pandas(xf)
+        else:
+            return None, stats
+        if sub is None or sub.empty:
+            return None, stats
+
+        # Normalize/clean text (per value on purpose: str.split/strip run in C and beat a
+        # whitespace regex over the column ~5x; see bench/bench_ingest_clean.py)
+        sub["description"] = sub["description"].map(IncidentIndexer._clean_text)
+        sub["resolution"] = sub["resolution"].map(IncidentIndexer._clean_text)
+
+        valid = IncidentIndexer._valid_mask
+        before = {}
+        if boilerplate:
+            strip = IncidentIndexer._strip_boilerplate
+            for col in ("description", "resolution"):
+                before[col] = sub[col]
+                stripped = sub[col].map(lambda t: strip(t, boilerplate))
+                # stripping never drops a row: text that would not survive validation stays as it was
+                sub[col] = stripped.where(valid(stripped), sub[col])
+
+        # Drop invalid/garbage rows (empty, placeholders, too short, low-ascii ratio)
+        sub = sub[valid(sub["description"]) & valid(sub["resolution"])]
+        if sub.empty:
+            return None, stats
+        for col in ("description", "resolution"):
+            kept = int(sub[col].str.encode("utf-8").str.len().sum())
+            stats["text_bytes"] += kept
+            if col in before:
+                stats["boilerplate_bytes"] += int(before[col][sub.index].str.encode("utf-8").str.len().sum()) - kept
+
+        # Add metadata
+        sub["source_file"] = xf.name
+        sub["row_index"] = sub.index.astype(int)
+        sub["id"] = IncidentIndexer._make_ids(xf.name, sub["row_index"].tolist())
+
+        return sub[CSV_COLUMNS], stats
+
+    @staticmethod
+    def _read_columns_pandas(xf: Path) -> Optional[pd.DataFrame]:
+        """Full-load reference path: pandas read_excel, then pick the two columns."""
+        df = IncidentIndexer._read_xlsx(xf)
+        if df is None or df.empty:
+            return None
+
+        # Clean column names to avoid trailing/leading spaces issues
+        df.columns = [str(c).strip() for c in df.columns]
+
+        # Robust column resolution (case-insensitive + contains fallback)
+        col_desc = IncidentIndexer._resolve_col(df, DESC_CANDIDATES)
+        col_reso = IncidentIndexer._resolve_col(df, RESO_CANDIDATES)
+        if col_desc is None or col_reso is None:
+            return None
+
+        sub = df[[col_desc, col_reso]].copy()
+        sub.columns = ["description", "resolution"]
+        return sub
+
+    # ---------------- ingest manifest / per-workbook cache ----------------
+    def _load_manifest(self) -> Dict[str, Dict]:
+        if not self.manifest_json.exists():
+            return {}
+        try:
+            data = json.loads(self.manifest_json.read_text(encoding="utf-8"))
+        except ValueError:
+            return {}
+        if data.get("extract_version") != EXTRACT_VERSION:
+            return {}
+        if data.get("boilerplate", []) != list(self.boilerplate):
+            return {}  # cached rows were cleaned with other boilerplate rules
+        return dict(data.get("files", {}))
+
+    def _save_manifest(self, files: Dict[str, Dict]) -> None:
+        self.ingest_dir.mkdir(parents=True, exist_ok=True)
+        FileWriter.write_json(
+            {"extract_version": EXTRACT_VERSION, "boilerplate": list(self.boilerplate), "files": files},
+            str(self.manifest_json),
+        )
+
+    def _cache_valid(self, xf: Path, entry: Optional[Dict]) -> bool:
+        """
+        True if the rows cached for `xf` are current (the workbook is unchanged since it was
+        extracted). size + mtime is the fast path; on a mismatch the content hash decides
+        (touching a file or copying it around does not force a re-read).
+        """
+        if not entry:
+            return False
+        cache = self.ingest_dir / entry.get("cache", "")
+        if not cache.is_file():
+            return False
+        st = xf.stat()
+        if st.st_size != entry.get("size"):
+            return False
+        if st.st_mtime != entry.get("mtime"):
+            if self._file_hash(xf) != entry.get("sha256"):
+                return False
+            entry["mtime"] = st.st_mtime
+        return True
+
+    def _manifest_entry(self, xf: Path, res: Dict[str, Any]) -> Dict[str, object]:
+        """Manifest entry for a workbook whose rows a worker just cached."""
+        st = xf.stat()
+        return {
+            "path": str(xf),
+            "size": st.st_size,
+            "mtime": st.st_mtime,
+            "sha256": self._file_hash(xf),
+            "cache": Path(res["cache"]).name,
+            "rows": int(res["rows"]),
+            "text_bytes": int(res["text_bytes"]),
+            "boilerplate_bytes": int(res["boilerplate_bytes"]),
+            "row_ids": res["row_ids"],
+            "extracted_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+
+    @staticmethod
+    def _read_cache_csv(path: Path, chunksize: Optional[int] = None):
+        # keep_default_na=False: cached text such as "NA" or "null" must come back verbatim
+        return pd.read_csv(
+            path,
+            dtype={"id": str, "description": str, "resolution": str, "source_file": str, "row_index": "int64"},
+            keep_default_na=False,
+            encoding="utf-8",
+            chunksize=chunksize,
+        )
+
+    @staticmethod
+    def _file_hash(path: Path, chunk_size: int = 1 << 20) -> str:
+        h = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    @staticmethod
+    def _read_xlsx(path: Path) -> Optional[pd.DataFrame]:
         """Always use FileReader.read_xlsx with openpyxl engine."""
         try:
             return FileReader.read_xlsx(str(path), header=0, dtype=str).fillna("")
@@ -158,19 +723,7 @@ class IncidentIndexer:
         Resolve a column by exact (case-insensitive) match first,
         then fallback to contains-based fuzzy matching.
         """
-        # exact (case-insensitive)
-        cols_lower = {c.lower(): c for c in df.columns}
-        for name in candidates:
-            key = name.lower()
-            if key in cols_lower:
-                return cols_lower[key]
-        # contains fallback (handle trailing spaces or slight variations)
-        for c in df.columns:
-            cl = c.strip().lower()
-            for cand in candidates:
-                if cand.lower() in cl or cl in cand.lower():
-                    return c
-        return None
+        return _resolve_name(list(df.columns), candidates)
 
     @staticmethod
     def _clean_text(v) -> str:
@@ -190,6 +743,57 @@ class IncidentIndexer:
         s = "\n".join(ln.strip() for ln in s.split("\n") if ln.strip())
         return s.strip()
 
+    @staticmethod
+    def _strip_boilerplate(text: str, rules: Sequence[str] = BOILERPLATE_RULES) -> str:
+        """
+        Remove e-mail boilerplate from cleaned text (one stripped, non-empty line per line):
+          - quoted   : lines quoted with '>'
+          - headers  : reply header blocks (2+ consecutive From:/Sent:/To:/Cc:/Subject:/Date:
+                       lines, one of them From:), '-----Original Message-----' separators,
+                       'On ... wrote:' lines
+          - signature: a sign-off line ('Best regards,', 'Thanks,', ...) and the short lines
+                       after it (name, title, company, phone), up to the next reply header
+          - footer   : confidentiality / legal disclaimer lines
+        The unquoted text of earlier messages in a thread is kept: it is often where the
+        problem was first described.
+        """
+        if not text:
+            return text
+        lines = text.split("\n")
+        n = len(lines)
+        drop = [False] * n
+        is_header = [bool(_REPLY_HEADER.match(ln)) for ln in lines] if ("headers" in rules or "signature" in rules) else [False] * n
+        i = 0
+        while i < n:
+            ln = lines[i]
+            if "headers" in rules and is_header[i]:
+                j = i
+                while j < n and is_header[j]:
+                    j += 1
+                if j - i >= 2 and any(lines[k][:4].lower() == "from" for k in range(i, j)):
+                    drop[i:j] = [True] * (j - i)
+                i = j
+                continue
+            if "headers" in rules and _REPLY_SEPARATOR.match(ln):
+                drop[i] = True
+            elif "quoted" in rules and ln.startswith(">"):
+                drop[i] = True
+            elif "footer" in rules and _LEGAL_FOOTER.search(ln):
+                drop[i] = True
+            elif "signature" in rules and _SIGN_OFF.match(ln):
+                drop[i] = True
+                j = i + 1
+                while (
+                    j < n and j - i <= _SIGNATURE_MAX_LINES
+                    and len(lines[j]) <= _SIGNATURE_LINE_CHARS and not is_header[j]
+                ):
+                    drop[j] = True
+                    j += 1
+                i = j
+                continue
+            i += 1
+        return "\n".join(ln for ln, d in zip(lines, drop) if not d)
+
     @staticmethod
     def _is_valid_text(text: str) -> bool:
         """
@@ -220,16 +824,199 @@ class IncidentIndexer:
         raw = f"{source_file}::{row_index}"
         return hashlib.md5(raw.encode("utf-8")).hexdigest()
 
+    # ---------------- column-wise versions (used by ingestion) ----------------
+    # Same results as the per-value helpers above, byte for byte: regex [^\W_] matches
+    # exactly the characters for which str.isalnum() is True.
+    @staticmethod
+    def _valid_mask(col: pd.Series) -> np.ndarray:
+        """Vectorized _is_valid_text over a column (boolean mask)."""
+        t = col.fillna("").astype(str).str.strip().str.replace("_x000D_", "", regex=False)
+        lengths = t.str.len().to_numpy(dtype=np.int64)
+        ok = lengths >= 10
+        if not ok.any():
+            return ok
+        # ASCII ratio: one UTF-32 buffer of all candidate texts, non-ASCII code points
+        # counted per text with reduceat over the text offsets
+        cand = np.flatnonzero(ok)
+        codes = np.frombuffer("".join(t.iloc[cand].tolist()).encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+        starts = np.zeros(len(cand), dtype=np.int64)
+        np.cumsum(lengths[cand][:-1], out=starts[1:])
+        non_ascii = np.add.reduceat((codes > 0x7F).astype(np.int64), starts)
+        ratio = (lengths[cand] - non_ascii) / lengths[cand]
+        ok[cand] = ratio >= 0.6
+        ok &= t.str.contains(_ALNUM, regex=True).to_numpy(dtype=bool)
+        return ok
+
+    @staticmethod
+    def _make_ids(source_file: str, row_indices: Sequence[int]) -> List[str]:
+        """_make_id for many rows of one workbook."""
+        md5 = hashlib.md5
+        prefix = f"{source_file}::"
+        return [md5(f"{prefix}{int(i)}".encode("utf-8")).hexdigest() for i in row_indices]
+
     # ------------------------------------------------------------------
-    def run(self, only_files: Optional[List[str]] = None, build_index: bool = True) -> Dict[str, str]:
+    def run(self, only_files: Optional[List[str]] = None, build_index: bool = True) -> Dict[str, object]:
         """One-click pipeline: extract → normalize → save CSV → (optional) build TF-IDF index."""
-        df = self.build_processed_csv(only_files=only_files)
-        result = {"processed_csv": str(self.processed_csv), "rows": str(len(df))}
-        if build_index and not df.empty:
-            result.update(self.build_tfidf_index(df))
+        n_rows = self.stream_processed_csv(only_files=only_files)
+        result = {"processed_csv": str(self.processed_csv), "rows": str(n_rows)}
+        result["files_reused"] = str(len(self.last_ingest.get("files_reused", [])))
+        result["files_extracted"] = str(len(self.last_ingest.get("files_extracted", [])))
+        result["file_timings"] = self.last_ingest.get("timings", {})
+        if "near_duplicates" in self.last_ingest:
+            result["near_duplicates"] = self.last_ingest["near_duplicates"]
+        if "columnar" in self.last_ingest:
+            result["columnar"] = self.last_ingest["columnar"]
+        if "boilerplate" in self.last_ingest:
+            result["boilerplate"] = self.last_ingest["boilerplate"]
+        if build_index and n_rows:
+            # TF-IDF needs the whole corpus; load it from the CSV just written
+            result.update(self.build_tfidf_index())
         return result
 
 
+# ----------------------------------------------------------------------
+# Streaming workbook parsing (module level so process-pool workers can pickle it)
+# ----------------------------------------------------------------------
+def _resolve_name(columns: List[str], candidates: List[str]) -> Optional[str]:
+    """
+    Resolve a column by exact (case-insensitive) match first,
+    then fallback to contains-based fuzzy matching.
+    """
+    # exact (case-insensitive)
+    cols_lower = {c.lower(): c for c in columns}
+    for name in candidates:
+        key = name.lower()
+        if key in cols_lower:
+            return cols_lower[key]
+    # contains fallback (handle trailing spaces or slight variations)
+    for c in columns:
+        cl = c.strip().lower()
+        for cand in candidates:
+            if cand.lower() in cl or cl in cand.lower():
+                return c
+    return None
+
+
+def _header_name(v: Any) -> Any:
+    """Header cell as pandas' openpyxl reader would name it (before str())."""
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        return int(v)
+    return v
+
+
+def _cell_text(v: Any) -> str:
+    """
+    Cell value as pandas read_excel(dtype=str).fillna("") would produce it:
+    str() of the value, with pandas' default NA strings ("NA", "null", "#N/A", ...) as "".
+    """
+    if v is None:
+        return ""
+    if isinstance(v, float) and v.is_integer():
+        v = int(v)
+    s = str(v)
+    return "" if s in STR_NA_VALUES else s
+
+
+def _parse_workbook(path: str) -> Dict[str, Any]:
+    """
+    Stream the first sheet of one workbook in openpyxl read-only mode and return only the
+    resolved Description / Resolution columns as compact lists:
+        {"status": "ok", "rows": [...], "description": [...], "resolution": [...], "parse_s": ...}
+    `rows` are 0-based data-row ordinals (same numbering as the pandas DataFrame index);
+    rows where both cells are empty are skipped, they never pass validation anyway.
+    status "fallback" asks the caller for the full pandas load, "error" means unreadable.
+    """
+    from openpyxl import load_workbook
+
+    t0 = time.perf_counter()
+    out: Dict[str, Any] = {"status": "error", "rows": [], "description": [], "resolution": []}
+    try:
+        wb = load_workbook(path, read_only=True, data_only=True, keep_links=False)
+    except Exception:
+        out["parse_s"] = round(time.perf_counter() - t0, 3)
+        return out
+    try:
+        ws = wb.worksheets[0]
+        ws.reset_dimensions()  # trust the cells, not the (often stale) stored dimension
+        rows = ws.iter_rows(values_only=True)
+        header = next(rows, None)
+        if header is None:
+            out["status"] = "ok"
+            return out
+        names = [str(_header_name(v)).strip() for v in header]
+        if len(set(names)) != len(names) or "" in names:
+            # pandas would mangle duplicate / blank headers ("x.1", "Unnamed: 3"); let it
+            out["status"] = "fallback"
+            return out
+        col_desc = _resolve_name(names, DESC_CANDIDATES)
+        col_reso = _resolve_name(names, RESO_CANDIDATES)
+        if col_desc is None or col_reso is None:
+            return out
+        i_desc, i_reso = names.index(col_desc), names.index(col_reso)
+
+        for i, values in enumerate(rows):
+            d = _cell_text(values[i_desc]) if i_desc < len(values) else ""
+            r = _cell_text(values[i_reso]) if i_reso < len(values) else ""
+            if d or r:
+                out["rows"].append(i)
+                out["description"].append(d)
+                out["resolution"].append(r)
+        out["status"] = "ok"
+        return out
+    except Exception:
+        out = {"status": "fallback", "rows": [], "description": [], "resolution": []}
+        return out
+    finally:
+        wb.close()
+        out["parse_s"] = round(time.perf_counter() - t0, 3)
+
+
+def _write_csr_npz(path: Path, shape: Tuple[int, int], data: np.ndarray, indices: np.ndarray, indptr: np.ndarray) -> None:
+    """
+    Write a CSR matrix in sparse.save_npz's (uncompressed) layout from arrays that may be
+    memmaps: each member is streamed into the zip in buffered pieces, never copied whole.
+    """
+    members = {
+        "indices": indices,
+        "indptr": indptr,
+        "format": np.array(b"csr"),
+        "shape": np.array(shape, dtype=np.int64),
+        "data": data,
+    }
+    tmp = path.with_name(path.name + ".tmp")
+    with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_STORED, allowZip64=True) as zf:
+        for name, arr in members.items():
+            with zf.open(f"{name}.npy", "w", force_zip64=True) as f:
+                np.lib.format.write_array(f, np.asanyarray(arr), allow_pickle=False)
+    os.replace(tmp, path)
+
+
+def _ingest_workbook(job: Tuple[str, str, Sequence[str]]) -> Dict[str, Any]:
+    """
+    Worker: parse one workbook, clean + validate its rows and write them to its ingest
+    cache CSV. `job` is (workbook path, cache CSV path, boilerplate rules to strip).
+    Only small metadata goes back to the parent process.
+    """
+    path, cache, boilerplate = job
+    parsed = _parse_workbook(path)
+    t0 = time.perf_counter()
+    sub, stats = IncidentIndexer._extract_workbook(Path(path), parsed, boilerplate)
+    rows = sub if sub is not None else pd.DataFrame(columns=CSV_COLUMNS)
+    rows.to_csv(cache, index=False, encoding="utf-8")
+    return {
+        "cache": cache,
+        "mode": parsed["status"],
+        "parse_s": parsed["parse_s"],
+        "clean_s": round(time.perf_counter() - t0, 3),
+        "rows": int(len(rows)),
+        "row_ids": rows["id"].astype(str).tolist(),
+        "text_bytes": stats["text_bytes"],
+        "boilerplate_bytes": stats["boilerplate_bytes"],
+    }
+
+
 if __name__ == "__main__":
     idx = IncidentIndexer()
     info = idx.run()
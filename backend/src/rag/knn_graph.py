@@ -0,0 +1,167 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+import numpy as np
+from scipy import sparse
+
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.rag.bundle import file_stamp
+from backend.src.rag.passages import pool_by_row
+
+
+class IncidentKnnGraph:
+    """
+    Offline top-K "related incidents" graph over incidents.csv rows.
+
+    Neighbour score mirrors IncidentSearcher's blend:
+        score = (1 - beta) * tfidf_cos + beta * embed_cos
+    where embed_cos is 0 for rows without a stored embedding (passage vectors of one
+    incident are mean-pooled first).
+
+    Rows are processed in blocks of `block_size`: each block costs one sparse product
+    against the TF-IDF matrix and one dense product against the embedding matrix, so
+    peak memory is about workers * block_size * N floats regardless of corpus size.
+    Blocks run on a thread pool (the BLAS / sparse kernels release the GIL).
+
+    Artifacts (next to the TF-IDF index):
+      - knn_graph.npz   : (N, N) CSR; row i holds the K neighbour row ids and scores of row i
+      - knn_meta.json   : k / beta / block_size / n_rows / build time, plus the corpus stamp
+                          (incidents.csv + tfidf_csr.npz) readers compare to detect a stale graph
+    """
+
+    def __init__(
+        self,
+        project_root: Optional[str] = None,
+        processed_subdir: str = "src/data/processed",
+        index_subdir: str = "src/data/processed/index",
+        emb_subdir: str = "src/data/processed/embeddings",
+        # neighbours kept per incident
+        k: int = 20,
+        # embedding weight in the neighbour score (same meaning as IncidentSearcher.beta)
+        beta: float = 0.25,
+        # rows scored per block; bounds the dense scratch at block_size * N floats per worker
+        block_size: int = 512,
+        # worker threads scoring blocks
+        workers: Optional[int] = None,
+    ) -> None:
+        self.project_root = Path(project_root) if project_root else Path(__file__).resolve().parents[2]
+        self.proc_dir = (self.project_root / processed_subdir).resolve()
+        self.index_dir = (self.project_root / index_subdir).resolve()
+        self.emb_dir = (self.project_root / emb_subdir).resolve()
+
+        self.incidents_csv = self.proc_dir / "incidents.csv"
+        self.matrix_npz = self.index_dir / "tfidf_csr.npz"
+        self.emb_npy = self.emb_dir / "embeddings.npy"
+        self.kept_idx_npy = self.emb_dir / "kept_indices.npy"
+        self.graph_npz = self.index_dir / "knn_graph.npz"
+        self.meta_json = self.index_dir / "knn_meta.json"
+
+        self.k = max(int(k), 1)
+        self.beta = float(beta)
+        self.block_size = max(int(block_size), 1)
+        self.workers = max(int(workers or min(os.cpu_count() or 1, 8)), 1)
+
+    # ---------------- public ----------------
+    def build(self) -> Dict[str, str]:
+        """Compute the graph from tfidf_csr.npz (+ embeddings.npy if present) and save it."""
+        if not self.matrix_npz.exists():
+            raise FileNotFoundError(f"TF-IDF matrix not found: {self.matrix_npz}. Run indexer first.")
+        t0 = time.perf_counter()
+        corpus = self.corpus_stamp(self.incidents_csv, self.matrix_npz)
+        tfidf = sparse.load_npz(self.matrix_npz).tocsr().astype(np.float32)
+        n = tfidf.shape[0]
+        tfidf_t = tfidf.T.tocsc()
+        emb = self._load_dense_embeddings(n)
+
+        k = min(self.k, max(n - 1, 1))
+        starts = list(range(0, n, self.block_size))
+        with ThreadPoolExecutor(max_workers=self.workers) as pool:
+            blocks = list(pool.map(lambda b: self._score_block(tfidf, tfidf_t, emb, b, k), starts))
+
+        indices = np.concatenate([b[0] for b in blocks]) if blocks else np.zeros(0, dtype=np.int32)
+        data = np.concatenate([b[1] for b in blocks]) if blocks else np.zeros(0, dtype=np.float32)
+        counts = np.concatenate([b[2] for b in blocks]) if blocks else np.zeros(0, dtype=np.int64)
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(counts, out=indptr[1:])
+        graph = sparse.csr_matrix((data, indices, indptr), shape=(n, n))
+
+        self.index_dir.mkdir(parents=True, exist_ok=True)
+        sparse.save_npz(self.graph_npz, graph, compressed=False)
+        FileWriter.write_json({
+            "k": int(k),
+            "beta": self.beta,
+            "block_size": self.block_size,
+            "workers": self.workers,
+            "n_rows": int(n),
+            "edges": int(graph.nnz),
+            "with_embeddings": emb is not None,
+            "build_s": round(time.perf_counter() - t0, 3),
+            "corpus": corpus,
+        }, str(self.meta_json))
+        return {"graph": str(self.graph_npz), "meta": str(self.meta_json)}
+
+    @staticmethod
+    def corpus_stamp(incidents_csv: Path, matrix_npz: Path) -> Dict[str, Optional[List[int]]]:
+        """File stamps of the inputs the graph's row ids refer to (None for a missing file)."""
+        return {p.name: (file_stamp(p) if p.exists() else None) for p in (incidents_csv, matrix_npz)}
+
+    @staticmethod
+    def neighbours(graph: sparse.csr_matrix, row: int, top_k: Optional[int] = None) -> Tuple[np.ndarray, np.ndarray]:
+        """(neighbour rows, scores) of `row`, best first; O(K) in the stored neighbour count."""
+        lo, hi = graph.indptr[row], graph.indptr[row + 1]
+        cols = graph.indices[lo:hi]
+        scores = graph.data[lo:hi]
+        order = np.argsort(-scores, kind="stable")
+        if top_k is not None:
+            order = order[:max(int(top_k), 0)]
+        return cols[order], scores[order]
+
+    # ---------------- internals ----------------
+    def _load_dense_embeddings(self, n: int) -> Optional[np.ndarray]:
+        """
+        Embeddings scattered into CSV row order (zeros for rows never embedded);
+        multi-passage incidents are mean-pooled into one vector.
+        """
+        if self.beta <= 0.0 or not (self.emb_npy.exists() and self.kept_idx_npy.exists()):
+            return None
+        vecs = np.load(self.emb_npy).astype(np.float32)
+        kept = np.load(self.kept_idx_npy).astype(np.int64)
+        ok = (kept >= 0) & (kept < n)
+        kept, vecs = pool_by_row(kept[ok], vecs[ok])
+        dense = np.zeros((n, vecs.shape[1]), dtype=np.float32)
+        dense[kept] = vecs
+        return dense
+
+    def _score_block(
+        self,
+        tfidf: sparse.csr_matrix,
+        tfidf_t: sparse.csc_matrix,
+        emb: Optional[np.ndarray],
+        start: int,
+        k: int,
+    ) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        stop = min(start + self.block_size, tfidf.shape[0])
+        scores = (tfidf[start:stop] @ tfidf_t).toarray()
+        if emb is not None:
+            scores *= (1.0 - self.beta)
+            scores += self.beta * (emb[start:stop] @ emb.T)
+        rows = np.arange(stop - start)
+        scores[rows, rows + start] = -np.inf  # never your own neighbour
+
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        keep = top_scores > 0.0  # unrelated rows are not neighbours
+        return (
+            top[keep].astype(np.int32),
+            top_scores[keep].astype(np.float32),
+            keep.sum(axis=1).astype(np.int64),
+        )
+
+
+if __name__ == "__main__":
+    print("kNN graph build info:", IncidentKnnGraph().build())
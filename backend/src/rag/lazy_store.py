@@ -0,0 +1,210 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import json
+import threading
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+import numpy as np
+
+from backend.src.data_io.file_writer import FileWriter
+from backend.src.rag.bundle import file_stamp
+from backend.src.rag.passages import first_runs
+
+
+def side_store_identity(incidents_csv: Path, emb_meta_json: Path) -> str:
+    """
+    What a side store's row numbers refer to: this incidents.csv (its file stamp) and this
+    embeddings build (the build_id in embedder_meta.json). Re-indexing or re-embedding
+    changes it.
+    """
+    csv = file_stamp(incidents_csv) if Path(incidents_csv).exists() else None
+    build_id = None
+    if Path(emb_meta_json).exists():
+        try:
+            build_id = json.loads(Path(emb_meta_json).read_text(encoding="utf-8")).get("build_id")
+        except ValueError:
+            pass
+    return json.dumps({"incidents.csv": csv, "build_id": build_id}, sort_keys=True)
+
+
+class LazyEmbeddingStore:
+    """
+    Append-only side store for incident embeddings computed on demand at query time.
+
+    Files (next to embeddings.npy):
+      - lazy_embeddings.f32 : raw float32 rows, `dim` values each
+      - lazy_indices.i64    : raw int64 CSV row indices, one per embedding row
+      - lazy_meta.json      : the `identity` the row indices were written against
+
+    Vectors are written before their indices, so after a crash the index file is the
+    commit marker: load() only trusts rows that have both. A multi-passage incident is
+    appended as one run of entries sharing its row index.
+
+    Row indices are CSV row numbers, so they only mean something for the corpus and
+    embeddings build they were computed against. With `identity` set (see
+    side_store_identity), a store stamped with another identity, or not stamped at all,
+    reads as empty and is truncated by the next append. The indexer and the embedder
+    also `discard` the store whenever they rewrite incidents.csv / embeddings.npy.
+
+    `fold()` merges the side store into embeddings.npy / kept_indices.npy (rows already
+    present are skipped) and keeps only entries appended while the fold was running.
+    """
+
+    VEC_FILE = "lazy_embeddings.f32"
+    IDX_FILE = "lazy_indices.i64"
+    META_FILE = "lazy_meta.json"
+
+    def __init__(self, emb_dir: Path, dim: int, identity: Optional[str] = None) -> None:
+        self.emb_dir = Path(emb_dir)
+        self.dim = int(dim)
+        self.identity = identity
+        self.vec_path = self.emb_dir / self.VEC_FILE
+        self.idx_path = self.emb_dir / self.IDX_FILE
+        self.meta_path = self.emb_dir / self.META_FILE
+        self._lock = threading.Lock()
+        self._fold_lock = threading.Lock()
+        self.appended = 0
+        self.folds = 0
+        self.last_fold_rows = 0
+
+    # ---------------- public ----------------
+    @classmethod
+    def discard(cls, emb_dir: Path) -> None:
+        """Drop the side store in `emb_dir` (indices first: they are the commit marker)."""
+        for name in (cls.IDX_FILE, cls.VEC_FILE, cls.META_FILE):
+            path = Path(emb_dir) / name
+            if path.exists():
+                path.unlink()
+
+    def load(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Return (indices (K,), vectors (K, dim)) for all committed rows."""
+        with self._lock:
+            return self._read_locked()
+
+    def append(self, indices: np.ndarray, vectors: np.ndarray) -> None:
+        indices = np.asarray(indices, dtype=np.int64).reshape(-1)
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(len(indices), self.dim)
+        if len(indices) == 0:
+            return
+        with self._lock:
+            self.emb_dir.mkdir(parents=True, exist_ok=True)
+            self._trim_uncommitted_locked()
+            if self.identity is not None and self._stored_identity_locked() != self.identity:
+                # empty now (a foreign store was trimmed away): claim it for this identity
+                FileWriter.write_json({"identity": self.identity}, str(self.meta_path))
+            with open(self.vec_path, "ab") as f:
+                f.write(vectors.tobytes())
+                f.flush()
+            with open(self.idx_path, "ab") as f:
+                f.write(indices.tobytes())
+                f.flush()
+            self.appended += len(indices)
+
+    def pending(self) -> int:
+        """Committed rows not yet folded into embeddings.npy."""
+        with self._lock:
+            return self._count_locked()
+
+    def fold(self, emb_npy: Path, kept_idx_npy: Path, meta_json: Optional[Path] = None) -> int:
+        """
+        Merge the side store into the main embedding artifacts. Returns rows added.
+        Safe to call from a background thread; concurrent folds are serialized.
+        """
+        with self._fold_lock:
+            with self._lock:
+                side_idx, side_vec = self._read_locked()
+            n_snap = len(side_idx)
+            if n_snap == 0:
+                return 0
+
+            emb = np.load(emb_npy).astype(np.float32)
+            kept = np.load(kept_idx_npy).astype(np.int64)
+
+            # keep the first run of passage vectors per row, and only rows not already embedded
+            first = first_runs(side_idx)
+            new_mask = ~np.isin(side_idx[first], kept)
+            add_idx = side_idx[first][new_mask]
+            add_vec = side_vec[first][new_mask]
+
+            if len(add_idx):
+                self._atomic_save(emb_npy, np.vstack([emb, add_vec]))
+                self._atomic_save(kept_idx_npy, np.concatenate([kept, add_idx]))
+                if meta_json is not None and Path(meta_json).exists():
+                    try:
+                        meta = json.loads(Path(meta_json).read_text(encoding="utf-8"))
+                        meta["rows_kept"] = int(len(np.unique(kept)) + len(np.unique(add_idx)))
+                        meta["passages_kept"] = int(len(kept) + len(add_idx))
+                        meta["rows_lazy_folded"] = int(meta.get("rows_lazy_folded", 0)) + int(len(np.unique(add_idx)))
+                        FileWriter.write_json(meta, str(meta_json), ensure_ascii=False, pretty=True)
+                    except Exception:
+                        pass
+
+            # drop the folded prefix, keep rows appended while we were merging
+            with self._lock:
+                all_idx, all_vec = self._read_locked()
+                self._rewrite_locked(all_idx[n_snap:], all_vec[n_snap:])
+
+            self.folds += 1
+            self.last_fold_rows = int(len(np.unique(add_idx)))
+            return self.last_fold_rows
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "pending": self.pending(),
+            "appended": self.appended,
+            "folds": self.folds,
+            "last_fold_rows": self.last_fold_rows,
+        }
+
+    # ---------------- internals (caller holds self._lock) ----------------
+    def _stored_identity_locked(self) -> Optional[str]:
+        if not self.meta_path.exists():
+            return None
+        try:
+            return json.loads(self.meta_path.read_text(encoding="utf-8")).get("identity")
+        except ValueError:
+            return None
+
+    def _count_locked(self) -> int:
+        if not (self.vec_path.exists() and self.idx_path.exists()):
+            return 0
+        if self.identity is not None and self._stored_identity_locked() != self.identity:
+            return 0  # written against another corpus / embeddings build
+        n_idx = self.idx_path.stat().st_size // 8
+        n_vec = self.vec_path.stat().st_size // (4 * self.dim)
+        return int(min(n_idx, n_vec))
+
+    def _trim_uncommitted_locked(self) -> None:
+        """Cut a torn write (vectors without indices, or a partial row) back to the committed prefix."""
+        n = self._count_locked()
+        for path, row_bytes in ((self.vec_path, 4 * self.dim), (self.idx_path, 8)):
+            if path.exists() and path.stat().st_size != n * row_bytes:
+                with open(path, "r+b") as f:
+                    f.truncate(n * row_bytes)
+
+    def _read_locked(self) -> Tuple[np.ndarray, np.ndarray]:
+        n = self._count_locked()
+        if n == 0:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, self.dim), dtype=np.float32)
+        idx = np.fromfile(self.idx_path, dtype=np.int64, count=n)
+        vec = np.fromfile(self.vec_path, dtype=np.float32, count=n * self.dim).reshape(n, self.dim)
+        return idx, vec
+
+    def _rewrite_locked(self, idx: np.ndarray, vec: np.ndarray) -> None:
+        tmp_vec = self.vec_path.with_suffix(".f32.tmp")
+        tmp_idx = self.idx_path.with_suffix(".i64.tmp")
+        vec.astype(np.float32).tofile(tmp_vec)
+        idx.astype(np.int64).tofile(tmp_idx)
+        # un-commit everything first so a crash mid-swap can never pair indices with the
+        # wrong vectors (worst case the unfolded tail is lost and re-embedded later)
+        open(self.idx_path, "wb").close()
+        os.replace(tmp_vec, self.vec_path)
+        os.replace(tmp_idx, self.idx_path)
+
+    @staticmethod
+    def _atomic_save(path: Path, arr: np.ndarray) -> None:
+        tmp = Path(str(path) + ".tmp.npy")
+        np.save(tmp, arr)
+        os.replace(tmp, path)
@@ -0,0 +1,155 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import re
+import zlib
+from typing import Dict, Iterable, Optional, Tuple
+import numpy as np
+
+# largest prime below 2**32: (a * h + b) stays below 2**64 for 32-bit a, h, b and every
+# hash value fits a uint32 signature slot
+_PRIME = np.uint64(4294967291)
+# signature slot of a text without a single token (never produced by a hash)
+_EMPTY = np.uint32(0xFFFFFFFF)
+_TOKEN = re.compile(r"\w+")
+
+
+class MinHashDeduper:
+    """
+    Near-duplicate detection with MinHash signatures + LSH banding.
+
+    Each text becomes a set of word `shingle`-grams; its signature is the minimum of
+    `num_perm` universal hashes over that set, so the fraction of equal signature slots
+    estimates the Jaccard similarity of two texts. Signatures are cut into `bands` bands;
+    texts sharing any whole band are candidates, and a candidate is a duplicate when its
+    estimated Jaccard with the bucket's earliest member is >= `threshold`.
+
+    Duplicates are grouped with union-find; the earliest row of a group is its canonical
+    representative.
+    """
+
+    def __init__(
+        self,
+        # estimated Jaccard similarity at or above which two texts are duplicates
+        threshold: float = 0.8,
+        # signature length (4 bytes per slot per row)
+        num_perm: int = 64,
+        # LSH bands (must divide num_perm); None picks the banding whose S-curve
+        # threshold sits just below `threshold`
+        bands: Optional[int] = None,
+        # words per shingle
+        shingle: int = 3,
+        # shingle hashes per vectorized block (bounds scratch at block * num_perm * 8 bytes)
+        block: int = 32768,
+        seed: int = 1,
+    ) -> None:
+        self.threshold = float(threshold)
+        self.num_perm = max(int(num_perm), 1)
+        self.bands = int(bands) if bands else self._pick_bands(self.num_perm, self.threshold)
+        if self.num_perm % self.bands:
+            raise ValueError(f"bands ({self.bands}) must divide num_perm ({self.num_perm})")
+        self.shingle = max(int(shingle), 1)
+        self.block = max(int(block), 1)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, int(_PRIME), size=self.num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, int(_PRIME), size=self.num_perm, dtype=np.uint64)
+
+    # ---------------- public ----------------
+    def signatures(self, texts: Iterable[str]) -> np.ndarray:
+        """(n, num_perm) uint32 signatures; texts without a single token get an all-_EMPTY row."""
+        hashes = [self._shingle_hashes(t) for t in texts]
+        sig = np.full((len(hashes), self.num_perm), _EMPTY, dtype=np.uint32)
+        # walk docs in blocks of ~self.block shingles: one (shingles, num_perm) product per block
+        i = 0
+        while i < len(hashes):
+            j, total = i, 0
+            while j < len(hashes) and (total == 0 or total + len(hashes[j]) <= self.block):
+                total += len(hashes[j])
+                j += 1
+            docs = [(d, h) for d, h in zip(range(i, j), hashes[i:j]) if len(h)]
+            if docs:
+                flat = np.concatenate([h for _, h in docs])
+                starts = np.zeros(len(docs), dtype=np.int64)
+                np.cumsum([len(h) for _, h in docs[:-1]], out=starts[1:])
+                perm = (flat[:, None] * self._a[None, :] + self._b[None, :]) % _PRIME
+                sig[[d for d, _ in docs]] = np.minimum.reduceat(perm, starts, axis=0)
+            i = j
+        return sig
+
+    def groups(self, sig: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        (canonical row per row, estimated Jaccard with its canonical row). Rows that are
+        their own canonical have similarity 1.0.
+        """
+        n = sig.shape[0]
+        parent = np.arange(n)
+
+        def find(x: int) -> int:
+            while parent[x] != x:
+                parent[x] = parent[parent[x]]
+                x = parent[x]
+            return x
+
+        has_tokens = ~(sig == _EMPTY).all(axis=1)
+        rows = np.flatnonzero(has_tokens)
+        r = self.num_perm // self.bands
+        for b in range(self.bands):
+            band = np.ascontiguousarray(sig[rows, b * r:(b + 1) * r])
+            keys = band.view(np.dtype((np.void, band.dtype.itemsize * r))).ravel()
+            _, first, inverse, counts = np.unique(keys, return_index=True, return_inverse=True, return_counts=True)
+            shared = counts[inverse] > 1
+            for pos in np.flatnonzero(shared):
+                head = rows[first[inverse[pos]]]  # earliest row in this bucket
+                row = rows[pos]
+                if row == head:
+                    continue
+                if self.similarity(sig[row], sig[head]) >= self.threshold:
+                    ra, rb = find(row), find(head)
+                    if ra != rb:
+                        # keep the smaller row as root so the canonical is the earliest
+                        parent[max(ra, rb)] = min(ra, rb)
+
+        canon = np.array([find(i) for i in range(n)], dtype=np.int64)
+        sim = np.ones(n, dtype=np.float32)
+        dup = np.flatnonzero(canon != np.arange(n))
+        if len(dup):
+            sim[dup] = (sig[dup] == sig[canon[dup]]).mean(axis=1)
+        return canon, sim
+
+    @staticmethod
+    def similarity(a: np.ndarray, b: np.ndarray) -> float:
+        """Estimated Jaccard similarity of two signatures."""
+        return float(np.mean(a == b))
+
+    # ---------------- internals ----------------
+    def _shingle_hashes(self, text: str) -> np.ndarray:
+        tokens = _TOKEN.findall(str(text).lower())
+        k = min(self.shingle, len(tokens))
+        if k == 0:
+            return np.zeros(0, dtype=np.uint64)
+        grams = {" ".join(tokens[i:i + k]) for i in range(len(tokens) - k + 1)}
+        return np.fromiter((zlib.crc32(g.encode("utf-8")) for g in grams), dtype=np.uint64, count=len(grams))
+
+    @staticmethod
+    def _pick_bands(num_perm: int, threshold: float) -> int:
+        """Most rows per band whose S-curve midpoint (1/b)^(1/r) stays below `threshold`."""
+        best = 1
+        for r in range(1, num_perm + 1):
+            if num_perm % r:
+                continue
+            b = num_perm // r
+            if (1.0 / b) ** (1.0 / r) <= threshold:
+                best = b
+        return best
+
+
+def summarize_groups(canon: np.ndarray) -> Dict[str, int]:
+    """Row / duplicate / group counts for a canonical-row array from MinHashDeduper.groups."""
+    dup = canon != np.arange(len(canon))
+    return {
+        "rows": int(len(canon)),
+        "duplicates": int(dup.sum()),
+        "groups": int(len(np.unique(canon[dup]))),
+    }
+
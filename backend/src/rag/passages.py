@@ -0,0 +1,97 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+from typing import List, Tuple
+import numpy as np
+
+
+def split_passages(text: str, max_chars: int = 1500, overlap: int = 150) -> List[Tuple[int, int]]:
+    """
+    Character spans (start, end) of bounded passages covering `text`.
+
+    A passage is at most `max_chars` long and ends at the last line break (else space) in
+    its second half when there is one; the next passage starts `overlap` characters
+    earlier, moved forward to a word start. Spans are whitespace-trimmed, so
+    text[start:end] is the passage. Deterministic: the same text always yields the same
+    spans, which keeps the passage -> incident mapping stable across rebuilds.
+    Texts within `max_chars` (or max_chars <= 0) are a single passage.
+    """
+    text = "" if text is None else str(text)
+    n = len(text)
+    if max_chars <= 0 or n <= max_chars:
+        return [(0, n)]
+    overlap = max(min(int(overlap), max_chars // 4), 0)
+
+    spans: List[Tuple[int, int]] = []
+    start = 0
+    while start < n:
+        end = min(start + max_chars, n)
+        if end < n:
+            half = start + max_chars // 2
+            cut = text.rfind("\n", half, end)
+            if cut < 0:
+                cut = text.rfind(" ", half, end)
+            if cut > start:
+                end = cut
+        spans.append(_trim(text, start, end))
+        if end >= n:
+            break
+        nxt = max(end - overlap, start + 1)
+        if overlap:
+            ws = next((i for i in range(nxt, end) if text[i].isspace()), None)
+            if ws is not None:
+                nxt = ws + 1
+        start = nxt
+    return [(s, e) for s, e in spans if e > s]
+
+
+def passage_texts(text: str, max_chars: int = 1500, overlap: int = 150) -> List[str]:
+    return [text[s:e] for s, e in split_passages(text, max_chars, overlap)]
+
+
+def first_runs(rows: np.ndarray) -> np.ndarray:
+    """
+    Mask keeping, for every row id, only its first contiguous run of entries.
+
+    Passages of one incident are always written together, so a later run of the same row
+    id is a re-embedding (e.g. two processes embedding the same row on demand) and is
+    dropped, the way a duplicate single vector used to be.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return np.zeros(0, dtype=bool)
+    new_run = np.ones(len(rows), dtype=bool)
+    new_run[1:] = rows[1:] != rows[:-1]
+    run_id = np.cumsum(new_run) - 1
+    _, first = np.unique(rows, return_index=True)
+    first_run = dict(zip(rows[first].tolist(), run_id[first].tolist()))
+    return run_id == np.fromiter((first_run[r] for r in rows.tolist()), dtype=np.int64, count=len(rows))
+
+
+def pool_by_row(rows: np.ndarray, vecs: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    One vector per incident: (row ids in order of first appearance, L2-normalized mean
+    of each row's L2-normalized passage vectors). Single-passage rows keep their vector.
+    """
+    rows = np.asarray(rows, dtype=np.int64)
+    if len(rows) == 0:
+        return rows, np.asarray(vecs, dtype=np.float32)
+    vecs = np.asarray(vecs, dtype=np.float32)
+    vecs = vecs / np.clip(np.linalg.norm(vecs, axis=1, keepdims=True), 1e-12, None)
+    uniq, first, inverse = np.unique(rows, return_index=True, return_inverse=True)
+    if len(uniq) == len(rows):
+        return rows, vecs
+    pooled = np.zeros((len(uniq), vecs.shape[1]), dtype=np.float32)
+    np.add.at(pooled, inverse, vecs)
+    pooled /= np.clip(np.linalg.norm(pooled, axis=1, keepdims=True), 1e-12, None)
+    order = np.argsort(first, kind="stable")
+    return uniq[order], pooled[order]
+
+
+def _trim(text: str, start: int, end: int) -> Tuple[int, int]:
+    while start < end and text[start].isspace():
+        start += 1
+    while end > start and text[end - 1].isspace():
+        end -= 1
+    return start, end
@@ -2,18 +2,32 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
 
+import io
+import json
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from concurrent.futures import TimeoutError as FuturesTimeoutError
 from pathlib import Path
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Sequence, Tuple
 import pandas as pd
 import numpy as np
 
-from sklearn.metrics.pairwise import cosine_similarity
 from sklearn.feature_extraction.text import TfidfVectorizer
+from sklearn.preprocessing import normalize
 from scipy import sparse
 import joblib
-from rapidfuzz import fuzz
+from rapidfuzz import fuzz, process
 
 from backend.src.embeddings.embedding_handler import EmbeddingHandler
+from backend.src.embeddings.circuit_breaker import CircuitBreaker
+from backend.src.rag.bundle import TEXT_COLUMNS, IndexBundle, prepare_csr
+from backend.src.rag.incident_store import IncidentStore
+from backend.src.rag.knn_graph import IncidentKnnGraph
+from backend.src.rag.lazy_store import LazyEmbeddingStore, side_store_identity
+from backend.src.rag.passages import first_runs, passage_texts
+from backend.src.rag.text_features import FieldPrefixedAnalyzer, HashedTfidfTransformer, field_column_weights
 
 
 class IncidentSearcher:
@@ -26,10 +40,33 @@ class IncidentSearcher:
       - src/data/processed/index/tfidf_csr.npz
       - src/data/processed/index/mapping.csv
 
+    If the index was built multi-field (description + resolution stacked into one
+    field-prefixed vocabulary), the query is expanded into every field and each field's
+    columns are scaled by `field_weights`, so stage-1 still costs one sparse product.
+    A hashed (out-of-core) index ships a HashedTfidfTransformer as vectorizer.pkl and is
+    queried the same way.
+
     (Optional) Requires artifacts generated by IncidentEmbedder (for embedding rerank):
       - src/data/processed/embeddings/embeddings.npy
       - src/data/processed/embeddings/kept_indices.npy
       - src/data/processed/embeddings/embedder_meta.json
+
+    (Optional) Requires the graph built by IncidentKnnGraph (for `related`):
+      - src/data/processed/index/knn_graph.npz
+
+    When src/data/processed/incidents.bundle (written by the indexer / embedder, see
+    rag/bundle.py) is present and not older than the artifacts above, the index, the
+    incident texts and the embeddings are memory-mapped from it instead: start-up is a
+    header parse plus the vectorizer unpickle, and text is only decoded for rows a query
+    touches. Each group whose artifacts were rewritten since (e.g. a lazy-store fold of
+    embeddings.npy) falls back to the files.
+
+    Pool candidates missing from embeddings.npy are embedded on demand (bounded per
+    query), appended to lazy_embeddings.f32 / lazy_indices.i64 and folded back into
+    embeddings.npy / kept_indices.npy in the background.
+
+    Embeddings may be passage-level (kept_indices repeats a row once per passage); an
+    incident's embedding score is the max (or sum, `passage_agg`) over its passages.
     """
 
     def __init__(
@@ -44,9 +81,31 @@ class IncidentSearcher:
         beta: float = 0.25,
         # how many top results from stage-1 enter embedding rerank
         candidate_pool: int = 200,
+        # per-field query weights for a multi-field index, e.g. {"description": 1.0, "resolution": 0.5}
+        field_weights: Optional[Dict[str, float]] = None,
+        # adaptive pool: size the rerank pool per query from the stage-1 score distribution
+        adaptive_pool: bool = False,
+        pool_min: int = 50,
+        pool_max: int = 400,
+        # softmax temperature used to measure stage-1 ambiguity (entropy) in adaptive mode
+        pool_temperature: float = 0.05,
         # embedding runtime config
         embed_model_name: str = "nomic-embed-text:latest",
         embed_base_url: Optional[str] = None,
+        # threads used to fetch query embeddings concurrently with stage-1 scoring
+        embed_workers: int = 2,
+        # per-call budget for the query embedding; on expiry stage-2 is skipped
+        embed_timeout_s: float = 5.0,
+        # breaker guarding the embedding backend; pass one in to share it across searchers
+        embed_breaker: Optional[CircuitBreaker] = None,
+        # LRU of query embeddings keyed by query text (0 disables)
+        query_cache_size: int = 1024,
+        # embed up to this many unembedded pool candidates per query on demand (0 disables)
+        lazy_embed_max: int = 16,
+        # fold the lazy side store into embeddings.npy once it holds this many rows
+        lazy_fold_every: int = 256,
+        # how passage scores of a multi-passage incident become its embedding score: "max" | "sum"
+        passage_agg: str = "max",
     ) -> None:
         self.project_root = Path(project_root) if project_root else Path(__file__).resolve().parents[2]
         self.proc_dir = (self.project_root / processed_subdir).resolve()
@@ -55,9 +114,13 @@ class IncidentSearcher:
 
         # indexer artifacts
         self.incidents_csv = self.proc_dir / "incidents.csv"
+        self.store = IncidentStore(self.proc_dir)
         self.vectorizer_pkl = self.index_dir / "vectorizer.pkl"
         self.matrix_npz = self.index_dir / "tfidf_csr.npz"
         self.mapping_csv = self.index_dir / "mapping.csv"
+        self.knn_npz = self.index_dir / "knn_graph.npz"
+        self.knn_meta_json = self.index_dir / "knn_meta.json"
+        self.bundle_path = self.proc_dir / "incidents.bundle"
 
         # embedder artifacts (optional)
         self.emb_npy = self.emb_dir / "embeddings.npy"
@@ -68,26 +131,80 @@ class IncidentSearcher:
         self.alpha = float(alpha)
         self.beta = float(beta)
         self.candidate_pool = int(candidate_pool)
+        self.adaptive_pool = bool(adaptive_pool)
+        self.pool_min = int(pool_min)
+        self.pool_max = max(int(pool_max), self.pool_min)
+        self.pool_temperature = float(pool_temperature)
+        self.field_weights: Dict[str, float] = {"description": 1.0, "resolution": 0.5}
+        if field_weights:
+            self.field_weights.update({k: float(v) for k, v in field_weights.items()})
 
         # data holders
-        self.df: Optional[pd.DataFrame] = None
+        self.df: Optional[pd.DataFrame] = None          # TEXT_COLUMNS, only on the file path (no bundle)
+        self.bundle: Optional[IndexBundle] = None
+        self.bundle_groups: List[str] = []              # bundle groups actually served from the map
+        self.texts: Optional[Dict[str, Sequence[str]]] = None   # TEXT_COLUMNS by CSV row
         self.vec: Optional[TfidfVectorizer] = None
-        self.mat: Optional[sparse.csr_matrix] = None
+        self.mat: Optional[sparse.csr_matrix] = None     # (N, F) float32, rows L2-normalized
+        self.mat_t: Optional[sparse.csr_matrix] = None   # (F, N) transpose: one posting row per term
+        self._mat_t_rows: Optional[np.ndarray] = None
+        self._tls = threading.local()                    # per-thread score buffer + _Workspace
+        self.desc_list: Sequence[str] = []               # descriptions, cached for fuzzy scoring
+        self.fuzzy_chunk = 1024                          # rows per rapidfuzz.cdist call
+        self.index_fields: Tuple[str, ...] = ("description",)   # fields stacked in self.mat
+        self._col_weight: Optional[np.ndarray] = None           # per-column query weights (multi-field)
+
+        # related-incidents graph (optional)
+        self.knn: Optional[sparse.csr_matrix] = None
+        self.id_rows: Dict[str, int] = {}                # incident id -> CSV row
 
         # embeddings (optional)
         self.doc_emb: Optional[np.ndarray] = None       # shape (M, D)
         self.kept_indices: Optional[np.ndarray] = None  # shape (M,)
-        self.pos_map: Optional[dict] = None             # original_csv_idx -> position in doc_emb
+        self.pos_map: Optional[dict] = None             # original_csv_idx -> (start, stop) passage rows in doc_emb
+        if passage_agg not in ("max", "sum"):
+            raise ValueError(f"passage_agg must be 'max' or 'sum', got {passage_agg!r}")
+        self.passage_agg = passage_agg
+        self.passage_chars = 0                          # passage split used offline (from embedder meta)
+        self.passage_overlap = 0
         self.emb_normalized: bool = True                # default true; read from meta if present
 
+        # on-demand embeddings for rows missing from doc_emb (see LazyEmbeddingStore)
+        self.lazy_embed_max = max(int(lazy_embed_max), 0)
+        self.lazy_fold_every = max(int(lazy_fold_every), 1)
+        self.lazy_store: Optional[LazyEmbeddingStore] = None
+        self.lazy_vecs: Dict[int, np.ndarray] = {}      # original_csv_idx -> (passages, D) vectors
+        self._lazy_inflight: set = set()
+        self._lazy_lock = threading.Lock()
+        self._fold_thread: Optional[threading.Thread] = None
+
         # query embedder
         self.embedder: Optional[EmbeddingHandler] = None
+        self.embed_executor: Optional[ThreadPoolExecutor] = None
+        self.embed_workers = max(int(embed_workers), 1)
+        self.embed_timeout_s = float(embed_timeout_s)
+        self.embed_breaker = embed_breaker or CircuitBreaker(name="embedding")
         self.embed_model_name = embed_model_name
+        self.query_cache_size = max(int(query_cache_size), 0)
+        self._qemb_cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._qemb_lock = threading.Lock()
+        self.qemb_hits = 0
+        self.qemb_misses = 0
         self.embed_base_url = embed_base_url or os.getenv("OLLAMA_HOST") or "http://172.22.5.186:32000/ollama-dev"
 
+        # EWMA stage costs in seconds, used to decide what fits into a request deadline
+        self._cost: Dict[str, float] = {"tfidf": 0.0, "fuzzy": 0.0, "embed": 0.0, "rerank_per_cand": 0.0}
+        self._cost_decay = 0.2
+
         # load everything
+        self._maybe_open_bundle()
         self._load_index_artifacts()
         self._maybe_load_embedding_artifacts()
+        self._maybe_load_knn_graph()
+        if self.bundle is not None and not self.bundle_groups:
+            # stale on every group: nothing views the map, so do not keep the file mapped
+            self.bundle.close()
+            self.bundle = None
         self._maybe_init_embedder()
 
     # ---------------- public ----------------
@@ -97,96 +214,503 @@ class IncidentSearcher:
         top_k: int = 8,
         min_desc_len: int = 0,
         same_resolution_dedupe: bool = True,
+        adaptive_pool: Optional[bool] = None,
+        deadline: Optional[float] = None,
     ) -> List[Dict]:
         """
         Stage-1: TF-IDF cosine + Fuzzy blended.
         Stage-2: (Optional) Embedding rerank over the top `candidate_pool` from stage-1.
         """
-        if not query or self.df is None or self.vec is None or self.mat is None:
-            return []
+        return self.search_with_meta(
+            query,
+            top_k=top_k,
+            min_desc_len=min_desc_len,
+            same_resolution_dedupe=same_resolution_dedupe,
+            adaptive_pool=adaptive_pool,
+            deadline=deadline,
+        )["results"]
 
-        # ---------- Stage-1 ----------
-        q_vec = self.vec.transform([query])
-        tfidf_cos = cosine_similarity(q_vec, self.mat).ravel()
+    def search_with_meta(
+        self,
+        query: str,
+        top_k: int = 8,
+        min_desc_len: int = 0,
+        same_resolution_dedupe: bool = True,
+        adaptive_pool: Optional[bool] = None,
+        deadline: Optional[float] = None,
+        alpha: Optional[float] = None,
+        beta: Optional[float] = None,
+        candidate_pool: Optional[int] = None,
+        page_depth: Optional[int] = None,
+    ) -> Dict:
+        """
+        Same as `search`, but also returns per-query diagnostics:
+            {"results": [...], "meta": {"pool_size": int, "pool_mode": "fixed"|"adaptive", ...}}
 
-        desc = self.df["description"].astype(str).tolist()
-        fuzzy_scores = np.array([fuzz.token_set_ratio(query, d) for d in desc], dtype=float) / 100.0
+        meta["timings_ms"] breaks the latency down into stage1 / embed / embed_wait /
+        embed_overlap / stage2 / total. The query embedding is requested before stage-1
+        starts, so embed_wait only covers the part of the round-trip stage-1 did not hide.
 
-        stage1 = self.alpha * tfidf_cos + (1.0 - self.alpha) * fuzzy_scores
+        `deadline` is an absolute `time.monotonic()` timestamp. When set, each optional stage
+        (fuzzy scoring, embedding rerank, rerank pool size) only runs if its estimated cost
+        still fits; meta["stages_skipped"] lists what was dropped and meta["degraded"] is True
+        for such best-effort results.
 
-        # candidate pool for rerank
-        pool_n = min(max(self.candidate_pool, top_k), len(stage1))
-        pool_idx = np.argpartition(-stage1, pool_n - 1)[:pool_n]
-        pool_idx = pool_idx[np.argsort(-stage1[pool_idx])]
+        alpha / beta / candidate_pool override the instance defaults for this call only.
 
-        # ---------- Stage-2 (optional embedding rerank) ----------
-        final_scores = stage1.copy()
+        With `page_depth`, the top `page_depth` rows by final score are filtered and deduped
+        up front and returned as out["ranking"] = {"rows", "stage1", "final"} (numpy arrays,
+        best first); "results" is the first `top_k` of that list. Later pages can then be
+        materialized with `results_for_rows` without rescoring.
+        """
+        return self.search_many([{
+            "query": query,
+            "top_k": top_k,
+            "min_desc_len": min_desc_len,
+            "same_resolution_dedupe": same_resolution_dedupe,
+            "adaptive_pool": adaptive_pool,
+            "deadline": deadline,
+            "alpha": alpha,
+            "beta": beta,
+            "candidate_pool": candidate_pool,
+            "page_depth": page_depth,
+        }])[0]
 
+    def search_many(self, requests: List[Dict]) -> List[Dict]:
+        """
+        Batched `search_with_meta`. Each request is a dict of its keyword arguments
+        (`query` is required, everything else optional).
+
+        The whole batch shares one TF-IDF sparse matrix product and one `encode_many`
+        call for the query embeddings; fuzzy scoring, pool selection and rerank then run
+        per query. Returns one {"results": [...], "meta": {...}} dict per request, in order.
+        """
+        outs: List[Optional[Dict]] = [None] * len(requests)
+        live: List[int] = []
+        for pos, req in enumerate(requests):
+            if not req.get("query") or self.texts is None or self.vec is None or self.mat is None:
+                outs[pos] = {"results": [], "meta": {"pool_size": 0, "pool_mode": "fixed", "reranked": False}}
+            else:
+                live.append(pos)
+        if not live:
+            return outs
+
+        t0 = time.perf_counter()
+        metas: Dict[int, Dict[str, object]] = {}
+        for pos in live:
+            meta: Dict[str, object] = {
+                "pool_size": 0,
+                "pool_mode": "fixed",
+                "reranked": False,
+                "timings_ms": {},
+                "stages_skipped": [],
+            }
+            deadline = requests[pos].get("deadline")
+            if deadline is not None:
+                meta["budget_ms"] = round((deadline - time.monotonic()) * 1000.0, 2)
+            metas[pos] = meta
+
+        # fire the query embeddings now so the network round-trip overlaps stage-1 CPU work;
+        # if the breaker is open the backend is known-bad and stage-2 is skipped up front
+        emb_job: Optional[_QueryEmbeddingJob] = None
+        cached: Dict[int, np.ndarray] = {}
         if self.embedder is not None and self.doc_emb is not None and self.pos_map is not None:
-            try:
-                q_emb = np.asarray(self.embedder.encode_one(query), dtype=np.float32)
-                if self.emb_normalized:
-                    # normalize both sides to ensure dot == cosine
-                    q_emb = self._l2_normalize(q_emb.reshape(1, -1)).reshape(-1)
+            wanted: List[int] = []
+            for pos in live:
+                hit = self._cached_query_embedding(str(requests[pos]["query"]))
+                if hit is not None:
+                    cached[pos] = hit
+                elif self._affordable(requests[pos].get("deadline"), self._cost["tfidf"] + self._cost["embed"]):
+                    wanted.append(pos)
                 else:
-                    # normalize query only; doc_emb may be unnormalized, so compute cosine manually
-                    q_emb = self._l2_normalize(q_emb.reshape(1, -1)).reshape(-1)
+                    metas[pos]["stages_skipped"].append("embed_rerank")
+                    metas[pos]["stage2_skipped"] = "deadline"
+            if wanted and self.embed_breaker.allow_request():
+                texts = [str(requests[pos]["query"]) for pos in wanted]
+                future = self.embed_executor.submit(self._timed_encode_many, texts)
+                emb_job = _QueryEmbeddingJob(
+                    future, self.embed_breaker, {pos: j for j, pos in enumerate(wanted)}, self.embed_timeout_s
+                )
+            else:
+                for pos in wanted:
+                    metas[pos]["stages_skipped"].append("embed_rerank")
+                    metas[pos]["stage2_skipped"] = "breaker_open"
 
-                embed_scores = np.zeros_like(stage1, dtype=np.float32)
+        # ---------- Stage-1 (TF-IDF for the whole batch) ----------
+        q_mat = self._transform_queries([str(requests[pos]["query"]) for pos in live])
+        tfidf_all = self._tfidf_scores(q_mat)
+        self._observe_cost("tfidf", (time.perf_counter() - t0) / len(live))
 
-                # compute embedding score only on candidate pool for speed
-                for i in pool_idx:
-                    pos = self.pos_map.get(int(i))
-                    if pos is None:
-                        continue  # this original CSV row wasn't embedded (was skipped)
-                    d = self.doc_emb[pos]
-                    if not self.emb_normalized:
-                        d = self._l2_normalize(d.reshape(1, -1)).reshape(-1)
-                    embed_scores[i] = float(d @ q_emb)  # cosine/IP
+        for j, pos in enumerate(live):
+            emb_row = emb_job.rows.get(pos) if emb_job is not None else None
+            outs[pos] = self._rank_one(requests[pos], tfidf_all[j], emb_job, emb_row, metas[pos], t0, cached.get(pos))
+        return outs
+
+    def query_cache_stats(self) -> Dict[str, int]:
+        with self._qemb_lock:
+            return {
+                "size": len(self._qemb_cache),
+                "capacity": self.query_cache_size,
+                "hits": self.qemb_hits,
+                "misses": self.qemb_misses,
+            }
+
+    def related(self, incident_id: str, top_k: int = 8) -> List[Dict]:
+        """
+        Nearest historical neighbours of one incident, read from the precomputed kNN graph
+        (no scoring at query time). Raises KeyError for an unknown id and RuntimeError when
+        the graph has not been built.
+        """
+        if self.knn is None:
+            raise RuntimeError("kNN graph not available. Run IncidentKnnGraph().build() first.")
+        row = self.id_rows.get(str(incident_id))
+        if row is None:
+            raise KeyError(incident_id)
+        cols, scores = IncidentKnnGraph.neighbours(self.knn, row, top_k)
+        out: List[Dict] = []
+        for i, sc in zip(cols.tolist(), scores.tolist()):
+            out.append({
+                "id": self.texts["id"][i],
+                "description": self.texts["description"][i],
+                "resolution": self.texts["resolution"][i].strip(),
+                "source_file": self.texts["source_file"][i],
+                "score_related": round(float(sc), 4),
+            })
+        return out
+
+    def results_for_rows(self, rows: np.ndarray, stage1: np.ndarray, final: np.ndarray) -> List[Dict]:
+        """Materialize result dicts for already-ranked CSV rows (e.g. a later page of a ranking)."""
+        if self.texts is None:
+            return []
+        return [self._result_row(int(i), float(s1), float(f)) for i, s1, f in zip(rows, stage1, final)]
+
+    def close(self) -> None:
+        """
+        Release background threads (query-embedding executor, lazy-store fold) and unmap the
+        bundle. Call once no search is running on this instance; it is unusable afterwards.
+        """
+        if self._fold_thread is not None:
+            self._fold_thread.join()
+        if self.embed_executor is not None:
+            self.embed_executor.shutdown(wait=False)
+            self.embed_executor = None
+        if self.bundle is not None:
+            # drop every view into the map first, otherwise it cannot be unmapped
+            self.mat = self.mat_t = self._mat_t_rows = None
+            self.texts, self.desc_list = None, []
+            self.doc_emb = self.kept_indices = None
+            self.bundle.close()
+            self.bundle = None
+
+    # ---------------- internals ----------------
+    def _rank_one(
+        self,
+        req: Dict,
+        tfidf_cos: np.ndarray,
+        emb_job: Optional["_QueryEmbeddingJob"],
+        emb_row: Optional[int],
+        meta: Dict[str, object],
+        t0: float,
+        cached_emb: Optional[np.ndarray] = None,
+    ) -> Dict:
+        """
+        Fuzzy blend, pool selection, optional rerank and result assembly for one query.
+        `cached_emb` is this query's embedding from the LRU (then there is no job to join).
+        """
+        query = str(req["query"])
+        top_k = int(req.get("top_k") or 8)
+        min_desc_len = int(req.get("min_desc_len") or 0)
+        same_resolution_dedupe = req.get("same_resolution_dedupe", True)
+        adaptive_pool = req.get("adaptive_pool")
+        deadline = req.get("deadline")
+        alpha = self.alpha if req.get("alpha") is None else float(req["alpha"])
+        beta = self.beta if req.get("beta") is None else float(req["beta"])
+        candidate_pool = self.candidate_pool if req.get("candidate_pool") is None else int(req["candidate_pool"])
+
+        timings: Dict[str, float] = meta["timings_ms"]
+        skipped: List[str] = meta["stages_skipped"]
+        has_embedding = cached_emb is not None or (emb_job is not None and emb_row is not None)
+
+        # all corpus-sized arrays below live in this thread's reusable workspace
+        ws = self._workspace()
 
-                # blend: final = (1 - beta) * stage1 + beta * embed
-                final_scores = (1.0 - self.beta) * stage1 + self.beta * embed_scores
+        # ---------- Stage-1 ----------
+        t_fuzzy = time.perf_counter()
+        stage1 = ws.stage1
+        if self._affordable(deadline, self._cost["fuzzy"]):
+            fuzzy_scores = self._fuzzy_scores(query, ws.fuzzy)
+            self._observe_cost("fuzzy", time.perf_counter() - t_fuzzy)
+            # stage1 = alpha * tfidf + (1 - alpha) * fuzzy, fused in place
+            np.multiply(tfidf_cos, alpha, out=stage1)
+            np.multiply(fuzzy_scores, 1.0 - alpha, out=fuzzy_scores)
+            np.add(stage1, fuzzy_scores, out=stage1)
+        else:
+            # out of budget: rank on TF-IDF alone
+            skipped.append("fuzzy")
+            np.copyto(stage1, tfidf_cos)
+
+        # candidate pool for rerank (fixed size, or sized from the stage-1 score distribution)
+        use_adaptive = self.adaptive_pool if adaptive_pool is None else bool(adaptive_pool)
+        if use_adaptive:
+            pool_n, pool_stats = self._adaptive_pool_size(stage1, top_k, ws.scratch)
+            meta.update(pool_stats)
+            meta["pool_mode"] = "adaptive"
+        else:
+            pool_n = min(max(candidate_pool, top_k), len(stage1))
+        if deadline is not None and has_embedding:
+            # shrink the rerank pool to what the remaining budget can score once the
+            # (already in-flight) query embedding is back
+            embed_left = 0.0 if cached_emb is not None else max(self._cost["embed"] - (time.perf_counter() - t0), 0.0)
+            remaining = deadline - time.monotonic() - embed_left
+            per_cand = max(self._cost["rerank_per_cand"], 1e-7)
+            affordable_n = max(int(remaining / per_cand), min(top_k, len(stage1)))
+            if affordable_n < pool_n:
+                pool_n = affordable_n
+                skipped.append("pool_truncated")
+        pool_idx = self._top_indices(stage1, pool_n, ws)
+        meta["pool_size"] = int(pool_n)
+        # embed pool candidates that have no stored vector yet, in one batch call
+        lazy_job = self._start_lazy_embedding(pool_idx, deadline) if has_embedding else None
+        t1 = time.perf_counter()
+        timings["stage1"] = round((t1 - t0) * 1000.0, 2)
+
+        # ---------- Stage-2 (optional embedding rerank) ----------
+        final_scores = stage1
+
+        q_emb = None
+        if cached_emb is not None:
+            q_emb = cached_emb
+            timings["embed"] = 0.0
+            meta["embed_cached"] = True
+        elif has_embedding:
+            reserve_s = self._cost["rerank_per_cand"] * len(pool_idx)
+            q_emb = self._await_query_embedding(emb_job, emb_row, t1, timings, meta, deadline, reserve_s)
+            if q_emb is None:
+                skipped.append("embed_rerank")
+            else:
+                self._remember_query_embedding(query, q_emb.copy())
+        if lazy_job is not None:
+            # the breaker hears one outcome per request: that of the query embedding call,
+            # or of this call when the query vector came from the LRU
+            settle = cached_emb is not None
+            if q_emb is None:
+                # nothing to rerank: store the vectors when they arrive instead of waiting
+                self._detach_lazy_embedding(lazy_job, settle)
+                meta["lazy_embedded"] = 0
+            else:
+                meta["lazy_embedded"] = self._finish_lazy_embedding(lazy_job, deadline, settle)
+        if q_emb is not None:
+            t_rerank = time.perf_counter()
+            try:
+                # embedding score only on the candidate pool (rows without a vector score 0)
+                cand_rows: List[int] = []
+                cand_vecs: List[np.ndarray] = []
+                for i in pool_idx.tolist():
+                    span = self.pos_map.get(i)
+                    d = self.doc_emb[span[0]:span[1]] if span is not None else self.lazy_vecs.get(i)
+                    if d is None:
+                        continue  # not embedded (skipped offline, or over the lazy budget)
+                    cand_rows.append(i)
+                    cand_vecs.append(d)
+
+                # blend: final = (1 - beta) * stage1 + beta * embed, fused in place
+                final_scores = ws.final
+                np.multiply(stage1, 1.0 - beta, out=final_scores)
+                if cand_rows:
+                    vecs = np.vstack(cand_vecs)
+                    if not self.emb_normalized:
+                        vecs = self._l2_normalize(vecs)
+                    sims = vecs @ q_emb  # cosine/IP, one per passage
+                    if len(sims) != len(cand_rows):
+                        # multi-passage incidents: reduce each candidate's passage run
+                        starts = np.zeros(len(cand_vecs), dtype=np.int64)
+                        np.cumsum([len(v) for v in cand_vecs[:-1]], out=starts[1:])
+                        reduce = np.maximum if self.passage_agg == "max" else np.add
+                        sims = reduce.reduceat(sims, starts)
+                    final_scores[cand_rows] += beta * sims
+                meta["reranked"] = True
+                self._observe_cost("rerank_per_cand", (time.perf_counter() - t_rerank) / max(len(pool_idx), 1))
             except Exception:
-                # if embedding fails for any reason, silently fallback to stage1 only
+                # if rerank fails for any reason, silently fallback to stage1 only
                 final_scores = stage1
+        t3 = time.perf_counter()
+        timings["stage2"] = round((t3 - t1) * 1000.0, 2)
 
         # ---------- Top-K selection ----------
-        k = min(max(top_k, 1), len(final_scores))
-        idx = np.argpartition(-final_scores, k - 1)[:k]
-        idx = idx[np.argsort(-final_scores[idx])]
+        page_depth = req.get("page_depth")
+        k = min(max(top_k, int(page_depth or 0), 1), len(final_scores))
+        idx = self._top_indices(final_scores, k, ws)
 
-        # assemble results
-        out: List[Dict] = []
+        # filter / dedupe, then assemble results
+        kept = self._filter_rows(idx, min_desc_len, same_resolution_dedupe)
+        out = [self._result_row(i, float(stage1[i]), float(final_scores[i])) for i in kept[:top_k]]
+        timings["total"] = round((time.perf_counter() - t0) * 1000.0, 2)
+        meta["degraded"] = bool(skipped)
+        result: Dict[str, object] = {"results": out, "meta": meta}
+        if page_depth:
+            rows = np.asarray(kept, dtype=np.int64)
+            result["ranking"] = {
+                "rows": rows,
+                "stage1": stage1[rows].astype(np.float32),
+                "final": final_scores[rows].astype(np.float32),
+            }
+            meta["ranked_depth"] = int(len(rows))
+        return result
+
+    def _workspace(self) -> "_Workspace":
+        ws = getattr(self._tls, "ws", None)
+        if ws is None or ws.n != len(self.desc_list):
+            ws = _Workspace(len(self.desc_list))
+            self._tls.ws = ws
+        return ws
+
+    def _fuzzy_scores(self, query: str, out: np.ndarray) -> np.ndarray:
+        """token_set_ratio / 100 against every description, written into `out` chunk by chunk."""
+        step = max(int(self.fuzzy_chunk), 1)
+        for lo in range(0, len(self.desc_list), step):
+            hi = min(lo + step, len(self.desc_list))
+            out[lo:hi] = process.cdist([query], self.desc_list[lo:hi], scorer=fuzz.token_set_ratio, dtype=np.float32)[0]
+        out *= 0.01
+        return out
+
+    @staticmethod
+    def _top_indices(scores: np.ndarray, k: int, ws: "_Workspace") -> np.ndarray:
+        """
+        Indices of the k largest scores, best first (ties: lower row first). Finds the k-th
+        value by partitioning a workspace copy, so only O(k) index memory is allocated.
+        """
+        n = len(scores)
+        k = min(max(int(k), 0), n)
+        if k == 0:
+            return np.zeros(0, dtype=np.int64)
+        scratch = ws.scratch
+        np.copyto(scratch, scores)
+        scratch.partition(n - k)
+        thr = scratch[n - k]
+        np.greater(scores, thr, out=ws.mask)
+        idx = np.flatnonzero(ws.mask)
+        if len(idx) < k:
+            np.equal(scores, thr, out=ws.mask)
+            idx = np.concatenate([idx, np.flatnonzero(ws.mask)[:k - len(idx)]])
+        return idx[np.argsort(-scores[idx], kind="stable")]
+
+    def _filter_rows(self, idx: np.ndarray, min_desc_len: int, same_resolution_dedupe: bool) -> List[int]:
+        """Apply min_desc_len and same-resolution dedupe to ranked row indices (order kept)."""
+        desc_col = self.texts["description"]
+        res_col = self.texts["resolution"]
+        kept: List[int] = []
         seen_res = set()
         for i in idx:
-            row = self.df.iloc[int(i)]
-            if min_desc_len and len(str(row["description"])) < min_desc_len:
+            i = int(i)
+            if min_desc_len and len(desc_col[i]) < min_desc_len:
                 continue
-
-            res_text = str(row["resolution"]).strip()
             if same_resolution_dedupe:
+                res_text = res_col[i].strip()
                 if res_text in seen_res:
                     continue
                 seen_res.add(res_text)
+            kept.append(i)
+        return kept
 
-            out.append({
-                "id": row.get("id", ""),
-                "description": row.get("description", ""),
-                "resolution": res_text,
-                "source_file": row.get("source_file", ""),
-                "score_tfidf_fuzzy": round(float(stage1[i]), 4),
-                "score_final": round(float(final_scores[i]), 4),
-            })
+    def _result_row(self, i: int, score_stage1: float, score_final: float) -> Dict:
+        return {
+            "id": self.texts["id"][i],
+            "description": self.texts["description"][i],
+            "resolution": self.texts["resolution"][i].strip(),
+            "source_file": self.texts["source_file"][i],
+            "score_tfidf_fuzzy": round(score_stage1, 4),
+            "score_final": round(score_final, 4),
+        }
+
+    def _transform_queries(self, queries: List[str]) -> sparse.csr_matrix:
+        """
+        Query TF-IDF rows. For a multi-field index every query is matched against all
+        fields at once: it is analyzed once per field and the field columns are scaled by
+        `field_weights`. Rows come back L2-normalized float32, ready for `_tfidf_scores`.
+        """
+        if isinstance(self.vec, HashedTfidfTransformer):
+            return self.vec.transform_queries(queries, self.field_weights).astype(np.float32)
+        analyzer = getattr(self.vec, "analyzer", None)
+        if not isinstance(analyzer, FieldPrefixedAnalyzer):
+            q_mat = self.vec.transform(queries)
+        else:
+            n_fields = len(analyzer.fields)
+            q_mat = self.vec.transform([(q,) * n_fields for q in queries])
+        q_mat = q_mat.tocsr().astype(np.float32)
+        if self._col_weight is not None:
+            q_mat.data *= self._col_weight[q_mat.indices]
+        return normalize(q_mat, norm="l2", copy=False)
+
+    def _tfidf_scores(self, q_mat: sparse.csr_matrix) -> np.ndarray:
+        """
+        Cosine of each (normalized) query row against every incident, accumulated term by
+        term from the transposed index (one posting row per query term) into a reused
+        per-thread buffer, so no corpus-sized temporaries are created. The returned rows
+        are only valid until this thread's next call.
+        """
+        n_q, n_docs = q_mat.shape[0], self.mat_t.shape[1]
+        buf = getattr(self._tls, "scores", None)
+        if buf is None or buf.shape[0] < n_q or buf.shape[1] != n_docs:
+            buf = np.empty((max(n_q, 1), n_docs), dtype=np.float32)
+            self._tls.scores = buf
+            self._tls.posting = np.empty(n_docs, dtype=np.float32)
+        posting = self._tls.posting
+        out = buf[:n_q]
+        out.fill(0.0)
+        t_ptr, t_idx, t_val = self.mat_t.indptr, self._mat_t_rows, self.mat_t.data
+        for j in range(n_q):
+            row = out[j]
+            for lo_q in range(q_mat.indptr[j], q_mat.indptr[j + 1]):
+                term, w = q_mat.indices[lo_q], q_mat.data[lo_q]
+                lo, hi = t_ptr[term], t_ptr[term + 1]
+                tmp = posting[:hi - lo]
+                np.multiply(t_val[lo:hi], w, out=tmp)
+                np.add.at(row, t_idx[lo:hi], tmp)
         return out
 
-    # ---------------- internals ----------------
+    def _maybe_open_bundle(self) -> None:
+        if not self.bundle_path.exists():
+            return
+        try:
+            self.bundle = IndexBundle(self.bundle_path)
+        except (OSError, ValueError):
+            # unreadable or another format version: the per-artifact files still work
+            self.bundle = None
+
     def _load_index_artifacts(self) -> None:
-        if not self.incidents_csv.exists():
+        index_sources = {p.name: p for p in (self.incidents_csv, self.vectorizer_pkl, self.matrix_npz)}
+        if self.bundle is not None and self.bundle.fresh("index", index_sources):
+            try:
+                self._load_index_from_bundle()
+                self.bundle_groups.append("index")
+            except (KeyError, ValueError):
+                # a section is missing or malformed: the per-artifact files still work
+                self._load_index_from_files()
+        else:
+            self._load_index_from_files()
+
+        analyzer = getattr(self.vec, "analyzer", None)
+        if isinstance(self.vec, HashedTfidfTransformer):
+            # no vocabulary: field weights are applied while hashing the query
+            self.index_fields = self.vec.fields or ("description",)
+            self._col_weight = None
+        elif isinstance(analyzer, FieldPrefixedAnalyzer):
+            self.index_fields = tuple(analyzer.fields)
+            col_w = field_column_weights(self.vec.vocabulary_, self.mat.shape[1], self.field_weights)
+            self._col_weight = None if np.all(col_w == 1.0) else col_w
+        else:
+            self.index_fields = ("description",)
+            self._col_weight = None
+
+    def _load_index_from_files(self) -> None:
+        if not self.store.exists():
             raise FileNotFoundError(f"incidents.csv not found: {self.incidents_csv}")
         if not self.vectorizer_pkl.exists() or not self.matrix_npz.exists() or not self.mapping_csv.exists():
             raise FileNotFoundError("Index artifacts missing. Run indexer first.")
 
-        self.df = pd.read_csv(self.incidents_csv).fillna("")
+        # every text column is read now: a column read later could come from an
+        # incidents.csv / .parquet rewritten since and no longer line up with self.mat
+        self.df = self.store.read(TEXT_COLUMNS)
         self.vec = joblib.load(self.vectorizer_pkl)
         self.mat = sparse.load_npz(self.matrix_npz)
 
@@ -194,22 +718,100 @@ class IncidentSearcher:
         self.df = self.df.iloc[:n].reset_index(drop=True)
         if self.mat.shape[0] != n:
             self.mat = self.mat[:n]
+        self.mat = prepare_csr(self.mat)
+        self.mat_t = self.mat.T.tocsr()
+        # posting row ids as intp, so np.add.at does not cast (allocate) them on every query
+        self._mat_t_rows = self.mat_t.indices.astype(np.intp)
+        self.texts = {c: self.df[c].tolist() for c in TEXT_COLUMNS}
+        self.desc_list = self.texts["description"]
+
+    def _load_index_from_bundle(self) -> None:
+        b = self.bundle
+        self.vec = joblib.load(io.BytesIO(b.array("vectorizer")))
+        self.mat = b.csr("tfidf")
+        self.mat_t = b.csr("tfidf_t")
+        self._mat_t_rows = b.array("tfidf_t.rows")
+        self.texts = {c: b.strings(c) for c in TEXT_COLUMNS}
+        # decoded slice by slice on every fuzzy pass instead of held as str objects
+        self.desc_list = self.texts["description"]
+
+    def _maybe_load_knn_graph(self) -> None:
+        if not self.knn_npz.exists():
+            return
+        try:
+            corpus = json.loads(self.knn_meta_json.read_text(encoding="utf-8")).get("corpus")
+        except (OSError, ValueError):
+            corpus = None
+        if corpus != IncidentKnnGraph.corpus_stamp(self.incidents_csv, self.matrix_npz):
+            # stale: built against a different incidents.csv / TF-IDF index (or before stamps existed)
+            return
+        graph = sparse.load_npz(self.knn_npz).tocsr()
+        if graph.shape[0] != len(self.desc_list):
+            return
+        self.knn = graph
+        self.id_rows = {}
+        for row, incident_id in enumerate(self.texts["id"][:]):
+            self.id_rows.setdefault(incident_id, row)
+
+    def _embeddings_from_bundle(self) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """(emb, kept) views, ordered by row; None when the bundle holds no fresh, readable copy."""
+        emb_sources = {p.name: p for p in (self.emb_npy, self.kept_idx_npy, self.meta_json)}
+        if self.bundle is None or not self.bundle.has("emb") or not self.bundle.fresh("embeddings", emb_sources):
+            return None
+        try:
+            emb, kept = self.bundle.array("emb"), self.bundle.array("kept")
+        except (KeyError, ValueError):
+            # a section is missing or malformed: the .npy files still work
+            return None
+        self.bundle_groups.append("embeddings")
+        return emb, kept
 
     def _maybe_load_embedding_artifacts(self) -> None:
-        if not (self.emb_npy.exists() and self.kept_idx_npy.exists()):
+        from_bundle = self._embeddings_from_bundle()
+        if from_bundle is not None:
+            self.doc_emb, self.kept_indices = from_bundle
+        elif self.emb_npy.exists() and self.kept_idx_npy.exists():
+            self.doc_emb = np.load(self.emb_npy).astype(np.float32)
+            self.kept_indices = np.load(self.kept_idx_npy).astype(np.int64)
+        else:
             # embeddings are optional; skip silently
             return
-        self.doc_emb = np.load(self.emb_npy).astype(np.float32)
-        self.kept_indices = np.load(self.kept_idx_npy).astype(np.int64)
-        # build map: original CSV row index -> position in doc_emb
-        self.pos_map = {int(orig_idx): int(pos) for pos, orig_idx in enumerate(self.kept_indices.tolist())}
+        if len(self.kept_indices) and np.any(np.diff(self.kept_indices) < 0):
+            # lazy folds append out of order; keep each row's passages contiguous
+            order = np.argsort(self.kept_indices, kind="stable")
+            self.doc_emb = self.doc_emb[order]
+            self.kept_indices = self.kept_indices[order]
+        # build map: original CSV row index -> (start, stop) of its passage vectors in doc_emb
+        rows, starts, counts = np.unique(self.kept_indices, return_index=True, return_counts=True)
+        self.pos_map = {
+            int(r): (int(a), int(a + c)) for r, a, c in zip(rows.tolist(), starts.tolist(), counts.tolist())
+        }
+
+        # rows embedded on demand since the last fold (all passages of a row were appended together);
+        # folding rewrites embeddings.npy, so a bundle shipped without it gets no side store
+        if self.emb_npy.exists():
+            self.lazy_store = LazyEmbeddingStore(
+                self.emb_dir, dim=self.doc_emb.shape[1], identity=side_store_identity(self.incidents_csv, self.meta_json)
+            )
+            side_idx, side_vec = self.lazy_store.load()
+            keep = first_runs(side_idx)
+            side_idx, side_vec = side_idx[keep], side_vec[keep]
+            for orig_idx in np.unique(side_idx).tolist():
+                if orig_idx not in self.pos_map:
+                    self.lazy_vecs[orig_idx] = side_vec[side_idx == orig_idx]
 
         # read normalize flag
         self.emb_normalized = True
         try:
             import json
-            meta = json.loads(Path(self.meta_json).read_text(encoding="utf-8"))
+            if from_bundle is not None:
+                meta = self.bundle.meta.get("embeddings", {})
+            else:
+                meta = json.loads(Path(self.meta_json).read_text(encoding="utf-8"))
             self.emb_normalized = bool(meta.get("normalize", True))
+            # split on-demand embeddings the same way as the offline build
+            self.passage_chars = int(meta.get("passage_chars", 0))
+            self.passage_overlap = int(meta.get("passage_overlap", 0))
         except Exception:
             pass
 
@@ -220,8 +822,229 @@ class IncidentSearcher:
         self.embedder = EmbeddingHandler(
             model_name=self.embed_model_name,
             base_url=self.embed_base_url,
+            # bound the HTTP call itself, not just the wait: a hung server must not
+            # hold the embed_executor workers past the deadline
+            timeout_s=self.embed_timeout_s,
+        )
+        self.embed_executor = ThreadPoolExecutor(
+            max_workers=self.embed_workers,
+            thread_name_prefix="query-embed",
         )
 
+    def _await_query_embedding(
+        self,
+        emb_job: "_QueryEmbeddingJob",
+        emb_row: int,
+        t_join: float,
+        timings: Dict[str, float],
+        meta: Dict[str, object],
+        deadline: Optional[float] = None,
+        reserve_s: float = 0.0,
+    ) -> Optional[np.ndarray]:
+        """
+        Join the shared query-embedding job (bounded by `embed_timeout_s` and the request
+        deadline) and return this query's L2-normalized vector, or None to skip stage-2.
+        """
+        timeout = self.embed_timeout_s
+        deadline_bound = False
+        if deadline is not None:
+            # keep `reserve_s` of the budget to score the pool afterwards
+            remaining = deadline - time.monotonic() - reserve_s
+            if remaining < timeout:
+                timeout = max(remaining, 0.0)
+                deadline_bound = True
+
+        vectors, reason = emb_job.wait(timeout, deadline_bound)
+        if vectors is None:
+            meta["stage2_skipped"] = reason
+            return None
+
+        t2 = time.perf_counter()
+        timings["embed"] = round(emb_job.embed_s * 1000.0, 2)
+        timings["embed_wait"] = round((t2 - t_join) * 1000.0, 2)
+        # portion of the embedding round-trip hidden behind stage-1
+        timings["embed_overlap"] = round(max(emb_job.embed_s - (t2 - t_join), 0.0) * 1000.0, 2)
+        return vectors[emb_row]
+
+    def _cached_query_embedding(self, query: str) -> Optional[np.ndarray]:
+        if self.query_cache_size <= 0:
+            return None
+        with self._qemb_lock:
+            vec = self._qemb_cache.get(query)
+            if vec is None:
+                self.qemb_misses += 1
+                return None
+            self._qemb_cache.move_to_end(query)
+            self.qemb_hits += 1
+            return vec
+
+    def _remember_query_embedding(self, query: str, vec: np.ndarray) -> None:
+        if self.query_cache_size <= 0:
+            return
+        with self._qemb_lock:
+            self._qemb_cache[query] = vec
+            self._qemb_cache.move_to_end(query)
+            while len(self._qemb_cache) > self.query_cache_size:
+                self._qemb_cache.popitem(last=False)
+
+    def _start_lazy_embedding(
+        self, pool_idx: np.ndarray, deadline: Optional[float]
+    ) -> Optional[Tuple[Future, List[int], List[int]]]:
+        """
+        Submit one encode_many for the passages of up to `lazy_embed_max` unembedded pool
+        candidates. Returns (future, rows, CSV row of each passage).
+        """
+        if self.lazy_embed_max <= 0 or self.lazy_store is None:
+            return None
+        if not self._affordable(deadline, self._cost["embed"]):
+            return None
+        with self._lazy_lock:
+            missing = [
+                int(i) for i in pool_idx
+                if int(i) not in self.pos_map and int(i) not in self.lazy_vecs and int(i) not in self._lazy_inflight
+            ][: self.lazy_embed_max]
+            if not missing or not self.embed_breaker.allow_request():
+                return None
+            self._lazy_inflight.update(missing)
+        texts: List[str] = []
+        p_rows: List[int] = []
+        for i in missing:
+            parts = passage_texts(self.texts["description"][i], self.passage_chars, self.passage_overlap)
+            texts.extend(parts)
+            p_rows.extend([i] * len(parts))
+        return self.embed_executor.submit(self._timed_encode_many, texts), missing, p_rows
+
+    def _finish_lazy_embedding(
+        self, lazy_job: Tuple[Future, List[int], List[int]], deadline: Optional[float], settle: bool
+    ) -> int:
+        """
+        Join the candidate embedding call, cache the vectors and schedule a fold. Returns rows
+        added. With `settle`, the call's outcome is reported to the circuit breaker (once).
+        """
+        future, missing, p_rows = lazy_job
+        timeout = self.embed_timeout_s
+        if deadline is not None:
+            timeout = min(timeout, max(deadline - time.monotonic(), 0.0))
+        try:
+            raw, _ = future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            # leave it running; the vectors are stored when they arrive
+            self._detach_lazy_embedding(lazy_job, settle)
+            return 0
+        except Exception as e:
+            if settle:
+                self.embed_breaker.record_failure(f"{type(e).__name__}: {e}")
+            with self._lazy_lock:
+                self._lazy_inflight.difference_update(missing)
+            return 0
+        if settle:
+            self.embed_breaker.record_success()
+        return self._store_lazy_vectors(missing, p_rows, raw)
+
+    def _detach_lazy_embedding(self, lazy_job: Tuple[Future, List[int], List[int]], settle: bool) -> None:
+        future, missing, p_rows = lazy_job
+        future.add_done_callback(lambda f: self._store_lazy(f, missing, p_rows, settle))
+
+    def _store_lazy(self, future: Future, missing: List[int], p_rows: List[int], settle: bool = False) -> None:
+        err = None if future.cancelled() else future.exception()
+        if future.cancelled() or err is not None:
+            if settle and err is not None:
+                self.embed_breaker.record_failure(f"{type(err).__name__}: {err}")
+            with self._lazy_lock:
+                self._lazy_inflight.difference_update(missing)
+            return
+        if settle:
+            self.embed_breaker.record_success()
+        self._store_lazy_vectors(missing, p_rows, future.result()[0])
+
+    def _store_lazy_vectors(self, missing: List[int], p_rows: List[int], raw: List[List[float]]) -> int:
+        vecs = np.asarray(raw, dtype=np.float32)
+        if self.emb_normalized:
+            vecs = self._l2_normalize(vecs)
+        rows = np.asarray(p_rows, dtype=np.int64)
+        with self._lazy_lock:
+            for i in missing:
+                self.lazy_vecs[i] = vecs[rows == i]
+            self._lazy_inflight.difference_update(missing)
+        try:
+            self.lazy_store.append(rows, vecs)
+        except OSError:
+            # the in-memory copy still serves this process; persistence is best-effort
+            return len(missing)
+        self._maybe_fold_lazy_store()
+        return len(missing)
+
+    def _maybe_fold_lazy_store(self) -> None:
+        """Fold the side store into embeddings.npy in the background once it is large enough."""
+        if self.lazy_store.pending() < self.lazy_fold_every:
+            return
+        with self._lazy_lock:
+            if self._fold_thread is not None and self._fold_thread.is_alive():
+                return
+            self._fold_thread = threading.Thread(
+                target=self.lazy_store.fold,
+                args=(self.emb_npy, self.kept_idx_npy, self.meta_json),
+                name="lazy-embedding-fold",
+                daemon=True,
+            )
+            self._fold_thread.start()
+
+    def _timed_encode_many(self, texts: List[str]) -> Tuple[List[List[float]], float]:
+        """Run on the embed executor; returns (vectors, seconds spent in the backend call)."""
+        t0 = time.perf_counter()
+        vecs = self.embedder.encode_many(texts)
+        elapsed = time.perf_counter() - t0
+        self._observe_cost("embed", elapsed)
+        return vecs, elapsed
+
+    def _affordable(self, deadline: Optional[float], cost_s: float) -> bool:
+        """True if a stage with estimated `cost_s` still fits before `deadline` (monotonic)."""
+        if deadline is None:
+            return True
+        return time.monotonic() + cost_s <= deadline
+
+    def _observe_cost(self, stage: str, seconds: float) -> None:
+        """Fold a measured stage latency into the EWMA used for deadline budgeting."""
+        prev = self._cost.get(stage, 0.0)
+        self._cost[stage] = seconds if prev <= 0.0 else (1.0 - self._cost_decay) * prev + self._cost_decay * seconds
+
+    def _adaptive_pool_size(
+        self, stage1: np.ndarray, top_k: int, scratch: Optional[np.ndarray] = None
+    ) -> Tuple[int, Dict[str, float]]:
+        """
+        Size the rerank pool from the head of the stage-1 score distribution.
+
+        A clear winner (large top-1/top-2 gap, low entropy over the head) shrinks the
+        pool towards `pool_min`; a flat, ambiguous head widens it towards `pool_max`.
+        """
+        n = len(stage1)
+        lo = min(max(self.pool_min, top_k, 1), n)
+        hi = min(max(self.pool_max, lo), n)
+        if hi <= lo:
+            return lo, {"pool_gap": 0.0, "pool_entropy": 0.0}
+
+        if scratch is None:
+            scratch = np.empty_like(stage1)
+        np.copyto(scratch, stage1)
+        scratch.partition(n - hi)
+        head = np.sort(scratch[n - hi:])[::-1]
+
+        # relative gap between the two best candidates, in [0, 1]
+        top1 = float(head[0])
+        gap = (top1 - float(head[1])) / top1 if top1 > 1e-12 else 0.0
+        gap = min(max(gap, 0.0), 1.0)
+
+        # normalized entropy of softmax(head / T), in [0, 1]
+        z = (head - head[0]) / max(self.pool_temperature, 1e-6)
+        p = np.exp(z)
+        p /= p.sum()
+        entropy = float(-(p * np.log(p + 1e-12)).sum() / np.log(len(head)))
+
+        # ambiguity in [0, 1]: flat head and small gap -> widen
+        ambiguity = min(max(entropy * (1.0 - gap), 0.0), 1.0)
+        size = int(round(lo + ambiguity * (hi - lo)))
+        return size, {"pool_gap": round(gap, 4), "pool_entropy": round(entropy, 4)}
+
     @staticmethod
     def _l2_normalize(x: np.ndarray) -> np.ndarray:
         if x.ndim == 1:
@@ -231,6 +1054,99 @@ class IncidentSearcher:
         return (x / denom).astype(np.float32)
 
 
+class _Workspace:
+    """
+    Per-thread scratch arrays sized to the corpus, reused across queries so steady-state
+    scoring allocates nothing proportional to N (see IncidentSearcher._rank_one).
+    """
+
+    def __init__(self, n: int) -> None:
+        self.n = int(n)
+        self.fuzzy = np.empty(self.n, dtype=np.float32)
+        self.stage1 = np.empty(self.n, dtype=np.float32)
+        self.final = np.empty(self.n, dtype=np.float32)
+        self.scratch = np.empty(self.n, dtype=np.float32)
+        self.mask = np.empty(self.n, dtype=bool)
+
+
+class _QueryEmbeddingJob:
+    """
+    One in-flight `encode_many` call shared by a batch of queries.
+
+    The job has one absolute deadline, `timeout_s` after submission: the queries of a batch
+    are ranked one after another, and each only waits for what is left of it, so a hung
+    backend costs the batch `timeout_s` in total, not once per query. Once a waiter has
+    given up on the job, later waiters return "embed_timeout" without waiting.
+
+    The circuit breaker is settled exactly once per job: by the completion callback, or by
+    the first waiter that gives up at the job deadline. Waiters that stop early because
+    their own request deadline expired leave the outcome to the callback.
+    """
+
+    def __init__(self, future: Future, breaker: CircuitBreaker, rows: Dict[int, int], timeout_s: float) -> None:
+        self.future = future
+        self.breaker = breaker
+        self.rows = rows            # request position -> row in the encoded batch
+        self.timeout_s = float(timeout_s)
+        self.deadline = time.monotonic() + self.timeout_s
+        self.embed_s = 0.0
+        self._lock = threading.Lock()
+        self._settled = False
+        self._timed_out = False
+        self._vectors: Optional[np.ndarray] = None
+        future.add_done_callback(self._on_done)
+
+    def wait(self, timeout: float, deadline_bound: bool) -> Tuple[Optional[np.ndarray], Optional[str]]:
+        """
+        Return (L2-normalized (B, D) query matrix, None) or (None, skip reason). Waits at most
+        `timeout` (the caller's budget; `deadline_bound` if that is its request deadline) and
+        never past the job deadline.
+        """
+        if self._timed_out and not self.future.done():
+            return None, "embed_timeout"
+        job_left = max(self.deadline - time.monotonic(), 0.0)
+        if job_left <= timeout:
+            timeout, deadline_bound = job_left, False
+        try:
+            raw, embed_s = self.future.result(timeout=timeout)
+        except FuturesTimeoutError:
+            if deadline_bound:
+                # the request ran out of budget; that says nothing about backend health
+                return None, "deadline"
+            self._timed_out = True
+            self._settle_failure(f"timeout after {self.timeout_s}s")
+            self.future.cancel()
+            return None, "embed_timeout"
+        except Exception:
+            return None, "embed_error"
+
+        with self._lock:
+            if self._vectors is None:
+                self.embed_s = embed_s
+                self._vectors = IncidentSearcher._l2_normalize(np.asarray(raw, dtype=np.float32))
+            return self._vectors, None
+
+    def _on_done(self, future: Future) -> None:
+        if future.cancelled():
+            return
+        err = future.exception()
+        with self._lock:
+            if self._settled:
+                return
+            self._settled = True
+        if err is None:
+            self.breaker.record_success()
+        else:
+            self.breaker.record_failure(f"{type(err).__name__}: {err}")
+
+    def _settle_failure(self, error: str) -> None:
+        with self._lock:
+            if self._settled:
+                return
+            self._settled = True
+        self.breaker.record_failure(error)
+
+
 if __name__ == "__main__":
     s = IncidentSearcher(alpha=0.8, beta=0.25, candidate_pool=200)
     while True:
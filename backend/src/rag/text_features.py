@@ -0,0 +1,187 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../../..")))
+
+import re
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class FieldPrefixedAnalyzer:
+    """
+    Picklable analyzer for multi-field TF-IDF.
+
+    Each document is a tuple of field texts (in `fields` order). Every word n-gram is
+    emitted with its field prefix, e.g. ("ejector missing", "reset palette filter") ->
+    ["description:ejector", ..., "resolution:reset palette", ...], so one vectorizer
+    (one vocabulary, one IDF pass) yields a single stacked matrix covering all fields.
+
+    Tokenization mirrors TfidfVectorizer defaults: lowercase, token pattern
+    r"(?u)\\b\\w\\w+\\b", contiguous n-grams in `ngram_range`.
+
+    Lives in its own module so the pickled vectorizer can be loaded by IncidentSearcher
+    no matter how the indexer was launched.
+    """
+
+    SEP = ":"
+
+    def __init__(
+        self,
+        fields: Sequence[str] = ("description", "resolution"),
+        ngram_range: Tuple[int, int] = (1, 2),
+        lowercase: bool = True,
+        token_pattern: str = r"(?u)\b\w\w+\b",
+    ) -> None:
+        self.fields = tuple(fields)
+        self.ngram_range = tuple(ngram_range)
+        self.lowercase = lowercase
+        self.token_pattern = token_pattern
+        self._re = re.compile(token_pattern)
+
+    def __call__(self, doc: Sequence[str]) -> List[str]:
+        out: List[str] = []
+        for field, text in zip(self.fields, doc):
+            out.extend(self._field_ngrams(field, text))
+        return out
+
+    def _field_ngrams(self, field: str, text: str) -> List[str]:
+        text = "" if text is None else str(text)
+        if self.lowercase:
+            text = text.lower()
+        tokens = self._re.findall(text)
+        min_n, max_n = self.ngram_range
+        prefix = field + self.SEP
+        grams: List[str] = []
+        if min_n == 1:
+            grams.extend(prefix + t for t in tokens)
+            min_n += 1
+        n_tok = len(tokens)
+        for n in range(min_n, min(max_n, n_tok) + 1):
+            for i in range(n_tok - n + 1):
+                grams.append(prefix + " ".join(tokens[i:i + n]))
+        return grams
+
+    # keep the compiled regex out of the pickle
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        state.pop("_re", None)
+        return state
+
+    def __setstate__(self, state: Dict) -> None:
+        self.__dict__.update(state)
+        self._re = re.compile(self.token_pattern)
+
+
+def field_column_weights(vocabulary: Dict[str, int], n_features: int, weights: Dict[str, float]) -> np.ndarray:
+    """
+    Per-column weight vector for a stacked multi-field vocabulary: each feature gets the
+    weight of the field named by its prefix (1.0 if the field is not listed).
+    """
+    col_w = np.ones(n_features, dtype=np.float32)
+    for term, col in vocabulary.items():
+        field = term.split(FieldPrefixedAnalyzer.SEP, 1)[0]
+        col_w[col] = float(weights.get(field, 1.0))
+    return col_w
+
+
+class HashedTfidfTransformer:
+    """
+    Vocabulary-free TF-IDF for the out-of-core index build (IncidentIndexer, tfidf_mode="hashed").
+
+    Terms (field-prefixed n-grams when `fields` is set, same analyzer as the stacked
+    multi-field index) are hashed into `n_features` columns, so neither the build nor the
+    query side ever holds a vocabulary. Document frequencies are accumulated chunk by chunk
+    with `update_df`; `finalize` turns them into TfidfVectorizer's smoothed IDF
+    (ln((1 + n) / (1 + df)) + 1), zeroing columns above `max_df`. Rows are raw counts * IDF,
+    L2-normalized - identical to TfidfVectorizer up to hash collisions.
+
+    Pickled as vectorizer.pkl; IncidentSearcher uses `transform_queries`.
+    """
+
+    def __init__(
+        self,
+        fields: Optional[Sequence[str]] = ("description", "resolution"),
+        ngram_range: Tuple[int, int] = (1, 2),
+        n_features: int = 2 ** 20,
+    ) -> None:
+        self.fields = tuple(fields) if fields else None
+        self.ngram_range = tuple(ngram_range)
+        self.n_features = int(n_features)
+        self.n_docs_ = 0
+        self.df_: Optional[np.ndarray] = np.zeros(self.n_features, dtype=np.int64)
+        self.idf_: Optional[np.ndarray] = None
+        self._hasher: Optional[HashingVectorizer] = None
+
+    # ---------------- build side ----------------
+    def counts(self, docs: Iterable) -> sparse.csr_matrix:
+        """Raw term counts (float32 CSR) of field tuples (or plain texts without `fields`)."""
+        mat = self.hasher.transform(docs).tocsr()
+        mat.sum_duplicates()
+        return mat.astype(np.float32)
+
+    def update_df(self, counts: sparse.csr_matrix) -> None:
+        self.df_ += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_docs_ += counts.shape[0]
+
+    def finalize(self, min_df: float = 1, max_df: float = 1.0) -> np.ndarray:
+        """Compute idf_ from the accumulated counts and drop them. Returns idf_."""
+        n = self.n_docs_
+        idf = np.log((1.0 + n) / (1.0 + self.df_)) + 1.0
+        # same int (count) / float (proportion) convention as TfidfVectorizer
+        low = min_df * n if isinstance(min_df, float) else min_df
+        high = max_df * n if isinstance(max_df, float) else max_df
+        idf[(self.df_ == 0) | (self.df_ < low) | (self.df_ > high)] = 0.0
+        self.idf_ = idf.astype(np.float32)
+        self.df_ = None
+        return self.idf_
+
+    def weight(self, counts: sparse.csr_matrix) -> sparse.csr_matrix:
+        """counts * idf, zero-IDF columns removed, rows L2-normalized."""
+        mat = counts.copy()
+        mat.data *= self.idf_[mat.indices]
+        mat.eliminate_zeros()
+        return normalize(mat, norm="l2", copy=False)
+
+    def transform(self, docs: Iterable) -> sparse.csr_matrix:
+        return self.weight(self.counts(docs))
+
+    # ---------------- query side ----------------
+    def transform_queries(self, queries: List[str], field_weights: Optional[Dict[str, float]] = None) -> sparse.csr_matrix:
+        """
+        Query rows matched against every field: each field's hashed terms are scaled by
+        its weight (no vocabulary to look the field up from, so weighting happens here).
+        """
+        if not self.fields:
+            return self.transform(queries)
+        weights = field_weights or {}
+        total: Optional[sparse.csr_matrix] = None
+        for k, field in enumerate(self.fields):
+            w = float(weights.get(field, 1.0))
+            if w == 0.0:
+                continue
+            docs = [tuple(q if j == k else "" for j in range(len(self.fields))) for q in queries]
+            part = self.counts(docs) * w
+            total = part if total is None else total + part
+        if total is None:
+            return sparse.csr_matrix((len(queries), self.n_features), dtype=np.float32)
+        return self.weight(total.tocsr())
+
+    @property
+    def hasher(self) -> HashingVectorizer:
+        if self._hasher is None:
+            common = dict(n_features=self.n_features, alternate_sign=False, norm=None, dtype=np.float32)
+            if self.fields:
+                analyzer = FieldPrefixedAnalyzer(fields=self.fields, ngram_range=self.ngram_range)
+                self._hasher = HashingVectorizer(analyzer=analyzer, **common)
+            else:
+                self._hasher = HashingVectorizer(ngram_range=self.ngram_range, **common)
+        return self._hasher
+
+    # the hasher is rebuilt from the config on load
+    def __getstate__(self) -> Dict:
+        state = dict(self.__dict__)
+        state["_hasher"] = None
+        return state
@@ -2,17 +2,49 @@ import os
 import sys
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
 
-from typing import List, Dict, Optional
+import asyncio
+import json
+import secrets
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Deque, List, Dict, Optional, Tuple, Union
 from mcp.server.fastmcp import FastMCP, Context
 
+from backend.src.rag.clustering import IncidentClusterer
 from backend.src.rag.search import IncidentSearcher
+from backend.src.embeddings.circuit_breaker import CircuitBreaker
+
+@asynccontextmanager
+async def _lifespan(server: FastMCP):
+    """Load the searcher in the background at startup and pre-warm caches (see _Warmup)."""
+    task = asyncio.get_running_loop().create_task(_boot_warmup())
+    try:
+        yield None
+    finally:
+        task.cancel()
+
 
 # Create FastMCP app
-app = FastMCP("aspenIncidentQA")
+app = FastMCP("aspenIncidentQA", lifespan=_lifespan)
 
 # Global state for robustness
 _SEARCHER: Optional[IncidentSearcher] = None
 _LAST_ERROR: Optional[str] = None
+_SEARCHER_LOCK = threading.Lock()  # the startup warm-up may build the searcher off-loop
+# searches running per searcher (by id); a replaced searcher is closed once its count is 0
+_IN_USE: Counter = Counter()
+_RETIRED: Dict[int, IncidentSearcher] = {}
+_IN_USE_LOCK = threading.Lock()
+
+# Shared across reloads so a known-bad embedding backend stays tripped
+_EMBED_BREAKER = CircuitBreaker(
+    name="embedding",
+    failure_threshold=int(os.getenv("EMBED_BREAKER_FAILURES", "3")),
+    recovery_timeout_s=float(os.getenv("EMBED_BREAKER_RECOVERY_S", "30")),
+)
 
 
 def _stderr_log(msg: str) -> None:
@@ -21,6 +53,20 @@ def _stderr_log(msg: str) -> None:
         print(msg, file=sys.stderr, flush=True)
 
 
+def _parse_field_weights(raw: Optional[str]) -> Optional[Dict[str, float]]:
+    """Parse SEARCH_FIELD_WEIGHTS, e.g. "description=1.0,resolution=0.5"; bad entries are ignored."""
+    if not raw:
+        return None
+    weights: Dict[str, float] = {}
+    for part in raw.split(","):
+        name, _, value = part.partition("=")
+        try:
+            weights[name.strip()] = float(value)
+        except ValueError:
+            continue
+    return weights or None
+
+
 def build_searcher() -> IncidentSearcher:
     """
     Construct the searcher with environment-driven config.
@@ -36,11 +82,35 @@ def build_searcher() -> IncidentSearcher:
         alpha=float(os.getenv("SEARCH_ALPHA", "0.8")),
         beta=float(os.getenv("SEARCH_BETA", "0.25")),
         candidate_pool=int(os.getenv("SEARCH_POOL", "200")),
+        adaptive_pool=os.getenv("SEARCH_ADAPTIVE_POOL", "0") == "1",
+        pool_min=int(os.getenv("SEARCH_POOL_MIN", "50")),
+        pool_max=int(os.getenv("SEARCH_POOL_MAX", "400")),
+        field_weights=_parse_field_weights(os.getenv("SEARCH_FIELD_WEIGHTS")),
         embed_model_name=embed_model,
         embed_base_url=embed_base_url,
+        embed_workers=int(os.getenv("SEARCH_EMBED_WORKERS", "2")),
+        embed_timeout_s=float(os.getenv("EMBED_TIMEOUT_S", "5")),
+        embed_breaker=_EMBED_BREAKER,
+        lazy_embed_max=int(os.getenv("SEARCH_LAZY_EMBED_MAX", "16")),
+        lazy_fold_every=int(os.getenv("SEARCH_LAZY_FOLD_EVERY", "256")),
+        passage_agg=os.getenv("SEARCH_PASSAGE_AGG", "max"),
     )
 
 
+def _request_deadline(budget_ms: Optional[float], deadline_unix: Optional[float]) -> Optional[float]:
+    """
+    Translate a caller's latency budget and/or absolute wall-clock deadline into a local
+    `time.monotonic()` deadline (the tighter of the two wins). None means unbounded.
+    """
+    now_mono = time.monotonic()
+    candidates = []
+    if budget_ms is not None:
+        candidates.append(now_mono + max(float(budget_ms), 0.0) / 1000.0)
+    if deadline_unix is not None:
+        candidates.append(now_mono + max(float(deadline_unix) - time.time(), 0.0))
+    return min(candidates) if candidates else None
+
+
 def ensure_searcher() -> IncidentSearcher:
     """
     Lazy-load the global searcher. On failure, cache the error string instead
@@ -48,14 +118,561 @@ def ensure_searcher() -> IncidentSearcher:
     """
     global _SEARCHER, _LAST_ERROR
     if _SEARCHER is None:
+        with _SEARCHER_LOCK:
+            if _SEARCHER is None:
+                try:
+                    _SEARCHER = build_searcher()
+                    _LAST_ERROR = None
+                except Exception as e:
+                    _SEARCHER = None
+                    _LAST_ERROR = f"{type(e).__name__}: {e}"
+                    raise
+    return _SEARCHER
+
+
+def _acquire_searcher() -> IncidentSearcher:
+    """
+    ensure_searcher() for work that leaves the event loop (e.g. a batch run in a thread):
+    the searcher is not closed by a reload until the matching _release_searcher().
+    """
+    s = ensure_searcher()
+    with _IN_USE_LOCK:
+        _IN_USE[id(s)] += 1
+    return s
+
+
+def _release_searcher(s: IncidentSearcher) -> None:
+    with _IN_USE_LOCK:
+        _IN_USE[id(s)] -= 1
+        if _IN_USE[id(s)] > 0:
+            return
+        del _IN_USE[id(s)]
+        retired = _RETIRED.pop(id(s), None)
+    if retired is not None:
+        retired.close()
+
+
+def _retire_searcher(s: IncidentSearcher) -> None:
+    """Close a searcher that is no longer _SEARCHER, now or after its last in-flight batch."""
+    with _IN_USE_LOCK:
+        if _IN_USE.get(id(s)):
+            _RETIRED[id(s)] = s
+            return
+    s.close()
+
+
+class ServerOverloaded(Exception):
+    """Raised when a priority class queue is full; carries a retry-after hint in seconds."""
+
+    def __init__(self, priority: str, retry_after_s: float) -> None:
+        super().__init__(f"{priority} queue full")
+        self.priority = priority
+        self.retry_after_s = retry_after_s
+
+
+class _MicroBatcher:
+    """
+    Collect lookup requests that arrive within a short window and run them as one
+    `IncidentSearcher.search_many` call (one sparse TF-IDF product, one `encode_many`),
+    then scatter the per-request results back to the waiting callers.
+
+    While a batch is being scored, new arrivals queue up and form the next batch, so
+    batches grow with load instead of every request paying for its own round-trip.
+
+    Requests carry a priority class with its own bounded queue. Batches are filled from
+    "interactive" first and topped up with "bulk"; every `bulk_every`-th batch takes at
+    least one bulk request so replays cannot starve. A full queue rejects immediately
+    with ServerOverloaded instead of letting latency grow without bound.
+    """
+
+    PRIORITIES = ("interactive", "bulk")
+
+    def __init__(
+        self,
+        window_ms: float = 5.0,
+        max_batch: int = 16,
+        interactive_capacity: int = 64,
+        bulk_capacity: int = 256,
+        bulk_every: int = 4,
+    ) -> None:
+        self.window_s = max(float(window_ms), 0.0) / 1000.0
+        self.max_batch = max(int(max_batch), 1)
+        self.bulk_every = max(int(bulk_every), 1)
+        self.capacity = {"interactive": max(int(interactive_capacity), 1), "bulk": max(int(bulk_capacity), 1)}
+        self._queues: Dict[str, Deque[Tuple[Dict[str, Any], asyncio.Future, float]]] = {
+            p: deque() for p in self.PRIORITIES
+        }
+        self._ready: Optional[asyncio.Event] = None
+        self._worker: Optional[asyncio.Task] = None
+
+        # counters (exported via stats())
+        self.batches = 0
+        self.requests = 0
+        self.max_seen = 0
+        self._batch_s = 0.0  # EWMA of batch service time, drives retry-after hints
+        self._per_class = {
+            p: {"served": 0, "rejected": 0, "wait_ms_avg": 0.0, "wait_ms_max": 0.0} for p in self.PRIORITIES
+        }
+
+    async def submit(self, request: Dict[str, Any], priority: str = "interactive") -> Dict:
+        """Enqueue one search request (kwargs of `search_with_meta`) and await its result."""
+        if priority not in self._queues:
+            raise ValueError(f"unknown priority {priority!r}; expected one of {self.PRIORITIES}")
+        self._ensure_worker()
+        queue = self._queues[priority]
+        if len(queue) >= self.capacity[priority]:
+            self._per_class[priority]["rejected"] += 1
+            raise ServerOverloaded(priority, self._retry_after(priority))
+        fut = asyncio.get_running_loop().create_future()
+        queue.append((request, fut, time.monotonic()))
+        self._ready.set()
+        return await fut
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "window_ms": round(self.window_s * 1000.0, 2),
+            "max_batch": self.max_batch,
+            "batches": self.batches,
+            "requests": self.requests,
+            "avg_batch": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "max_batch_seen": self.max_seen,
+            "avg_batch_ms": round(self._batch_s * 1000.0, 2),
+            "queues": {
+                p: dict(
+                    self._per_class[p],
+                    depth=len(self._queues[p]),
+                    capacity=self.capacity[p],
+                    wait_ms_avg=round(self._per_class[p]["wait_ms_avg"], 2),
+                    wait_ms_max=round(self._per_class[p]["wait_ms_max"], 2),
+                )
+                for p in self.PRIORITIES
+            },
+        }
+
+    def _ensure_worker(self) -> None:
+        if self._worker is None or self._worker.done():
+            self._ready = self._ready or asyncio.Event()
+            self._worker = asyncio.get_running_loop().create_task(self._run())
+
+    def _retry_after(self, priority: str) -> float:
+        """Rough time until the queue drains enough to accept work again."""
+        ahead = len(self._queues["interactive"])
+        if priority == "bulk":
+            ahead += len(self._queues["bulk"])
+        batches_ahead = ahead / self.max_batch + 1.0
+        return round(max(batches_ahead * max(self._batch_s, self.window_s), 0.05), 3)
+
+    def _pending(self) -> int:
+        return sum(len(q) for q in self._queues.values())
+
+    def _take(self, batch: List[Tuple[Dict[str, Any], asyncio.Future, float]], reserve_bulk: bool) -> None:
+        """Move queued requests into `batch`, interactive first."""
+        inter, bulk = self._queues["interactive"], self._queues["bulk"]
+        if reserve_bulk and bulk and len(batch) < self.max_batch and not any(b[3] == "bulk" for b in batch):
+            batch.append(bulk.popleft() + ("bulk",))
+        while inter and len(batch) < self.max_batch:
+            batch.append(inter.popleft() + ("interactive",))
+        while bulk and len(batch) < self.max_batch:
+            batch.append(bulk.popleft() + ("bulk",))
+
+    async def _collect(self) -> List[Tuple[Dict[str, Any], asyncio.Future, float, str]]:
+        while not self._pending():
+            self._ready.clear()
+            await self._ready.wait()
+
+        reserve_bulk = (self.batches + 1) % self.bulk_every == 0
+        batch: List = []
+        self._take(batch, reserve_bulk)
+        loop = asyncio.get_running_loop()
+        window_end = loop.time() + self.window_s
+        while len(batch) < self.max_batch:
+            remaining = window_end - loop.time()
+            if remaining <= 0:
+                break
+            self._ready.clear()
+            try:
+                await asyncio.wait_for(self._ready.wait(), timeout=remaining)
+            except asyncio.TimeoutError:
+                break
+            self._take(batch, reserve_bulk)
+        # window closed; still take whatever is already waiting
+        self._take(batch, reserve_bulk)
+        return batch
+
+    async def _run(self) -> None:
+        while True:
+            batch = await self._collect()
+            now = time.monotonic()
+            for _, _, enqueued, priority in batch:
+                c = self._per_class[priority]
+                wait_ms = (now - enqueued) * 1000.0
+                c["served"] += 1
+                c["wait_ms_avg"] = wait_ms if c["served"] == 1 else 0.9 * c["wait_ms_avg"] + 0.1 * wait_ms
+                c["wait_ms_max"] = max(c["wait_ms_max"], wait_ms)
+            self.batches += 1
+            self.requests += len(batch)
+            self.max_seen = max(self.max_seen, len(batch))
+            t0 = time.monotonic()
+            try:
+                s = _acquire_searcher()
+                outs = await asyncio.to_thread(self._search_many, s, [b[0] for b in batch])
+                for (_, fut, enqueued, _), out in zip(batch, outs):
+                    if not fut.done():
+                        out["meta"]["queue_wait_ms"] = round((now - enqueued) * 1000.0, 2)
+                        fut.set_result(out)
+            except Exception as e:
+                for _, fut, _, _ in batch:
+                    if not fut.done():
+                        fut.set_exception(e)
+            elapsed = time.monotonic() - t0
+            self._batch_s = elapsed if self._batch_s <= 0.0 else 0.8 * self._batch_s + 0.2 * elapsed
+
+    @staticmethod
+    def _search_many(s: IncidentSearcher, requests: List[Dict[str, Any]]) -> List[Dict]:
         try:
-            _SEARCHER = build_searcher()
-            _LAST_ERROR = None
+            return s.search_many(requests)
+        finally:
+            # a reload during the batch closes the old searcher here, off the event loop
+            _release_searcher(s)
+
+
+class _SingleFlight:
+    """
+    Coalesce identical in-flight searches: the first caller for a canonical key starts
+    the computation, later callers with the same key attach to it instead of starting
+    their own. The shared work runs as its own task, so one caller going away does not
+    cancel it for the others.
+    """
+
+    def __init__(self) -> None:
+        self._inflight: Dict[Tuple, asyncio.Task] = {}
+
+        # counters (exported via stats())
+        self.leaders = 0
+        self.coalesced = 0
+
+    async def do(self, key: Tuple, make_coro: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        """Return (result, coalesced) where coalesced=True means another caller did the work."""
+        task = self._inflight.get(key)
+        coalesced = task is not None
+        if coalesced:
+            self.coalesced += 1
+        else:
+            self.leaders += 1
+            task = asyncio.get_running_loop().create_task(make_coro())
+            self._inflight[key] = task
+            task.add_done_callback(lambda _t, k=key: self._inflight.pop(k, None))
+        return await asyncio.shield(task), coalesced
+
+    def stats(self) -> Dict[str, object]:
+        total = self.leaders + self.coalesced
+        return {
+            "leaders": self.leaders,
+            "coalesced": self.coalesced,
+            "coalesced_ratio": round(self.coalesced / total, 4) if total else 0.0,
+            "in_flight": len(self._inflight),
+        }
+
+
+class _TtlCache:
+    """
+    Small LRU with a time-to-live, used for pagination rankings and finished results.
+    Entries expire after `ttl_s`; the least recently used entry is evicted once
+    `max_entries` is reached. Only touched from the event loop, so no locking.
+    """
+
+    def __init__(self, ttl_s: float = 120.0, max_entries: int = 256) -> None:
+        self.ttl_s = max(float(ttl_s), 0.0)
+        self.max_entries = max(int(max_entries), 1)
+        self._entries: "OrderedDict[Any, Tuple[float, Any]]" = OrderedDict()
+
+        # counters (exported via stats())
+        self.stored = 0
+        self.hits = 0
+        self.misses = 0
+        self.evicted = 0
+
+    def put(self, key: Any, value: Any) -> None:
+        self._expire()
+        self._entries[key] = (time.monotonic() + self.ttl_s, value)
+        self._entries.move_to_end(key)
+        self.stored += 1
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evicted += 1
+
+    def get(self, key: Any) -> Optional[Any]:
+        self._expire()
+        hit = self._entries.get(key)
+        if hit is None:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return hit[1]
+
+    def clear(self) -> None:
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, object]:
+        self._expire()
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "ttl_s": self.ttl_s,
+            "stored": self.stored,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evicted": self.evicted,
+        }
+
+    def _expire(self) -> None:
+        now = time.monotonic()
+        for key in [k for k, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[key]
+
+
+def _store_ranking(ranking: Dict[str, Any], page_size: int) -> str:
+    """
+    Park a ranked candidate list behind a fresh pagination token. A cursor is
+    "<token>:<offset>"; later pages are sliced from the ranking and materialized with
+    `IncidentSearcher.results_for_rows`, so paging never rescores or re-embeds.
+    """
+    token = secrets.token_urlsafe(9)
+    _PAGES.put(token, dict(ranking, page_size=int(page_size)))
+    return token
+
+
+# keys that may hold the query text in a query log / warm-up source line
+_QUERY_KEYS = ("query", "search_query", "text", "title")
+
+
+def _read_queries(path: Path, tail: int) -> List[str]:
+    """Canonical queries from the last `tail` lines of a JSONL file (bad lines are skipped)."""
+    if not path.exists():
+        return []
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        lines = deque(f, maxlen=max(int(tail), 1))
+    out: List[str] = []
+    for line in lines:
+        try:
+            rec = json.loads(line)
+        except ValueError:
+            continue
+        if not isinstance(rec, dict):
+            continue
+        for k in _QUERY_KEYS:
+            q = _canonical_query(rec.get(k) or "")
+            if q:
+                out.append(q)
+                break
+    return out
+
+
+class _QueryLog:
+    """
+    Append-only JSONL log of interactive queries ({"ts", "query"} per line), the default
+    input of the warm-up job. Rotated to "<path>.1" once it exceeds `max_bytes`.
+    """
+
+    def __init__(self, path: Optional[str], max_bytes: int = 5_000_000) -> None:
+        self.path = Path(path) if path else None
+        self.max_bytes = int(max_bytes)
+        self.written = 0
+        self.last_error: Optional[str] = None
+
+    def record(self, query: str) -> None:
+        if self.path is None or not query:
+            return
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            if self.path.exists() and self.path.stat().st_size > self.max_bytes:
+                os.replace(self.path, self.path.with_name(self.path.name + ".1"))
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(json.dumps({"ts": round(time.time(), 3), "query": query}, ensure_ascii=False) + "\n")
+            self.written += 1
+        except OSError as e:
+            # logging must never fail a lookup
+            self.last_error = f"{type(e).__name__}: {e}"
+
+    def stats(self) -> Dict[str, object]:
+        return {"path": str(self.path) if self.path else None, "written": self.written, "last_error": self.last_error}
+
+
+class _Warmup:
+    """
+    Background cache pre-warmer. After a (re)load it takes the `top_n` most frequent
+    canonical queries from `source` (a JSONL file, e.g. requests.jsonl) or else from the
+    tail of the query log, and runs each as a default lookup at "bulk" priority. That
+    fills the result cache and the searcher's query-embedding LRU before the first wave
+    of real traffic. One run per searcher instance; progress is exported via stats().
+    """
+
+    def __init__(self, top_n: int = 50, log_tail: int = 5000, source: Optional[str] = None) -> None:
+        self.top_n = max(int(top_n), 0)
+        self.log_tail = max(int(log_tail), 1)
+        self.source = Path(source) if source else None
+        self._searcher: Optional[IncidentSearcher] = None
+        self._task: Optional[asyncio.Task] = None
+
+        # progress (exported via stats())
+        self.state = "idle"
+        self.planned = 0
+        self.done = 0
+        self.failed = 0
+        self.started_at: Optional[float] = None
+        self.elapsed_ms: Optional[float] = None
+        self.last_error: Optional[str] = None
+
+    def maybe_start(self) -> None:
+        """Start a run for the current searcher if it has not been warmed yet (needs a running loop)."""
+        s = _SEARCHER
+        if s is None or s is self._searcher or self.top_n == 0:
+            return
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        if self._task is not None and not self._task.done():
+            self._task.cancel()
+        self._searcher = s
+        self.state, self.planned, self.done, self.failed = "queued", 0, 0, 0
+        self._task = loop.create_task(self._run(s))
+
+    def stats(self) -> Dict[str, object]:
+        return {
+            "state": self.state,
+            "source": str(self.source) if self.source else "query_log",
+            "top_n": self.top_n,
+            "planned": self.planned,
+            "done": self.done,
+            "failed": self.failed,
+            "progress": round((self.done + self.failed) / self.planned, 3) if self.planned else None,
+            "elapsed_ms": self.elapsed_ms,
+            "last_error": self.last_error,
+        }
+
+    def _plan(self) -> List[str]:
+        if self.source is not None:
+            queries = _read_queries(self.source, tail=10 ** 9)
+        elif _QUERY_LOG.path is not None:
+            queries = _read_queries(_QUERY_LOG.path, tail=self.log_tail)
+        else:
+            queries = []
+        return [q for q, _ in Counter(queries).most_common(self.top_n)]
+
+    async def _run(self, s: IncidentSearcher) -> None:
+        self.state = "planning"
+        self.started_at, self.elapsed_ms, self.last_error = time.monotonic(), None, None
+        try:
+            plan = await asyncio.to_thread(self._plan)
         except Exception as e:
-            _SEARCHER = None
-            _LAST_ERROR = f"{type(e).__name__}: {e}"
-            raise
-    return _SEARCHER
+            self.state, self.last_error = "failed", f"{type(e).__name__}: {e}"
+            return
+        self.planned = len(plan)
+        self.state = "running"
+        for q in plan:
+            if _SEARCHER is not s:
+                self.state = "superseded"
+                return
+            for _ in range(3):
+                try:
+                    await _lookup(_search_request(q), None, "bulk")
+                    self.done += 1
+                    break
+                except ServerOverloaded as e:
+                    # never compete with real traffic: back off and retry
+                    await asyncio.sleep(e.retry_after_s)
+                except Exception as e:
+                    self.failed += 1
+                    self.last_error = f"{type(e).__name__}: {e}"
+                    break
+            else:
+                self.failed += 1
+            self.elapsed_ms = round((time.monotonic() - self.started_at) * 1000.0, 2)
+        self.state = "done"
+
+
+async def _boot_warmup() -> None:
+    try:
+        await asyncio.to_thread(ensure_searcher)
+    except Exception:
+        return  # surfaced by health / lookups via _LAST_ERROR
+    _WARMUP.maybe_start()
+
+
+def _make_cursor(token: str, offset: int) -> str:
+    return f"{token}:{int(offset)}"
+
+
+def _parse_cursor(cursor: str) -> Tuple[str, int]:
+    """(token, offset) of a cursor; ValueError if it is malformed or the offset is negative."""
+    token, _, offset = str(cursor or "").rpartition(":")
+    offset = int(offset)
+    if not token or offset < 0:
+        raise ValueError(f"invalid cursor: {cursor!r}")
+    return token, offset
+
+
+def _canonical_query(query: str) -> str:
+    """Whitespace-insensitive form of a query; used both as the coalescing key and as the search text."""
+    return " ".join(str(query or "").split())
+
+
+_BATCHER = _MicroBatcher(
+    window_ms=float(os.getenv("SEARCH_BATCH_WINDOW_MS", "5")),
+    max_batch=int(os.getenv("SEARCH_BATCH_MAX", "16")),
+    interactive_capacity=int(os.getenv("SEARCH_QUEUE_INTERACTIVE", "64")),
+    bulk_capacity=int(os.getenv("SEARCH_QUEUE_BULK", "256")),
+    bulk_every=int(os.getenv("SEARCH_BULK_EVERY", "4")),
+)
+_SINGLE_FLIGHT = _SingleFlight()
+# pagination rankings; cleared on reload (row indices would be stale)
+_PAGES = _TtlCache(
+    ttl_s=float(os.getenv("SEARCH_PAGE_TTL_S", "120")),
+    max_entries=int(os.getenv("SEARCH_PAGE_CACHE_MAX", "256")),
+)
+# ranked depth kept behind a lookup_solution cursor (0 disables pagination)
+_PAGE_DEPTH = int(os.getenv("SEARCH_PAGE_DEPTH", "100"))
+# finished, non-degraded results keyed by request; cleared on reload
+_RESULTS = _TtlCache(
+    ttl_s=float(os.getenv("SEARCH_RESULT_TTL_S", "120")),
+    max_entries=int(os.getenv("SEARCH_RESULT_CACHE_MAX", "512")),
+)
+_QUERY_LOG = _QueryLog(
+    os.getenv("QUERY_LOG_PATH", str(Path(__file__).resolve().parent / "data/processed/logs/query_log.jsonl")),
+    max_bytes=int(os.getenv("QUERY_LOG_MAX_BYTES", "5000000")),
+)
+_WARMUP = _Warmup(
+    top_n=int(os.getenv("WARMUP_TOP_N", "50")),
+    log_tail=int(os.getenv("WARMUP_LOG_TAIL", "5000")),
+    source=os.getenv("WARMUP_SOURCE") or None,
+)
+
+
+def _search_request(
+    query: str,
+    top_k: int = 8,
+    min_desc_len: int = 0,
+    same_resolution_dedupe: bool = True,
+    adaptive_pool: Optional[bool] = None,
+    alpha: Optional[float] = None,
+    beta: Optional[float] = None,
+    candidate_pool: Optional[int] = None,
+    page_depth: Optional[int] = _PAGE_DEPTH or None,
+) -> Dict[str, Any]:
+    """One `search_many` request dict; every entry point builds it here so cache keys line up."""
+    return {
+        "query": query,
+        "top_k": top_k,
+        "min_desc_len": min_desc_len,
+        "same_resolution_dedupe": same_resolution_dedupe,
+        "adaptive_pool": adaptive_pool,
+        "alpha": alpha,
+        "beta": beta,
+        "candidate_pool": candidate_pool,
+        "page_depth": page_depth,
+    }
 
 
 @app.tool()
@@ -73,6 +690,8 @@ def health(ctx: Context) -> Dict:
         "alpha": None,
         "beta": None,
         "candidate_pool": None,
+        "adaptive_pool": None,
+        "embedding_breaker": _EMBED_BREAKER.snapshot(),
         "ollama_host": os.getenv("OLLAMA_HOST") or "http://172.22.5.186:32000/ollama-dev",
         "embed_model": os.getenv("EMBED_MODEL", "nomic-embed-text:latest"),
     }
@@ -92,20 +711,45 @@ def health(ctx: Context) -> Dict:
 
     s = _SEARCHER
     try:
+        # texts is set on both load paths (bundle views or CSV lists); df only on the CSV path
+        texts = getattr(s, "texts", None)
         tfidf_ready = bool(getattr(s, "vec", None) is not None and
                            getattr(s, "mat", None) is not None and
-                           getattr(s, "df", None) is not None)
+                           texts is not None)
         emb = getattr(s, "doc_emb", None)
         embedding_ready = bool(emb is not None)
         emb_rows = int(emb.shape[0]) if emb is not None and hasattr(emb, "shape") else 0
 
         detail.update({
             "tfidf_ready": tfidf_ready,
+            "rows": len(texts["id"]) if texts is not None else 0,
+            "index_source": "bundle" if "index" in getattr(s, "bundle_groups", ()) else "files",
             "embedding_ready": embedding_ready,
             "emb_rows": emb_rows,
+            "knn_ready": getattr(s, "knn", None) is not None,
+            "lazy_embeddings": dict(
+                s.lazy_store.stats(), in_memory=len(s.lazy_vecs)
+            ) if getattr(s, "lazy_store", None) is not None else None,
             "alpha": getattr(s, "alpha", None),
             "beta": getattr(s, "beta", None),
             "candidate_pool": getattr(s, "candidate_pool", None),
+            "index_fields": list(getattr(s, "index_fields", ())),
+            "field_weights": getattr(s, "field_weights", None),
+            "passage_agg": getattr(s, "passage_agg", None),
+            "adaptive_pool": {
+                "enabled": getattr(s, "adaptive_pool", False),
+                "pool_min": getattr(s, "pool_min", None),
+                "pool_max": getattr(s, "pool_max", None),
+            },
+            "embed_timeout_s": getattr(s, "embed_timeout_s", None),
+            "embedding_breaker": _EMBED_BREAKER.snapshot(),
+            "micro_batching": _BATCHER.stats(),
+            "single_flight": _SINGLE_FLIGHT.stats(),
+            "page_cache": _PAGES.stats(),
+            "result_cache": _RESULTS.stats(),
+            "query_embedding_cache": s.query_cache_stats(),
+            "query_log": _QUERY_LOG.stats(),
+            "warmup": _WARMUP.stats(),
             "ollama_host": getattr(s, "embed_base_url", detail["ollama_host"]),
             "embed_model": getattr(s, "embed_model_name", detail["embed_model"]),
         })
@@ -120,20 +764,84 @@ def health(ctx: Context) -> Dict:
 def reload_artifacts(ctx: Context) -> str:
     """
     Hot-reload TF-IDF / embedding artifacts. Never crash; return a simple status string.
+    The new searcher takes over at once; the old one is closed after its in-flight
+    batches finish.
     """
     global _SEARCHER, _LAST_ERROR
+    old = _SEARCHER
     try:
         _SEARCHER = build_searcher()
         _LAST_ERROR = None
+        _PAGES.clear()
+        _RESULTS.clear()
+        _WARMUP.maybe_start()
         return "reloaded"
     except Exception as e:
         _SEARCHER = None
         _LAST_ERROR = f"{type(e).__name__}: {e}"
         return f"reload_failed: {_LAST_ERROR}"
+    finally:
+        if old is not None:
+            _retire_searcher(old)
+
+
+def _effective_request(request: Dict[str, Any], s: IncidentSearcher) -> Dict[str, Any]:
+    """
+    `request` with the scoring overrides resolved against the searcher's defaults, so a
+    request that leaves alpha / beta / ... unset and one that spells out the same values
+    share one cache and single-flight key.
+    """
+    adaptive = s.adaptive_pool if request.get("adaptive_pool") is None else bool(request["adaptive_pool"])
+    return dict(
+        request,
+        query=_canonical_query(request.get("query", "")),
+        alpha=s.alpha if request.get("alpha") is None else float(request["alpha"]),
+        beta=s.beta if request.get("beta") is None else float(request["beta"]),
+        adaptive_pool=adaptive,
+        # the adaptive pool ignores candidate_pool
+        candidate_pool=None if adaptive else (
+            s.candidate_pool if request.get("candidate_pool") is None else int(request["candidate_pool"])
+        ),
+    )
+
+
+async def _lookup(request: Dict[str, Any], deadline: Optional[float], priority: str) -> Dict:
+    """Result cache + single-flight + priority micro-batching around one search request."""
+    request = _effective_request(request, ensure_searcher())
+    # the deadline is per caller and not part of the key: followers inherit the leader's budget
+    req_key = tuple(sorted(request.items()))
+    hit = _RESULTS.get(req_key)
+    if hit is not None:
+        return {"results": hit["results"], "meta": dict(hit["meta"], cached=True, coalesced=False, priority=priority)}
+    key = req_key + (("priority", priority),)
+    request["deadline"] = deadline
+
+    async def run() -> Dict:
+        out = await _BATCHER.submit(request, priority)
+        # park the rest of the ranking behind a cursor; coalesced callers share it
+        ranking = out.pop("ranking", None)
+        if ranking is not None:
+            shown = len(out["results"])
+            has_more = len(ranking["rows"]) > shown
+            out["meta"]["cursor"] = _make_cursor(_store_ranking(ranking, shown), shown) if has_more else None
+        if not out["meta"].get("degraded"):
+            # best-effort (deadline-trimmed) results are not worth replaying
+            _RESULTS.put(req_key, out)
+        return out
+
+    shared, coalesced = await _SINGLE_FLIGHT.do(key, run)
+    return {
+        "results": shared["results"],
+        "meta": dict(shared["meta"], cached=False, coalesced=coalesced, priority=priority),
+    }
+
+
+def _overloaded_error(e: ServerOverloaded) -> Dict:
+    return {"error": "overloaded", "priority": e.priority, "retry_after_s": e.retry_after_s}
 
 
 @app.tool()
-def lookup_solution(
+async def lookup_solution(
     ctx: Context,
     query: str,
     top_k: int = 8,
@@ -142,36 +850,213 @@ def lookup_solution(
     candidate_pool: Optional[int] = None,
     min_desc_len: int = 0,
     same_resolution_dedupe: bool = True,
-) -> List[Dict]:
+    adaptive_pool: Optional[bool] = None,
+    include_meta: bool = False,
+    budget_ms: Optional[float] = None,
+    deadline_unix: Optional[float] = None,
+    priority: str = "interactive",
+) -> Union[List[Dict], Dict]:
     """
     Two-stage retrieval:
       Stage-1: TF-IDF + fuzzy blended score
       Stage-2: Optional embedding re-rank (if embeddings exist)
     Returns a list of results or a single structured error dict in a list.
+    With include_meta=True, returns {"results": [...], "meta": {...}} instead
+    (meta reports e.g. the rerank pool size chosen for this query).
+
+    budget_ms / deadline_unix (epoch seconds) bound the server-side latency: stages that
+    no longer fit are skipped and reported in meta["stages_skipped"].
+
+    alpha / beta / candidate_pool apply to this request only. Concurrent requests are
+    micro-batched (see _MicroBatcher), and identical in-flight requests share one
+    computation (see _SingleFlight; meta["coalesced"] marks followers).
+
+    priority is "interactive" (default) or "bulk". When that class's queue is full the
+    call fails fast with {"error": "overloaded", "retry_after_s": ...}.
+
+    With include_meta=True, meta["cursor"] (None when there is nothing more) can be passed
+    to `lookup_more` to fetch the next page from the cached ranking.
+
+    Repeated requests within SEARCH_RESULT_TTL_S are served from a result cache
+    (meta["cached"]). Queries are appended to the query log that feeds the warm-up job.
     """
+    deadline = _request_deadline(budget_ms, deadline_unix)
     try:
-        s = ensure_searcher()
+        ensure_searcher()
     except Exception as e:
         return [{"error": f"searcher_unavailable: {type(e).__name__}: {e}"}]
-
-    if alpha is not None:
-        s.alpha = float(alpha)
-    if beta is not None:
-        s.beta = float(beta)
-    if candidate_pool is not None:
-        s.candidate_pool = int(candidate_pool)
+    _WARMUP.maybe_start()
+    _QUERY_LOG.record(_canonical_query(query))
 
     try:
-        return s.search(
-            query=query,
+        out = await _lookup(_search_request(
+            query,
             top_k=top_k,
             min_desc_len=min_desc_len,
             same_resolution_dedupe=same_resolution_dedupe,
-        )
+            adaptive_pool=adaptive_pool,
+            alpha=alpha,
+            beta=beta,
+            candidate_pool=candidate_pool,
+        ), deadline, priority)
+        return out if include_meta else out["results"]
+    except ServerOverloaded as e:
+        return [_overloaded_error(e)]
     except Exception as e:
         return [{"error": f"search_failed: {type(e).__name__}: {e}"}]
 
 
+@app.tool()
+def lookup_more(
+    ctx: Context,
+    cursor: str,
+    page_size: Optional[int] = None,
+    include_meta: bool = False,
+) -> Union[List[Dict], Dict]:
+    """
+    Next page for a `lookup_solution` cursor, sliced from the cached ranking (no rescoring,
+    no embedding calls). page_size defaults to the first page's size. With include_meta=True,
+    returns {"results": [...], "meta": {"cursor": next_or_None, "offset", "ranked_depth"}}.
+    Expired or unknown cursors return [{"error": "cursor_expired"}]; rerun lookup_solution.
+    """
+    try:
+        token, offset = _parse_cursor(cursor)
+    except ValueError:
+        return [{"error": "invalid_cursor"}]
+    entry = _PAGES.get(token)
+    if entry is None or _SEARCHER is None:
+        return [{"error": "cursor_expired"}]
+    if offset > len(entry["rows"]):
+        return [{"error": "invalid_cursor"}]
+
+    size = max(int(page_size or entry["page_size"] or 1), 1)
+    end = min(offset + size, len(entry["rows"]))
+    try:
+        results = _SEARCHER.results_for_rows(
+            entry["rows"][offset:end], entry["stage1"][offset:end], entry["final"][offset:end]
+        )
+    except Exception as e:
+        return [{"error": f"page_failed: {type(e).__name__}: {e}"}]
+    if not include_meta:
+        return results
+    return {
+        "results": results,
+        "meta": {
+            "cursor": _make_cursor(token, end) if end < len(entry["rows"]) else None,
+            "offset": offset,
+            "ranked_depth": len(entry["rows"]),
+        },
+    }
+
+
+@app.tool()
+def related_incidents(ctx: Context, incident_id: str, top_k: int = 8) -> List[Dict]:
+    """
+    Nearest historical neighbours of one incident (by its `id`), answered from the
+    precomputed kNN graph (see rag/knn_graph.py) instead of re-running a text search.
+    Each result carries score_related (the blended TF-IDF / embedding similarity).
+    """
+    try:
+        s = ensure_searcher()
+    except Exception as e:
+        return [{"error": f"searcher_unavailable: {type(e).__name__}: {e}"}]
+    try:
+        return s.related(incident_id, top_k=max(int(top_k), 1))
+    except KeyError:
+        return [{"error": f"unknown_incident: {incident_id}"}]
+    except RuntimeError as e:
+        return [{"error": f"knn_unavailable: {e}"}]
+    except Exception as e:
+        return [{"error": f"related_failed: {type(e).__name__}: {e}"}]
+
+
+_CLUSTER_STATS: Dict[str, Any] = {"path": None, "mtime": None, "stats": None}
+
+
+def _cluster_stats(s: IncidentSearcher) -> Optional[Dict]:
+    """cluster_stats.json written by IncidentClusterer, re-read only when it changes on disk."""
+    path = s.proc_dir / "clusters" / "cluster_stats.json"
+    if not path.exists():
+        return None
+    mtime = path.stat().st_mtime
+    if _CLUSTER_STATS["path"] != path or _CLUSTER_STATS["mtime"] != mtime:
+        _CLUSTER_STATS.update(path=path, mtime=mtime, stats=IncidentClusterer.load_stats(path))
+    return _CLUSTER_STATS["stats"]
+
+
+@app.tool()
+def trends(
+    ctx: Context,
+    latest_source: Optional[str] = None,
+    top_n: int = 10,
+    min_count: int = 3,
+) -> Dict:
+    """
+    Issue families (embedding clusters) growing in the latest export versus earlier ones.
+    latest_source defaults to the newest source_file. Answered from the precomputed
+    per-cluster / per-source counts (see rag/clustering.py), never by scanning incidents.
+    Each cluster carries latest/baseline counts and shares, growth (1.0 = flat) and an
+    exemplar incident.
+    """
+    try:
+        s = ensure_searcher()
+    except Exception as e:
+        return {"error": f"searcher_unavailable: {type(e).__name__}: {e}"}
+    try:
+        stats = _cluster_stats(s)
+        if stats is None:
+            return {"error": "clusters_unavailable: run IncidentClusterer().update() first"}
+        return IncidentClusterer.trend_report(stats, latest_source=latest_source, top_n=top_n, min_count=min_count)
+    except KeyError:
+        return {"error": f"unknown_source: {latest_source}"}
+    except Exception as e:
+        return {"error": f"trends_failed: {type(e).__name__}: {e}"}
+
+
+@app.tool()
+async def lookup_batch(
+    ctx: Context,
+    queries: List[str],
+    top_k: int = 8,
+    min_desc_len: int = 0,
+    same_resolution_dedupe: bool = True,
+    include_meta: bool = False,
+    priority: str = "bulk",
+) -> List[Union[List[Dict], Dict]]:
+    """
+    Batch entry point for replays / evaluations. Runs each query like `lookup_solution`
+    (at "bulk" priority by default) and returns one entry per query, in order. At most
+    one queue's worth of queries is in flight at a time, so a large batch waits for room
+    instead of overflowing its own queue; queries still rejected by backpressure (other
+    traffic filled the queue) come back as [{"error": "overloaded", "retry_after_s": ...}].
+    Requests are built exactly as lookup_solution builds them, so the two share cached
+    results, and with include_meta=True each entry carries a `lookup_more` cursor.
+    """
+    try:
+        ensure_searcher()
+    except Exception as e:
+        return [[{"error": f"searcher_unavailable: {type(e).__name__}: {e}"}] for _ in queries]
+    _WARMUP.maybe_start()
+    slots = asyncio.Semaphore(_BATCHER.capacity.get(priority, 1))
+
+    async def one(q: str) -> Union[List[Dict], Dict]:
+        try:
+            async with slots:
+                out = await _lookup(_search_request(
+                    q,
+                    top_k=top_k,
+                    min_desc_len=min_desc_len,
+                    same_resolution_dedupe=same_resolution_dedupe,
+                ), None, priority)
+            return out if include_meta else out["results"]
+        except ServerOverloaded as e:
+            return [_overloaded_error(e)]
+        except Exception as e:
+            return [{"error": f"search_failed: {type(e).__name__}: {e}"}]
+
+    return list(await asyncio.gather(*(one(q) for q in queries)))
+
+
 if __name__ == "__main__":
     _stderr_log("[MCP] FastMCP server starting...")
     app.run()
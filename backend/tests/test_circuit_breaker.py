@@ -0,0 +1,67 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import time
+
+from backend.src.embeddings.circuit_breaker import CircuitBreaker
+
+
+def test_opens_after_consecutive_failures():
+    cb = CircuitBreaker(failure_threshold=3, recovery_timeout_s=60.0)
+    for _ in range(2):
+        cb.record_failure("boom")
+    assert cb.state == CircuitBreaker.CLOSED
+    assert cb.allow_request()
+
+    cb.record_failure("boom")
+    assert cb.state == CircuitBreaker.OPEN
+    assert not cb.allow_request()
+    snap = cb.snapshot()
+    assert snap["trips"] == 1
+    assert snap["rejected"] == 1
+    assert snap["last_error"] == "boom"
+
+
+def test_success_resets_the_failure_streak():
+    cb = CircuitBreaker(failure_threshold=2, recovery_timeout_s=60.0)
+    cb.record_failure()
+    cb.record_success()
+    cb.record_failure()
+    assert cb.state == CircuitBreaker.CLOSED
+    assert cb.snapshot()["consecutive_failures"] == 1
+
+
+def test_half_open_admits_limited_probes():
+    cb = CircuitBreaker(failure_threshold=1, recovery_timeout_s=0.05, half_open_max_calls=1)
+    cb.record_failure()
+    assert not cb.allow_request()
+
+    time.sleep(0.06)
+    assert cb.state == CircuitBreaker.HALF_OPEN
+    assert cb.allow_request()
+    assert not cb.allow_request()  # the single probe slot is taken
+
+
+def test_half_open_probe_outcome_closes_or_reopens():
+    cb = CircuitBreaker(failure_threshold=1, recovery_timeout_s=0.05)
+    cb.record_failure()
+    time.sleep(0.06)
+    assert cb.allow_request()
+    cb.record_success()
+    assert cb.state == CircuitBreaker.CLOSED
+
+    cb = CircuitBreaker(failure_threshold=5, recovery_timeout_s=0.05)
+    for _ in range(5):
+        cb.record_failure()
+    time.sleep(0.06)
+    assert cb.allow_request()
+    cb.record_failure()  # one failed probe is enough, whatever the threshold
+    assert cb.state == CircuitBreaker.OPEN
+    assert cb.snapshot()["trips"] == 2
+
+
+def test_last_error_is_truncated():
+    cb = CircuitBreaker()
+    cb.record_failure("x" * 500)
+    assert len(cb.snapshot()["last_error"]) == 200
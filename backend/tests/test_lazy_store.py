@@ -0,0 +1,94 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import json
+
+import numpy as np
+
+from backend.src.rag.lazy_store import LazyEmbeddingStore, side_store_identity
+
+DIM = 4
+
+
+def _vecs(*rows):
+    return np.array([[float(r)] * DIM for r in rows], dtype=np.float32)
+
+
+def test_append_then_load_round_trips(tmp_path):
+    store = LazyEmbeddingStore(tmp_path, dim=DIM)
+    store.append([7, 3], _vecs(7, 3))
+    store.append([5], _vecs(5))
+
+    idx, vec = LazyEmbeddingStore(tmp_path, dim=DIM).load()
+    assert idx.tolist() == [7, 3, 5]
+    np.testing.assert_array_equal(vec, _vecs(7, 3, 5))
+    assert store.pending() == 3
+
+
+def test_torn_write_is_ignored_and_trimmed(tmp_path):
+    store = LazyEmbeddingStore(tmp_path, dim=DIM)
+    store.append([1, 2], _vecs(1, 2))
+    # crash after the vectors of the next append, before its indices
+    with open(store.vec_path, "ab") as f:
+        f.write(_vecs(9).tobytes()[:-3])
+
+    assert store.load()[0].tolist() == [1, 2]
+    store.append([4], _vecs(4))
+    idx, vec = store.load()
+    assert idx.tolist() == [1, 2, 4]
+    np.testing.assert_array_equal(vec, _vecs(1, 2, 4))
+
+
+def test_fold_merges_new_rows_once(tmp_path):
+    emb_npy, kept_npy, meta_json = tmp_path / "embeddings.npy", tmp_path / "kept_indices.npy", tmp_path / "meta.json"
+    np.save(emb_npy, _vecs(0, 1))
+    np.save(kept_npy, np.array([0, 1], dtype=np.int64))
+    meta_json.write_text(json.dumps({"rows_kept": 2}), encoding="utf-8")
+
+    store = LazyEmbeddingStore(tmp_path, dim=DIM)
+    # row 1 is already embedded; row 5 arrives as two passages
+    store.append([1, 5, 5], _vecs(1, 5, 6))
+    assert store.fold(emb_npy, kept_npy, meta_json) == 1
+
+    assert np.load(kept_npy).tolist() == [0, 1, 5, 5]
+    np.testing.assert_array_equal(np.load(emb_npy), _vecs(0, 1, 5, 6))
+    assert json.loads(meta_json.read_text(encoding="utf-8"))["rows_lazy_folded"] == 1
+    assert store.pending() == 0
+
+
+def test_foreign_identity_reads_empty_and_is_replaced(tmp_path):
+    LazyEmbeddingStore(tmp_path, dim=DIM, identity="build-a").append([3], _vecs(3))
+
+    store = LazyEmbeddingStore(tmp_path, dim=DIM, identity="build-b")
+    assert store.load()[0].tolist() == []
+    assert store.pending() == 0
+
+    store.append([8], _vecs(8))
+    assert store.load()[0].tolist() == [8]
+    assert LazyEmbeddingStore(tmp_path, dim=DIM, identity="build-a").pending() == 0
+
+
+def test_identity_follows_the_corpus_and_embeddings_build(tmp_path):
+    csv, meta = tmp_path / "incidents.csv", tmp_path / "embedder_meta.json"
+    csv.write_text("id\n1\n", encoding="utf-8")
+    meta.write_text(json.dumps({"build_id": "a"}), encoding="utf-8")
+    first = side_store_identity(csv, meta)
+    assert side_store_identity(csv, meta) == first
+
+    meta.write_text(json.dumps({"build_id": "b"}), encoding="utf-8")
+    assert side_store_identity(csv, meta) != first
+
+    second = side_store_identity(csv, meta)
+    csv.write_text("id\n1\n2\n", encoding="utf-8")
+    assert side_store_identity(csv, meta) != second
+
+
+def test_discard_removes_every_file(tmp_path):
+    store = LazyEmbeddingStore(tmp_path, dim=DIM, identity="build-a")
+    store.append([2], _vecs(2))
+    LazyEmbeddingStore.discard(tmp_path)
+    LazyEmbeddingStore.discard(tmp_path)  # nothing left to drop
+
+    assert not any(p.exists() for p in (store.vec_path, store.idx_path, store.meta_path))
+    assert store.load()[0].tolist() == []
@@ -0,0 +1,67 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from backend.src.embeddings.circuit_breaker import CircuitBreaker
+from backend.src.rag.search import _QueryEmbeddingJob
+
+
+@pytest.fixture
+def pool():
+    pool = ThreadPoolExecutor(max_workers=1)
+    yield pool
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+def test_hung_backend_costs_the_batch_one_timeout(pool):
+    release = threading.Event()
+    breaker = CircuitBreaker(failure_threshold=10)
+    future = pool.submit(lambda: (release.wait(5.0), 0.0))
+    job = _QueryEmbeddingJob(future, breaker, rows={i: i for i in range(6)}, timeout_s=0.3)
+
+    t0 = time.monotonic()
+    # queries of a batch are ranked one after another, each with a generous request budget
+    reasons = [job.wait(timeout=2.0, deadline_bound=True)[1] for _ in range(6)]
+    elapsed = time.monotonic() - t0
+    release.set()
+
+    assert reasons == ["embed_timeout"] * 6
+    assert elapsed < 0.3 + 0.25  # not 6 * 0.3
+    assert breaker.snapshot()["failures"] == 1
+
+
+def test_request_deadline_does_not_count_against_the_backend(pool):
+    release = threading.Event()
+    breaker = CircuitBreaker()
+    future = pool.submit(lambda: (release.wait(5.0), 0.0))
+    job = _QueryEmbeddingJob(future, breaker, rows={0: 0}, timeout_s=2.0)
+
+    assert job.wait(timeout=0.05, deadline_bound=True) == (None, "deadline")
+    release.set()
+    future.result(timeout=1.0)
+    assert breaker.snapshot()["failures"] == 0
+
+
+def test_completed_job_is_shared_and_settled_once(pool):
+    breaker = CircuitBreaker()
+    raw = np.array([[3.0, 4.0], [0.0, 2.0]], dtype=np.float32)
+    future = pool.submit(lambda: (raw, 0.01))
+    job = _QueryEmbeddingJob(future, breaker, rows={0: 0, 1: 1}, timeout_s=1.0)
+
+    first, err = job.wait(timeout=1.0, deadline_bound=False)
+    second, _ = job.wait(timeout=1.0, deadline_bound=False)
+    assert err is None
+    assert second is first
+    np.testing.assert_allclose(first, [[0.6, 0.8], [0.0, 1.0]], rtol=1e-6)
+    # the completion callback may still be running on the worker thread
+    deadline = time.monotonic() + 1.0
+    while breaker.snapshot()["successes"] == 0 and time.monotonic() < deadline:
+        time.sleep(0.005)
+    assert breaker.snapshot()["successes"] == 1
@@ -0,0 +1,100 @@
+import os
+import sys
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), "../..")))
+
+import time
+
+import pytest
+
+from backend.src import server
+from backend.src.server import _TtlCache
+
+
+class _StubSearcher:
+    """Materializes rows the way results_for_rows does, minus the corpus."""
+
+    def results_for_rows(self, rows, stage1, final):
+        return [{"row": r, "score_final": f} for r, f in zip(rows, final)]
+
+
+@pytest.fixture
+def pages(monkeypatch):
+    cache = _TtlCache(ttl_s=60.0, max_entries=8)
+    monkeypatch.setattr(server, "_PAGES", cache)
+    monkeypatch.setattr(server, "_SEARCHER", _StubSearcher())
+    return cache
+
+
+def _token(n_rows, page_size=2):
+    rows = list(range(100, 100 + n_rows))
+    return server._store_ranking({"rows": rows, "stage1": [0.0] * n_rows, "final": [float(r) for r in rows]}, page_size)
+
+
+# ---------------- _TtlCache ----------------
+def test_ttl_cache_evicts_least_recently_used():
+    cache = _TtlCache(ttl_s=60.0, max_entries=2)
+    cache.put("a", 1)
+    cache.put("b", 2)
+    assert cache.get("a") == 1  # "b" is now the oldest
+    cache.put("c", 3)
+
+    assert cache.get("b") is None
+    assert (cache.get("a"), cache.get("c")) == (1, 3)
+    stats = cache.stats()
+    assert (stats["entries"], stats["evicted"], stats["hits"], stats["misses"]) == (2, 1, 3, 1)
+
+
+def test_ttl_cache_expires_entries():
+    cache = _TtlCache(ttl_s=0.05, max_entries=4)
+    cache.put("a", 1)
+    assert cache.get("a") == 1
+    time.sleep(0.06)
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_ttl_cache_put_refreshes_and_clear_empties():
+    cache = _TtlCache(ttl_s=60.0, max_entries=4)
+    cache.put("a", 1)
+    cache.put("a", 2)
+    assert cache.get("a") == 2
+    assert cache.stats()["entries"] == 1
+    cache.clear()
+    assert cache.get("a") is None
+
+
+# ---------------- lookup_more cursors ----------------
+@pytest.mark.parametrize("cursor", ["", None, "no-offset", ":3", "tok:", "tok:abc", "tok:-1", "tok:1.5"])
+def test_malformed_cursor_is_rejected(pages, cursor):
+    assert server.lookup_more(None, cursor) == [{"error": "invalid_cursor"}]
+
+
+def test_offset_past_the_ranking_is_rejected(pages):
+    token = _token(5)
+    assert server.lookup_more(None, server._make_cursor(token, 6)) == [{"error": "invalid_cursor"}]
+    assert server.lookup_more(None, server._make_cursor(token, 5)) == []
+
+
+def test_unknown_or_expired_token(pages, monkeypatch):
+    assert server.lookup_more(None, "never-issued:0") == [{"error": "cursor_expired"}]
+
+    token = _token(5)
+    monkeypatch.setattr(server, "_SEARCHER", None)  # reload in progress
+    assert server.lookup_more(None, server._make_cursor(token, 0)) == [{"error": "cursor_expired"}]
+
+
+def test_pages_walk_the_ranking(pages):
+    cursor, seen = server._make_cursor(_token(5, page_size=2), 0), []
+    while cursor is not None:
+        out = server.lookup_more(None, cursor, include_meta=True)
+        seen.append([r["row"] for r in out["results"]])
+        assert out["meta"]["ranked_depth"] == 5
+        cursor = out["meta"]["cursor"]
+
+    assert seen == [[100, 101], [102, 103], [104]]
+
+
+def test_page_size_override(pages):
+    token = _token(5, page_size=2)
+    rows = [r["row"] for r in server.lookup_more(None, server._make_cursor(token, 1), page_size=10)]
+    assert rows == [101, 102, 103, 104]